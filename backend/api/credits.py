@@ -1,17 +1,27 @@
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Request, Query
+from typing import Optional
 from pydantic import BaseModel
-import os
-import stripe
 
 from services.supabase_client import (
     get_user_from_token,
     get_user_profile,
     get_supabase_client
 )
+from services.stripe_client import get_stripe
+from services.catalog import package_catalog, get_package, CATALOG_CACHE_CONTROL
+from api.http_cache import conditional_response, json_response
+from api.pagination import (
+    HISTORY_CACHE_CONTROL,
+    MAX_PAGE_SIZE,
+    select_columns,
+    page_query,
+    page_result
+)
 
 router = APIRouter()
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+PURCHASE_COLUMNS = ["id", "amount", "description", "created_at"]
+PURCHASE_OPTIONAL_COLUMNS = ["stripe_payment_id"]
 
 class CheckoutRequest(BaseModel):
     package_id: str
@@ -19,17 +29,10 @@ class CheckoutRequest(BaseModel):
     cancel_url: str
 
 @router.get("/packages")
-async def get_credit_packages():
-    """Get available credit packages"""
-    supabase = get_supabase_client()
-    
-    response = supabase.table("credit_packages")\
-        .select("*")\
-        .eq("is_active", True)\
-        .order("sort_order")\
-        .execute()
-    
-    return {"packages": response.data}
+async def get_credit_packages(request: Request):
+    """Get available credit packages (cached; supports If-None-Match)"""
+    _, body, etag = package_catalog.get()
+    return conditional_response(request, body, etag, CATALOG_CACHE_CONTROL)
 
 @router.get("/balance")
 async def get_credit_balance(authorization: str = Header(...)):
@@ -51,23 +54,17 @@ async def create_checkout_session(
     authorization: str = Header(...)
 ):
     """Create Stripe checkout session for credit purchase"""
+    stripe = get_stripe()
     try:
         user = await get_user_from_token(authorization)
         supabase = get_supabase_client()
         
-        # Get package details
-        package_response = supabase.table("credit_packages")\
-            .select("*")\
-            .eq("id", request.package_id)\
-            .eq("is_active", True)\
-            .single()\
-            .execute()
+        # Get package details from the cached catalog
+        package = get_package(request.package_id)
         
-        if not package_response.data:
+        if not package:
             raise HTTPException(status_code=404, detail="Package not found")
         
-        package = package_response.data
-        
         # Get or create Stripe customer
         customer_response = supabase.table("stripe_customers")\
             .select("stripe_customer_id")\
@@ -136,23 +133,30 @@ async def create_checkout_session(
 
 @router.get("/history")
 async def get_purchase_history(
+    request: Request,
     authorization: str = Header(...),
-    limit: int = 20
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """Get user's credit purchase history"""
+    """Get user's credit purchase history, newest first"""
     try:
         user = await get_user_from_token(authorization)
         supabase = get_supabase_client()
         
-        response = supabase.table("credit_transactions")\
-            .select("*")\
+        query = supabase.table("credit_transactions")\
+            .select(select_columns(PURCHASE_COLUMNS, PURCHASE_OPTIONAL_COLUMNS, fields))\
             .eq("user_id", user.id)\
-            .eq("type", "purchase")\
-            .order("created_at", desc=True)\
-            .limit(limit)\
-            .execute()
+            .eq("type", "purchase")
+        response = page_query(query, limit, cursor).execute()
+        purchases, next_cursor = page_result(response.data, limit)
         
-        return {"purchases": response.data}
+        return json_response(request, {
+            "purchases": purchases,
+            "next_cursor": next_cursor
+        }, HISTORY_CACHE_CONTROL)
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
@@ -1,17 +1,26 @@
-from fastapi import APIRouter, HTTPException, Header, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Header, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 import uuid
 import json
+import asyncio
 
 from services.supabase_client import (
     get_user_from_token,
     get_user_profile,
     get_supabase_client,
-    update_user_credits
+    create_generation_with_debit,
+    update_user_credits,
+    InsufficientCreditsError
 )
 from services.ai_router import ai_router, AIModel
-from services.generator import GeneratorService
+from services.job_queue import get_job_queue
+from services.admission import admission_controller, AdmissionError, MAX_TEXTURES_PER_REQUEST
+from services.scheduler import estimated_start
+from services.catalog import CachedDocument, CATALOG_CACHE_CONTROL
+from api.http_cache import conditional_response
+from services.events import event_bus, TERMINAL_STATUSES
 from prompts.plugin_prompts import get_plugin_prompt, PLUGIN_SYSTEM_PROMPT
 from prompts.datapack_prompts import get_datapack_prompt, DATAPACK_SYSTEM_PROMPT
 from prompts.texture_prompts import (
@@ -24,31 +33,43 @@ from prompts.texture_prompts import (
 )
 
 router = APIRouter()
-generator_service = GeneratorService()
 
 # Request models
 class PluginRequest(BaseModel):
     prompt: str
     tier: str  # simple, medium, complex
     name: Optional[str] = None
+    use_cache: bool = True  # False forces a fresh AI generation
 
 class DatapackRequest(BaseModel):
     prompt: str
     tier: str  # simple, medium, complex
     name: Optional[str] = None
+    use_cache: bool = True  # False forces a fresh AI generation
 
 class TexturePackRequest(BaseModel):
     style_description: str
     textures: List[str]  # Can be individual textures or category names like "ores", "swords"
     name: Optional[str] = None
+    use_cache: bool = True  # False forces a fresh AI generation
+
+class StatusBatchRequest(BaseModel):
+    ids: List[str]
+
+# Columns clients need to follow a generation's progress
+STATUS_COLUMNS = "id, status, file_url, file_name, file_size, error_message, output_metadata"
+
+# Most generations a single batch status request may ask about
+MAX_STATUS_BATCH = 50
+
+# Seconds between SSE keep-alive comments (keeps proxies from closing idle streams)
+SSE_KEEPALIVE_SECONDS = 15
 
 # Pricing
 PLUGIN_CREDITS = {"simple": 20, "medium": 35, "complex": 50}
 DATAPACK_CREDITS = {"simple": 5, "medium": 10, "complex": 15}
 
-@router.get("/pricing")
-async def get_pricing():
-    """Get current generation pricing"""
+def _build_pricing() -> dict:
     return {
         "plugin": PLUGIN_CREDITS,
         "datapack": DATAPACK_CREDITS,
@@ -62,10 +83,47 @@ async def get_pricing():
         "texture_categories": list(TEXTURE_CATEGORIES.keys())
     }
 
+# Pricing only changes with a deploy, so it's built once per process
+pricing_catalog = CachedDocument(_build_pricing)
+
+async def _submit_generation(user_id: str, generation_id: str, generation_type: str, tier: str, prompt: str, credits: int, input_params: dict, description: str, payload: dict):
+    """
+    Create the generation, debit its credits and queue its job.
+    With the Postgres queue all three happen in one transaction. The SQLite
+    queue is a separate store, so if queueing fails the generation is marked
+    failed and the credits are refunded: nobody pays for a job that never runs.
+    """
+    queue = get_job_queue()
+    if queue.shares_database:
+        await create_generation_with_debit(
+            user_id, generation_id, generation_type, tier, prompt, credits, input_params, description,
+            job_params=queue.job_params(generation_id, generation_type, payload, user_id)
+        )
+        return
+    
+    await create_generation_with_debit(
+        user_id, generation_id, generation_type, tier, prompt, credits, input_params, description
+    )
+    try:
+        await asyncio.to_thread(queue.enqueue, generation_id, generation_type, payload, user_id)
+    except Exception as e:
+        print(f"Could not queue generation {generation_id}, refunding: {e}")
+        get_supabase_client().table("generations").update({
+            "status": "failed",
+            "error_message": "Could not queue generation. Your credits have been refunded."
+        }).eq("id", generation_id).execute()
+        await update_user_credits(user_id, credits, "refund", f"Refund: {description}", generation_id)
+        raise
+
+@router.get("/pricing")
+async def get_pricing(request: Request):
+    """Get current generation pricing (cached; supports If-None-Match)"""
+    _, body, etag = pricing_catalog.get()
+    return conditional_response(request, body, etag, CATALOG_CACHE_CONTROL)
+
 @router.post("/plugin")
 async def generate_plugin(
     request: PluginRequest,
-    background_tasks: BackgroundTasks,
     authorization: str = Header(...)
 ):
     """Generate a Minecraft plugin"""
@@ -85,38 +143,32 @@ async def generate_plugin(
                 detail=f"Insufficient credits. Need {credits_needed}, have {profile['credits']}"
             )
         
-        # Create generation record
-        supabase = get_supabase_client()
-        generation_id = str(uuid.uuid4())
+        # Rate limits and queue backpressure, checked before anything is debited
+        await admission_controller.admit(user.id, "plugin")
         
-        supabase.table("generations").insert({
-            "id": generation_id,
-            "user_id": user.id,
-            "type": "plugin",
-            "tier": request.tier,
-            "status": "pending",
-            "prompt": request.prompt,
-            "credits_used": credits_needed,
-            "input_params": {"name": request.name}
-        }).execute()
-        
-        # Deduct credits
-        await update_user_credits(
-            user.id, 
-            -credits_needed, 
-            "usage", 
-            f"Plugin generation ({request.tier})",
-            generation_id
-        )
+        # Create generation record, deduct credits and queue the job
+        generation_id = str(uuid.uuid4())
         
-        # Queue generation
-        background_tasks.add_task(
-            generator_service.generate_plugin,
-            generation_id,
-            request.prompt,
-            request.tier,
-            request.name
-        )
+        try:
+            await _submit_generation(
+                user.id,
+                generation_id,
+                "plugin",
+                request.tier,
+                request.prompt,
+                credits_needed,
+                {"name": request.name},
+                f"Plugin generation ({request.tier})",
+                {
+                    "prompt": request.prompt,
+                    "tier": request.tier,
+                    "name": request.name,
+                    "use_cache": request.use_cache
+                }
+            )
+        except Exception:
+            admission_controller.refund(user.id, "plugin", 1)
+            raise
         
         return {
             "generation_id": generation_id,
@@ -125,6 +177,14 @@ async def generate_plugin(
             "message": "Plugin generation started. Check status for updates."
         }
         
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)} if e.retry_after else None
+        )
+    except InsufficientCreditsError as e:
+        raise HTTPException(status_code=402, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except HTTPException:
@@ -135,7 +195,6 @@ async def generate_plugin(
 @router.post("/datapack")
 async def generate_datapack(
     request: DatapackRequest,
-    background_tasks: BackgroundTasks,
     authorization: str = Header(...)
 ):
     """Generate a Minecraft datapack"""
@@ -155,38 +214,32 @@ async def generate_datapack(
                 detail=f"Insufficient credits. Need {credits_needed}, have {profile['credits']}"
             )
         
-        # Create generation record
-        supabase = get_supabase_client()
-        generation_id = str(uuid.uuid4())
+        # Rate limits and queue backpressure, checked before anything is debited
+        await admission_controller.admit(user.id, "datapack")
         
-        supabase.table("generations").insert({
-            "id": generation_id,
-            "user_id": user.id,
-            "type": "datapack",
-            "tier": request.tier,
-            "status": "pending",
-            "prompt": request.prompt,
-            "credits_used": credits_needed,
-            "input_params": {"name": request.name}
-        }).execute()
-        
-        # Deduct credits
-        await update_user_credits(
-            user.id, 
-            -credits_needed, 
-            "usage", 
-            f"Datapack generation ({request.tier})",
-            generation_id
-        )
+        # Create generation record, deduct credits and queue the job
+        generation_id = str(uuid.uuid4())
         
-        # Queue generation
-        background_tasks.add_task(
-            generator_service.generate_datapack,
-            generation_id,
-            request.prompt,
-            request.tier,
-            request.name
-        )
+        try:
+            await _submit_generation(
+                user.id,
+                generation_id,
+                "datapack",
+                request.tier,
+                request.prompt,
+                credits_needed,
+                {"name": request.name},
+                f"Datapack generation ({request.tier})",
+                {
+                    "prompt": request.prompt,
+                    "tier": request.tier,
+                    "name": request.name,
+                    "use_cache": request.use_cache
+                }
+            )
+        except Exception:
+            admission_controller.refund(user.id, "datapack", 1)
+            raise
         
         return {
             "generation_id": generation_id,
@@ -195,6 +248,14 @@ async def generate_datapack(
             "message": "Datapack generation started. Check status for updates."
         }
         
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)} if e.retry_after else None
+        )
+    except InsufficientCreditsError as e:
+        raise HTTPException(status_code=402, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except HTTPException:
@@ -205,7 +266,6 @@ async def generate_datapack(
 @router.post("/texture-pack")
 async def generate_texture_pack(
     request: TexturePackRequest,
-    background_tasks: BackgroundTasks,
     authorization: str = Header(...)
 ):
     """Generate custom Minecraft textures"""
@@ -223,8 +283,8 @@ async def generate_texture_pack(
         if texture_count == 0:
             raise HTTPException(status_code=400, detail="No textures specified")
         
-        if texture_count > 100:
-            raise HTTPException(status_code=400, detail="Maximum 100 textures per request")
+        if texture_count > MAX_TEXTURES_PER_REQUEST:
+            raise HTTPException(status_code=400, detail=f"Maximum {MAX_TEXTURES_PER_REQUEST} textures per request")
         
         credits_needed = get_credits_for_texture_count(texture_count)
         
@@ -238,42 +298,36 @@ async def generate_texture_pack(
                 detail=f"Insufficient credits. Need {credits_needed}, have {profile['credits']}"
             )
         
-        # Create generation record
-        supabase = get_supabase_client()
-        generation_id = str(uuid.uuid4())
+        # Rate limits (one token per texture) and queue backpressure, checked before anything is debited
+        await admission_controller.admit(user.id, "texture_pack", texture_count)
         
-        supabase.table("generations").insert({
-            "id": generation_id,
-            "user_id": user.id,
-            "type": "texture_pack",
-            "tier": f"{texture_count}_textures",
-            "status": "pending",
-            "prompt": request.style_description,
-            "credits_used": credits_needed,
-            "input_params": {
-                "name": request.name,
-                "textures": expanded_textures,
-                "original_input": request.textures
-            }
-        }).execute()
-        
-        # Deduct credits
-        await update_user_credits(
-            user.id, 
-            -credits_needed, 
-            "usage", 
-            f"Texture pack generation ({texture_count} textures)",
-            generation_id
-        )
+        # Create generation record, deduct credits and queue the job
+        generation_id = str(uuid.uuid4())
         
-        # Queue generation
-        background_tasks.add_task(
-            generator_service.generate_texture_pack,
-            generation_id,
-            request.style_description,
-            expanded_textures,
-            request.name
-        )
+        try:
+            await _submit_generation(
+                user.id,
+                generation_id,
+                "texture_pack",
+                f"{texture_count}_textures",
+                request.style_description,
+                credits_needed,
+                {
+                    "name": request.name,
+                    "textures": expanded_textures,
+                    "original_input": request.textures
+                },
+                f"Texture pack generation ({texture_count} textures)",
+                {
+                    "style_description": request.style_description,
+                    "textures": expanded_textures,
+                    "name": request.name,
+                    "use_cache": request.use_cache
+                }
+            )
+        except Exception:
+            admission_controller.refund(user.id, "texture_pack", texture_count)
+            raise
         
         return {
             "generation_id": generation_id,
@@ -283,6 +337,53 @@ async def generate_texture_pack(
             "message": "Texture pack generation started. Check status for updates."
         }
         
+    except AdmissionError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)} if e.retry_after else None
+        )
+    except InsufficientCreditsError as e:
+        raise HTTPException(status_code=402, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/status")
+async def get_generation_statuses(
+    request: StatusBatchRequest,
+    authorization: str = Header(...)
+):
+    """
+    Status of several generations in one request.
+    Returns {"generations": {id: status row}, "missing": [ids not found]}
+    """
+    try:
+        ids = list(dict.fromkeys(request.ids))
+        if not ids:
+            return {"generations": {}, "missing": []}
+        if len(ids) > MAX_STATUS_BATCH:
+            raise HTTPException(status_code=400, detail=f"Maximum {MAX_STATUS_BATCH} generations per request")
+        
+        user = await get_user_from_token(authorization)
+        supabase = get_supabase_client()
+        
+        response = supabase.table("generations")\
+            .select(STATUS_COLUMNS)\
+            .eq("user_id", user.id)\
+            .in_("id", ids)\
+            .execute()
+        
+        rows = await asyncio.to_thread(_add_queue_positions, response.data)
+        generations = {row["id"]: row for row in rows}
+        return {
+            "generations": generations,
+            "missing": [generation_id for generation_id in ids if generation_id not in generations]
+        }
+        
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except HTTPException:
@@ -310,7 +411,137 @@ async def get_generation_status(
         if not response.data:
             raise HTTPException(status_code=404, detail="Generation not found")
         
-        return response.data
+        return (await asyncio.to_thread(_add_queue_positions, [response.data]))[0]
+        
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _add_queue_positions(generations: list) -> list:
+    """
+    Add queue_position and estimated_start_at to the generations that haven't
+    started yet, with one queue lookup for all of them. Blocking; run it off the loop.
+    """
+    pending = [generation["id"] for generation in generations if generation.get("status") == "pending"]
+    positions = get_job_queue().queue_positions(pending) if pending else {}
+    for generation in generations:
+        queued = positions.get(generation["id"])
+        if queued:
+            generation["queue_position"] = queued["queue_position"]
+            generation["estimated_start_at"] = estimated_start(queued["ahead_seconds"])
+    return generations
+
+def _fetch_status(generation_id: str, user_id: str) -> dict:
+    """Projected status row for one of the user's generations"""
+    supabase = get_supabase_client()
+    response = supabase.table("generations")\
+        .select(STATUS_COLUMNS)\
+        .eq("id", generation_id)\
+        .eq("user_id", user_id)\
+        .maybe_single()\
+        .execute()
+    
+    if not response or not response.data:
+        raise HTTPException(status_code=404, detail="Generation not found")
+    return _add_queue_positions([response.data])[0]
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.get("/{generation_id}/events")
+async def stream_generation_events(
+    generation_id: str,
+    authorization: str = Header(...)
+):
+    """
+    Server-Sent Events stream of a generation's status and progress.
+    Sends a `snapshot` first, then `status`/`progress` events, and closes
+    once the generation completes or fails. The token goes in the
+    Authorization header (never the URL, where it would end up in logs),
+    so clients read the stream with fetch rather than EventSource.
+    """
+    try:
+        user = await get_user_from_token(authorization)
+        
+        # Subscribe before reading the snapshot so no transition falls in between
+        queue = await event_bus.subscribe(generation_id)
+        try:
+            snapshot = await asyncio.to_thread(_fetch_status, generation_id, user.id)
+        except Exception:
+            event_bus.unsubscribe(generation_id, queue)
+            raise
+        
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def stream():
+        try:
+            yield _sse("snapshot", snapshot)
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                yield _sse(event["type"], event)
+                if event["type"] == "status" and event["status"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            event_bus.unsubscribe(generation_id, queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{generation_id}/wait")
+async def wait_for_generation(
+    generation_id: str,
+    since_status: Optional[str] = None,
+    timeout: float = Query(25.0, ge=1.0, le=60.0),
+    authorization: str = Header(...)
+):
+    """
+    Long-poll fallback for clients that can't hold an SSE stream.
+    Returns immediately if the status differs from `since_status`, otherwise
+    waits up to `timeout` seconds for the next event.
+    """
+    try:
+        user = await get_user_from_token(authorization)
+        
+        queue = await event_bus.subscribe(generation_id)
+        try:
+            generation = await asyncio.to_thread(_fetch_status, generation_id, user.id)
+            if generation["status"] != since_status or generation["status"] in TERMINAL_STATUSES:
+                return {"generation": generation, "events": []}
+            
+            events = []
+            try:
+                events.append(await asyncio.wait_for(queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                pass
+            while not queue.empty():
+                events.append(queue.get_nowait())
+        finally:
+            event_bus.unsubscribe(generation_id, queue)
+        
+        # Only re-read the row if the status actually moved
+        if any(event["type"] == "status" for event in events):
+            generation = await asyncio.to_thread(_fetch_status, generation_id, user.id)
+        
+        return {"generation": generation, "events": events}
         
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
@@ -0,0 +1,28 @@
+import json
+import hashlib
+from fastapi import Request, Response
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body"""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names this ETag (weak comparison, per RFC 9110)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+def conditional_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """The JSON body with its validators, or an empty 304 if the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def json_response(request: Request, content, cache_control: str) -> Response:
+    """Serialize content and answer conditionally on its ETag"""
+    body = json.dumps(content, separators=(",", ":"), default=str).encode()
+    return conditional_response(request, body, make_etag(body), cache_control)
@@ -0,0 +1,69 @@
+import uuid
+import base64
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException
+
+# History pages are per-user and change as soon as something new happens,
+# so clients revalidate every time (a matching ETag costs no body)
+HISTORY_CACHE_CONTROL = "private, no-cache"
+
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(row: dict) -> str:
+    """Opaque cursor pointing just past a row, by (created_at, id)"""
+    return base64.urlsafe_b64encode(f"{row['created_at']}|{row['id']}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """(created_at, id) from a cursor made by encode_cursor, or a 400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        # Both end up in a PostgREST filter, so only accept what we issued
+        datetime.fromisoformat(created_at)
+        row_id = str(uuid.UUID(row_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, row_id
+
+def select_columns(default: list[str], optional: list[str], fields: Optional[str]) -> str:
+    """
+    Column list for a history query: the default projection plus any of the
+    optional columns named in the comma-separated `fields` parameter.
+    """
+    columns = list(default)
+    for field in (fields or "").split(","):
+        field = field.strip()
+        if not field or field in columns:
+            continue
+        if field not in optional:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown field '{field}'. Available: {', '.join(optional)}"
+            )
+        columns.append(field)
+    return ",".join(columns)
+
+def page_query(query, limit: int, cursor: Optional[str]):
+    """
+    Newest-first keyset page: rows strictly before the cursor in
+    (created_at, id) order, plus one extra row to tell if there's a next page.
+    Unlike an offset, the cost doesn't grow with how far back the page is.
+    """
+    # The postgrest client pinned by supabase 2.0.3 has no or_() and sends each
+    # order() as its own parameter, so both go on the query string directly
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query.params = query.params.add(
+            "or",
+            f'(created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id}))'
+        )
+    query.params = query.params.add("order", "created_at.desc,id.desc")
+    return query.limit(limit + 1)
+
+def page_result(rows: list, limit: int) -> tuple[list, Optional[str]]:
+    """Trim the extra row fetched by page_query; returns (rows, next_cursor)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1])
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, HTTPException, Header, Request, Query
 from pydantic import BaseModel
 from typing import Optional
 
@@ -7,9 +7,27 @@ from services.supabase_client import (
     get_user_profile,
     get_supabase_client
 )
+from api.http_cache import json_response
+from api.pagination import (
+    HISTORY_CACHE_CONTROL,
+    MAX_PAGE_SIZE,
+    select_columns,
+    page_query,
+    page_result
+)
 
 router = APIRouter()
 
+# History rows carry only what the dashboard lists; the rest is opt-in via ?fields=
+GENERATION_COLUMNS = [
+    "id", "type", "tier", "status", "prompt_preview", "credits_used",
+    "file_url", "file_name", "file_size", "error_message",
+    "created_at", "completed_at", "expires_at"
+]
+GENERATION_OPTIONAL_COLUMNS = ["prompt", "input_params", "output_metadata", "ai_model_used", "ai_tokens_used"]
+TRANSACTION_COLUMNS = ["id", "amount", "type", "description", "generation_id", "created_at"]
+TRANSACTION_OPTIONAL_COLUMNS = ["stripe_payment_id"]
+
 class UserProfile(BaseModel):
     id: str
     discord_username: Optional[str]
@@ -32,27 +50,30 @@ async def get_current_user(authorization: str = Header(...)):
 
 @router.get("/me/generations")
 async def get_user_generations(
+    request: Request,
     authorization: str = Header(...),
-    limit: int = 20,
-    offset: int = 0
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """Get user's generation history"""
+    """Get user's generation history, newest first. Pass next_cursor back as cursor for the next page."""
     try:
         user = await get_user_from_token(authorization)
         supabase = get_supabase_client()
         
-        response = supabase.table("generations")\
-            .select("*")\
-            .eq("user_id", user.id)\
-            .order("created_at", desc=True)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+        query = supabase.table("generations")\
+            .select(select_columns(GENERATION_COLUMNS, GENERATION_OPTIONAL_COLUMNS, fields))\
+            .eq("user_id", user.id)
+        response = page_query(query, limit, cursor).execute()
+        generations, next_cursor = page_result(response.data, limit)
         
-        return {
-            "generations": response.data,
+        return json_response(request, {
+            "generations": generations,
             "limit": limit,
-            "offset": offset
-        }
+            "next_cursor": next_cursor
+        }, HISTORY_CACHE_CONTROL)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
@@ -60,27 +81,30 @@ async def get_user_generations(
 
 @router.get("/me/transactions")
 async def get_user_transactions(
+    request: Request,
     authorization: str = Header(...),
-    limit: int = 50,
-    offset: int = 0
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """Get user's credit transaction history"""
+    """Get user's credit transaction history, newest first"""
     try:
         user = await get_user_from_token(authorization)
         supabase = get_supabase_client()
         
-        response = supabase.table("credit_transactions")\
-            .select("*")\
-            .eq("user_id", user.id)\
-            .order("created_at", desc=True)\
-            .range(offset, offset + limit - 1)\
-            .execute()
+        query = supabase.table("credit_transactions")\
+            .select(select_columns(TRANSACTION_COLUMNS, TRANSACTION_OPTIONAL_COLUMNS, fields))\
+            .eq("user_id", user.id)
+        response = page_query(query, limit, cursor).execute()
+        transactions, next_cursor = page_result(response.data, limit)
         
-        return {
-            "transactions": response.data,
+        return json_response(request, {
+            "transactions": transactions,
             "limit": limit,
-            "offset": offset
-        }
+            "next_cursor": next_cursor
+        }, HISTORY_CACHE_CONTROL)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
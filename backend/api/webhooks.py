@@ -1,19 +1,27 @@
 from fastapi import APIRouter, HTTPException, Request, Header
+from typing import Optional
 import os
-import stripe
+import hmac
 
-from services.supabase_client import get_supabase_client, update_user_credits
+from services.supabase_client import (
+    get_supabase_client,
+    update_user_credits,
+    invalidate_user_profile
+)
+from services.catalog import invalidate_catalog
+from services.stripe_client import get_stripe
 
 router = APIRouter()
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 webhook_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
+catalog_webhook_secret = os.getenv("CATALOG_WEBHOOK_SECRET")
 
 @router.post("/stripe")
 async def stripe_webhook(request: Request):
     """Handle Stripe webhook events"""
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
+    stripe = get_stripe()
     
     try:
         event = stripe.Webhook.construct_event(
@@ -35,6 +43,19 @@ async def stripe_webhook(request: Request):
     
     return {"status": "success"}
 
+@router.post("/catalog")
+async def catalog_webhook(x_webhook_secret: Optional[str] = Header(None)):
+    """
+    Drop this process's cached credit packages and pricing.
+    Point a Supabase database webhook on credit_packages here (with the
+    X-Webhook-Secret header set) so price edits show up immediately.
+    """
+    if not catalog_webhook_secret or not hmac.compare_digest(x_webhook_secret or "", catalog_webhook_secret):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    
+    invalidate_catalog()
+    return {"status": "success"}
+
 async def handle_successful_payment(session: dict):
     """Process successful payment and add credits"""
     metadata = session.get("metadata", {})
@@ -85,5 +106,6 @@ async def handle_successful_payment(session: dict):
     supabase.table("profiles").update({
         "total_spent": current_spent + amount_paid
     }).eq("id", user_id).execute()
+    invalidate_user_profile(user_id)
     
     print(f"Added {total_credits} credits to user {user_id}")
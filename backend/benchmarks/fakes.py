@@ -0,0 +1,300 @@
+import os
+import time
+import uuid
+import hashlib
+import asyncio
+import threading
+from datetime import datetime
+import httpx
+from postgrest.exceptions import APIError
+
+class FakeResponse:
+    """Mimics the postgrest APIResponse fields the backend reads"""
+    
+    def __init__(self, data, count: int = None):
+        self.data = data
+        self.count = count
+
+class FakeQuery:
+    """
+    Chainable query against one FakeSupabase table.
+    Supports the filters and modifiers the backend uses; execute() applies them.
+    """
+    
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.operation = "select"
+        self.columns = None
+        self.values = None
+        self.filters = []
+        self.ordering = []
+        self.row_limit = None
+        self.row_offset = 0
+        self.count_mode = None
+        self.mode = "many"  # many, single, maybe_single
+    
+    def select(self, columns: str = "*", count: str = None):
+        self.columns = None if columns.strip() == "*" else [column.strip() for column in columns.split(",")]
+        self.count_mode = count
+        return self
+    
+    def insert(self, values):
+        self.operation, self.values = "insert", values
+        return self
+    
+    def upsert(self, values, **kwargs):
+        self.operation, self.values = "upsert", values
+        return self
+    
+    def update(self, values: dict):
+        self.operation, self.values = "update", values
+        return self
+    
+    def delete(self):
+        self.operation = "delete"
+        return self
+    
+    def eq(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+    
+    def neq(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) != value)
+        return self
+    
+    def in_(self, column: str, values: list):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+    
+    def lt(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+    
+    def lte(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] <= value)
+        return self
+    
+    def gt(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] > value)
+        return self
+    
+    def gte(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+    
+    def order(self, column: str, desc: bool = False):
+        self.ordering.append((column, desc))
+        return self
+    
+    def limit(self, count: int):
+        self.row_limit = count
+        return self
+    
+    def range(self, start: int, end: int):
+        self.row_offset, self.row_limit = start, end - start + 1
+        return self
+    
+    def single(self):
+        self.mode = "single"
+        return self
+    
+    def maybe_single(self):
+        self.mode = "maybe_single"
+        return self
+    
+    def _project(self, row: dict) -> dict:
+        if self.columns is None:
+            return dict(row)
+        return {column: row.get(column) for column in self.columns}
+    
+    def execute(self):
+        self.client.wait()
+        with self.client.lock:
+            rows = self.client.tables.setdefault(self.table, [])
+            
+            if self.operation in ("insert", "upsert"):
+                values = self.values if isinstance(self.values, list) else [self.values]
+                inserted = []
+                for value in values:
+                    row = {"id": str(uuid.uuid4()), "created_at": datetime.utcnow().isoformat(), **value}
+                    if self.operation == "upsert":
+                        rows[:] = [existing for existing in rows if existing.get("id") != row["id"]]
+                    rows.append(row)
+                    inserted.append(dict(row))
+                return FakeResponse(inserted)
+            
+            matched = [row for row in rows if all(test(row) for test in self.filters)]
+            
+            if self.operation == "update":
+                for row in matched:
+                    row.update(self.values)
+                return FakeResponse([dict(row) for row in matched])
+            
+            if self.operation == "delete":
+                rows[:] = [row for row in rows if row not in matched]
+                return FakeResponse([dict(row) for row in matched])
+            
+            for column, desc in reversed(self.ordering):
+                matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            count = len(matched) if self.count_mode else None
+            end = None if self.row_limit is None else self.row_offset + self.row_limit
+            matched = [self._project(row) for row in matched[self.row_offset:end]]
+        
+        if self.mode == "single":
+            if len(matched) != 1:
+                raise APIError({"message": "JSON object requested, multiple (or no) rows returned", "code": "PGRST116"})
+            return FakeResponse(matched[0], count)
+        if self.mode == "maybe_single":
+            return FakeResponse(matched[0], count) if matched else None
+        return FakeResponse(matched, count)
+
+class FakeRPC:
+    def __init__(self, client: "FakeSupabase", name: str, params: dict):
+        self.client = client
+        self.name = name
+        self.params = params
+    
+    def execute(self):
+        self.client.wait()
+        handler = getattr(self.client, f"_rpc_{self.name}", None)
+        if handler is None:
+            raise APIError({"message": f"Unknown function {self.name}", "code": "PGRST202"})
+        with self.client.lock:
+            return FakeResponse(handler(**self.params))
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the Supabase client.
+    
+    Tables are lists of dicts. The credit functions from migrations/003 are
+    reimplemented in Python. Every call sleeps `latency` seconds first, on the
+    calling thread, like the real (synchronous) client's network round trip.
+    """
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables = {}
+        self.lock = threading.RLock()
+    
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+    
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+    
+    def rpc(self, name: str, params: dict) -> FakeRPC:
+        return FakeRPC(self, name, params)
+    
+    def add_profile(self, user_id: str, credits: int):
+        with self.lock:
+            self.tables.setdefault("profiles", []).append({
+                "id": user_id,
+                "discord_username": None,
+                "avatar_url": None,
+                "credits": credits,
+                "total_spent": 0,
+                "total_credits_purchased": 0,
+                "created_at": datetime.utcnow().isoformat()
+            })
+    
+    def _profile(self, user_id: str) -> dict:
+        for row in self.tables.get("profiles", []):
+            if row["id"] == user_id:
+                return row
+        raise APIError({"message": "User profile not found", "code": "P0002"})
+    
+    def _rpc_apply_credit_transaction(self, p_user_id, p_amount, p_type, p_description, p_generation_id=None, p_stripe_payment_id=None):
+        profile = self._profile(p_user_id)
+        if profile["credits"] + p_amount < 0:
+            raise APIError({"message": "Insufficient credits", "code": "P0001"})
+        profile["credits"] += p_amount
+        self.tables.setdefault("credit_transactions", []).append({
+            "id": str(uuid.uuid4()),
+            "user_id": p_user_id,
+            "amount": p_amount,
+            "type": p_type,
+            "description": p_description,
+            "generation_id": p_generation_id,
+            "stripe_payment_id": p_stripe_payment_id,
+            "created_at": datetime.utcnow().isoformat()
+        })
+        return profile["credits"]
+    
+    def _rpc_create_generation_with_debit(self, p_generation_id, p_user_id, p_type, p_tier, p_prompt, p_credits, p_input_params, p_description):
+        self._profile(p_user_id)
+        self.tables.setdefault("generations", []).append({
+            "id": p_generation_id,
+            "user_id": p_user_id,
+            "type": p_type,
+            "tier": p_tier,
+            "status": "pending",
+            "prompt": p_prompt,
+            "credits_used": p_credits,
+            "input_params": p_input_params,
+            "created_at": datetime.utcnow().isoformat()
+        })
+        return self._rpc_apply_credit_transaction(p_user_id, -p_credits, "usage", p_description, p_generation_id)
+
+class FakeR2Client:
+    """Stand-in for the boto3 S3 client pointed at R2: uploads are read and counted, not stored"""
+    
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects = {}  # key -> size in bytes
+        self.lock = threading.Lock()
+    
+    def upload_fileobj(self, fileobj, bucket: str, key: str):
+        size = len(fileobj.read())
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.objects[key] = size
+
+class FakeReplicate:
+    """Stand-in for the replicate module: `run` returns a URL served by image_transport"""
+    
+    def __init__(self, latency: float = 0.0, image_bytes: int = 4096):
+        self.latency = latency
+        self.image_bytes = image_bytes
+        self.runs = 0
+    
+    def run(self, version: str, input: dict) -> list:
+        if self.latency:
+            time.sleep(self.latency)
+        self.runs += 1
+        digest = hashlib.sha256(repr(sorted(input.items())).encode()).hexdigest()[:16]
+        return [f"https://replicate.delivery/fake/{digest}.png"]
+    
+    def image_transport(self) -> httpx.MockTransport:
+        """Transport for the generator's HTTP client that answers image downloads locally"""
+        image = b"\x89PNG\r\n\x1a\n" + os.urandom(max(0, self.image_bytes - 8))
+        return httpx.MockTransport(lambda request: httpx.Response(200, content=image))
+
+class FakeCompiler:
+    """Stand-in for PluginCompiler: waits `latency` seconds and writes a placeholder jar"""
+    
+    def __init__(self, latency: float = 0.0, jar_bytes: int = 16384):
+        self.latency = latency
+        self.jar_bytes = jar_bytes
+    
+    async def compile(self, project_dir: str) -> dict:
+        start = time.monotonic()
+        await asyncio.sleep(self.latency)
+        
+        target_dir = os.path.join(project_dir, "target")
+        os.makedirs(target_dir, exist_ok=True)
+        jar_path = os.path.join(target_dir, "plugin.jar")
+        with open(jar_path, 'wb') as f:
+            f.write(os.urandom(self.jar_bytes))
+        
+        return {
+            "jar_path": jar_path,
+            "duration": round(time.monotonic() - start, 2),
+            "diagnostics": []
+        }
+    
+    async def warm_up(self):
+        pass
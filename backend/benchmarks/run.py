@@ -0,0 +1,350 @@
+"""
+Offline load benchmark for the backend.
+
+Boots the FastAPI app from main.py in-process with local stand-ins for
+Supabase, R2, Replicate, the Maven compiler and both LLM providers, runs a
+worker on its own thread and event loop (standing in for the separate worker
+process), and has simulated users submit a mix of plugins, datapacks and
+texture packs and poll their status until they finish.
+
+Reports throughput, request latency percentiles, end-to-end generation time
+and event-loop lag for both the API and the worker. Nothing leaves the box,
+so it runs in CI without any credentials:
+    
+    cd backend
+    python -m benchmarks.run --duration 30 --users 20 --mix plugin=1,datapack=3,texture_pack=1
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import threading
+from collections import defaultdict, Counter
+
+from benchmarks.fakes import FakeSupabase, FakeR2Client, FakeReplicate, FakeCompiler
+
+JWT_SECRET = "blocksmith-benchmark-secret"
+TERMINAL_STATUSES = {"completed", "failed"}
+LAG_SAMPLE_INTERVAL = 0.05
+
+PROMPTS = {
+    "plugin": "A plugin that adds a /home command with configurable cooldowns",
+    "datapack": "A datapack that adds a crafting recipe for saddles",
+    "texture_pack": "Dark fantasy style with deep purples and glowing accents"
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput and latency benchmark")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to keep submitting (in-flight generations are then drained)")
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated users")
+    parser.add_argument("--mix", default="plugin=2,datapack=5,texture_pack=1", help="relative weight of each generation type")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between a user's status polls")
+    parser.add_argument("--prompt-pool", type=int, default=25, help="distinct prompts per type (repeats exercise caching and coalescing)")
+    parser.add_argument("--textures-per-pack", type=int, default=8)
+    parser.add_argument("--worker-concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=300, help="seconds before a user gives up on a generation")
+    parser.add_argument("--rate-limits", action="store_true", help="keep the per-user rate limits (off by default so a few users can load the system)")
+    parser.add_argument("--max-active-jobs", type=int, default=200, help="global queued+running cap before submissions get 503")
+    parser.add_argument("--ai-latency", type=float, default=1.0, help="LLM time to first token, uncached")
+    parser.add_argument("--payload-bytes", type=int, default=8192, help="approximate size of generated plugin/datapack sources")
+    parser.add_argument("--supabase-latency", type=float, default=0.005)
+    parser.add_argument("--r2-latency", type=float, default=0.05)
+    parser.add_argument("--replicate-latency", type=float, default=1.0)
+    parser.add_argument("--image-bytes", type=int, default=4096)
+    parser.add_argument("--compile-latency", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    return parser.parse_args(argv)
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in PROMPTS:
+            raise SystemExit(f"Unknown generation type in --mix: {kind}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+def configure_environment(args, workdir: str):
+    """Point every external dependency at a local stand-in (must run before the app is imported)"""
+    os.environ.update({
+        "SUPABASE_URL": "http://supabase.invalid",
+        "SUPABASE_SERVICE_KEY": "benchmark",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "AI_FAKE_PROVIDER": "true",
+        "FAKE_AI_LATENCY": str(args.ai_latency),
+        "FAKE_AI_PAYLOAD_BYTES": str(args.payload_bytes),
+        "JOB_QUEUE_BACKEND": "sqlite",
+        "JOB_QUEUE_PATH": os.path.join(workdir, "jobs.db"),
+        "RESULT_CACHE_DIR": os.path.join(workdir, "results"),
+        "IMAGE_CACHE_DIR": os.path.join(workdir, "images"),
+        "R2_BUCKET_NAME": "benchmark",
+        "WORKER_CONCURRENCY": str(args.worker_concurrency),
+        "WORKER_POLL_INTERVAL": "0.05",
+        "WORKER_METRICS_PORT": "0",
+        "MAX_ACTIVE_JOBS": str(args.max_active_jobs)
+    })
+    if not args.rate_limits:
+        for name in ("PLUGIN", "DATAPACK", "TEXTURES"):
+            os.environ[f"RATE_LIMIT_{name}_BURST"] = "1000000"
+            os.environ[f"RATE_LIMIT_{name}_PER_MINUTE"] = "1000000"
+
+async def monitor_loop_lag(samples: list):
+    """Record how late the event loop wakes a sleeper; blocking calls on the loop show up here"""
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(LAG_SAMPLE_INTERVAL)
+        samples.append(time.monotonic() - started - LAG_SAMPLE_INTERVAL)
+
+class WorkerThread(threading.Thread):
+    """Runs worker.Worker on its own event loop with the R2/Replicate fakes installed"""
+    
+    def __init__(self, r2_client: FakeR2Client, replicate_client: FakeReplicate):
+        super().__init__(name="benchmark-worker", daemon=True)
+        self.r2_client = r2_client
+        self.replicate_client = replicate_client
+        self.lag = []
+        self.ready = threading.Event()
+    
+    def run(self):
+        asyncio.run(self._main())
+    
+    async def _main(self):
+        import httpx
+        from worker import Worker
+        
+        self.loop = asyncio.get_running_loop()
+        self.worker = Worker()
+        service = self.worker.generator_service
+        service.r2_client = self.r2_client
+        service.replicate_client = self.replicate_client
+        await service.http_client.aclose()
+        service.http_client = httpx.AsyncClient(transport=self.replicate_client.image_transport())
+        
+        lag_task = asyncio.create_task(monitor_loop_lag(self.lag))
+        self.ready.set()
+        try:
+            await self.worker.run()
+        finally:
+            lag_task.cancel()
+            await service.close()
+    
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.worker.stop)
+        self.join()
+
+class Recorder:
+    """Collects request latencies, errors, admission rejections and generation outcomes"""
+    
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.rejections = Counter()  # 429/503 status code -> count
+        self.generations = defaultdict(list)  # type -> [(status, seconds)]
+    
+    async def request(self, label: str, call):
+        started = time.monotonic()
+        try:
+            response = await call
+        except Exception as e:
+            self.latencies[label].append(time.monotonic() - started)
+            self.errors[label] += 1
+            print(f"{label} raised: {e}")
+            return None
+        self.latencies[label].append(time.monotonic() - started)
+        if response.status_code in (429, 503):
+            self.rejections[response.status_code] += 1
+        elif response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+def submission(kind: str, rng: random.Random, args, textures: list) -> tuple[str, dict]:
+    """Request path and body for one generation of the given type"""
+    prompt = f"{PROMPTS[kind]} (variant {rng.randrange(args.prompt_pool)})"
+    if kind == "plugin":
+        return "/api/generations/plugin", {"prompt": prompt, "tier": rng.choice(["simple", "medium", "complex"])}
+    if kind == "datapack":
+        return "/api/generations/datapack", {"prompt": prompt, "tier": rng.choice(["simple", "medium", "complex"])}
+    return "/api/generations/texture-pack", {
+        "style_description": prompt,
+        "textures": rng.sample(textures, min(args.textures_per_pack, len(textures)))
+    }
+
+async def simulate_user(client, token: str, rng: random.Random, args, mix: dict, textures: list, deadline: float, recorder: Recorder):
+    """Submit generations back to back, polling each until it finishes"""
+    headers = {"Authorization": f"Bearer {token}"}
+    kinds, weights = list(mix), list(mix.values())
+    
+    while time.monotonic() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        path, body = submission(kind, rng, args, textures)
+        started = time.monotonic()
+        
+        response = await recorder.request(f"POST {kind}", client.post(path, json=body, headers=headers))
+        if response is None or response.status_code != 200:
+            # Back off as told when admission control turns us away
+            retry_after = args.poll_interval
+            if response is not None and "Retry-After" in response.headers:
+                retry_after = float(response.headers["Retry-After"])
+            await asyncio.sleep(max(0, min(retry_after, deadline - time.monotonic())))
+            continue
+        generation_id = response.json()["generation_id"]
+        
+        status = "pending"
+        while status not in TERMINAL_STATUSES and time.monotonic() - started < args.timeout:
+            await asyncio.sleep(args.poll_interval)
+            response = await recorder.request(
+                "POST status",
+                client.post("/api/generations/status", json={"ids": [generation_id]}, headers=headers)
+            )
+            if response is not None and response.status_code == 200:
+                status = response.json()["generations"][generation_id]["status"]
+        
+        recorder.generations[kind].append((status, time.monotonic() - started))
+
+def summarize(values: list) -> dict:
+    from services.model_stats import percentile
+    
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": percentile(values, 0.5),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values)
+    }
+
+async def run_benchmark(args) -> dict:
+    import jwt
+    import httpx
+    from services import supabase_client
+    
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    
+    # Install the fakes before anything can build a real client
+    supabase = FakeSupabase(args.supabase_latency)
+    supabase_client.get_supabase_client.cache_clear()
+    supabase_client.create_client = lambda url, key: supabase
+    
+    import main
+    from services import generator
+    from services.ai_router import ai_router
+    from prompts.texture_prompts import TEXTURE_CATEGORIES
+    
+    r2_client = FakeR2Client(args.r2_latency)
+    replicate_client = FakeReplicate(args.replicate_latency, args.image_bytes)
+    generator.plugin_compiler = FakeCompiler(args.compile_latency)
+    
+    textures = sorted({texture for category in TEXTURE_CATEGORIES.values() for texture in category})
+    tokens = []
+    for index in range(args.users):
+        user_id = f"00000000-0000-4000-8000-{index:012d}"
+        supabase.add_profile(user_id, 10 ** 9)
+        tokens.append(jwt.encode(
+            {"sub": user_id, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + 86400},
+            JWT_SECRET,
+            algorithm="HS256"
+        ))
+    
+    worker_thread = WorkerThread(r2_client, replicate_client)
+    worker_thread.start()
+    worker_thread.ready.wait()
+    
+    recorder = Recorder()
+    api_lag = []
+    async with main.lifespan(main.app):
+        lag_task = asyncio.create_task(monitor_loop_lag(api_lag))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            started = time.monotonic()
+            deadline = started + args.duration
+            await asyncio.gather(*[
+                simulate_user(client, token, random.Random(rng.random()), args, mix, textures, deadline, recorder)
+                for token in tokens
+            ])
+            elapsed = time.monotonic() - started
+        lag_task.cancel()
+        await asyncio.to_thread(worker_thread.stop)
+    
+    outcomes = Counter(status for results in recorder.generations.values() for status, _ in results)
+    requests = sum(len(latencies) for latencies in recorder.latencies.values())
+    return {
+        "config": vars(args),
+        "elapsed": elapsed,
+        "generations": dict(outcomes),
+        "generations_per_second": outcomes["completed"] / elapsed,
+        "requests": requests,
+        "requests_per_second": requests / elapsed,
+        "request_errors": dict(recorder.errors),
+        "admission_rejections": dict(recorder.rejections),
+        "request_latency": {label: summarize(values) for label, values in sorted(recorder.latencies.items())},
+        "generation_latency": {
+            kind: summarize([seconds for status, seconds in results if status == "completed"])
+            for kind, results in sorted(recorder.generations.items())
+        },
+        "loop_lag": {"api": summarize(api_lag), "worker": summarize(worker_thread.lag)},
+        "ai_usage": ai_router.usage_stats(),
+        "uploads": len(r2_client.objects),
+        "texture_renders": replicate_client.runs
+    }
+
+def print_report(results: dict):
+    def row(label: str, stats: dict, scale: float, unit: str):
+        if not stats["count"]:
+            print(f"  {label:<24} {0:>7}")
+            return
+        print(
+            f"  {label:<24} {stats['count']:>7} "
+            + " ".join(f"{stats[key] * scale:>9.1f}" for key in ("p50", "p95", "p99", "max"))
+            + f"  {unit}"
+        )
+    
+    header = f"  {'':<24} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}"
+    
+    print(f"\nRan for {results['elapsed']:.1f}s")
+    print(f"Generations: {results['generations']} ({results['generations_per_second']:.2f} completed/s)")
+    print(f"HTTP requests: {results['requests']} ({results['requests_per_second']:.1f}/s), errors: {results['request_errors'] or 'none'}")
+    print(f"Admission rejections: {results['admission_rejections'] or 'none'}")
+    print(f"Uploads: {results['uploads']}, texture renders: {results['texture_renders']}")
+    
+    print("\nRequest latency")
+    print(header)
+    for label, stats in results["request_latency"].items():
+        row(label, stats, 1000, "ms")
+    
+    print("\nEnd-to-end generation time (completed)")
+    print(header)
+    for kind, stats in results["generation_latency"].items():
+        row(kind, stats, 1, "s")
+    
+    print("\nEvent loop lag")
+    print(header)
+    for loop, stats in results["loop_lag"].items():
+        row(loop, stats, 1000, "ms")
+    
+    print("\nAI usage")
+    for model, usage in results["ai_usage"].items():
+        print(f"  {model}: {usage['calls']} calls, {usage['cached_input_ratio']:.0%} of input tokens cached")
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(args, workdir)
+        results = asyncio.run(run_benchmark(args))
+    
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    
+    # Fail CI runs where nothing got through
+    return 0 if results["generations"].get("completed") else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
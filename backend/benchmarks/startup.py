@@ -0,0 +1,196 @@
+"""
+Cold start benchmark for the API.
+
+Starts a fresh interpreter for every run (so nothing is already imported),
+and in it times importing main.py, the lifespan startup and the first and
+second call to a few endpoints, plus how long each provider/storage SDK takes
+the first time something uses it. Supabase is replaced by the in-memory fake
+once main is imported; nothing leaves the box.
+
+Runs both with clients built on first use (the default) and with
+APP_WARM_UP=true, which moves that cost into startup:
+    
+    cd backend
+    python -m benchmarks.startup --runs 5
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+JWT_SECRET = "blocksmith-benchmark-secret"
+USER_ID = "00000000-0000-4000-8000-000000000001"
+MODES = {"lazy": "false", "warm": "true"}
+
+# Endpoints timed on their first and second call
+PROBE_REQUESTS = [
+    ("GET /health", "/health", False),
+    ("GET pricing", "/api/generations/pricing", False),
+    ("GET packages", "/api/credits/packages", False),
+    ("GET users/me", "/api/users/me", True)
+]
+
+# Modules whose presence after `import main` means something was loaded eagerly
+SDK_MODULES = ["anthropic", "google.generativeai", "replicate", "boto3", "stripe", "supabase"]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="API import and first-request latency benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode")
+    parser.add_argument("--modes", default="lazy,warm", help="lazy (APP_WARM_UP=false) and/or warm (APP_WARM_UP=true)")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def probe_environment(workdir: str, warm_up: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "SUPABASE_URL": "http://supabase.invalid",
+        "SUPABASE_SERVICE_KEY": "benchmark",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "AI_FAKE_PROVIDER": "true",
+        "JOB_QUEUE_BACKEND": "sqlite",
+        "JOB_QUEUE_PATH": os.path.join(workdir, "jobs.db"),
+        "RESULT_CACHE_DIR": os.path.join(workdir, "results"),
+        "IMAGE_CACHE_DIR": os.path.join(workdir, "images"),
+        "APP_WARM_UP": warm_up
+    })
+    return env
+
+async def probe() -> dict:
+    """One cold start, measured from inside the fresh interpreter"""
+    started = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - started
+    eager = [module for module in SDK_MODULES if module in sys.modules]
+    
+    import jwt
+    import httpx
+    from benchmarks.fakes import FakeSupabase
+    from services import supabase_client, stripe_client
+    from services.ai_router import ai_router, _genai
+    
+    supabase = FakeSupabase()
+    supabase.add_profile(USER_ID, 100)
+    supabase.tables["credit_packages"] = [{
+        "id": "starter", "name": "Starter", "credits": 100, "bonus_credits": 0,
+        "price_cents": 499, "is_active": True, "sort_order": 1
+    }]
+    supabase_client.get_supabase_client.cache_clear()
+    supabase_client.create_client = lambda url, key: supabase
+    
+    token = jwt.encode(
+        {"sub": USER_ID, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + 3600},
+        JWT_SECRET,
+        algorithm="HS256"
+    )
+    
+    requests = {}
+    started = time.perf_counter()
+    async with main.lifespan(main.app):
+        startup_seconds = time.perf_counter() - started
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for label, path, authenticated in PROBE_REQUESTS:
+                headers = {"Authorization": f"Bearer {token}"} if authenticated else {}
+                timings = []
+                for _ in range(2):
+                    started = time.perf_counter()
+                    response = await client.get(path, headers=headers)
+                    timings.append(time.perf_counter() - started)
+                    response.raise_for_status()
+                requests[label] = {"first": timings[0], "second": timings[1]}
+    
+    # What the first checkout, Claude call and Gemini call pay to load their SDK
+    first_use = {}
+    for label, load in (
+        ("stripe", stripe_client.get_stripe),
+        ("claude", lambda: ai_router.anthropic_client),
+        ("gemini", _genai)
+    ):
+        started = time.perf_counter()
+        load()
+        first_use[label] = time.perf_counter() - started
+    
+    return {
+        "import": import_seconds,
+        "startup": startup_seconds,
+        "requests": requests,
+        "first_use": first_use,
+        "eager_sdks": eager
+    }
+
+def run_probe(env: dict) -> dict:
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--probe"],
+        env=env,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Probe failed:\n{completed.stderr}")
+    # The app prints while starting up; the result is the last line
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def run_benchmark(args) -> dict:
+    # Only the parent needs this; the probes must start with nothing imported
+    from benchmarks.run import summarize
+    
+    results = {"config": {"runs": args.runs, "modes": args.modes}, "modes": {}}
+    for mode in args.modes.split(","):
+        if mode not in MODES:
+            raise SystemExit(f"Unknown mode: {mode}")
+        
+        probes = []
+        with tempfile.TemporaryDirectory() as workdir:
+            for _ in range(args.runs):
+                probes.append(run_probe(probe_environment(workdir, MODES[mode])))
+        
+        timings = {
+            "import main": [probe["import"] for probe in probes],
+            "lifespan startup": [probe["startup"] for probe in probes]
+        }
+        for label, _, _ in PROBE_REQUESTS:
+            timings[f"{label} (1st)"] = [probe["requests"][label]["first"] for probe in probes]
+            timings[f"{label} (2nd)"] = [probe["requests"][label]["second"] for probe in probes]
+        for label in probes[0]["first_use"]:
+            timings[f"first {label} use"] = [probe["first_use"][label] for probe in probes]
+        
+        results["modes"][mode] = {
+            "timings": {label: summarize(values) for label, values in timings.items()},
+            "eager_sdks": sorted({module for probe in probes for module in probe["eager_sdks"]})
+        }
+    return results
+
+def print_report(results: dict):
+    header = f"  {'':<28} {'count':>7} {'p50':>9} {'p95':>9} {'max':>9}"
+    for mode, mode_results in results["modes"].items():
+        print(f"\n{mode} (APP_WARM_UP={MODES[mode]})")
+        print(f"SDKs loaded by `import main`: {', '.join(mode_results['eager_sdks']) or 'none'}")
+        print(header)
+        for label, stats in mode_results["timings"].items():
+            print(
+                f"  {label:<28} {stats['count']:>7} "
+                + " ".join(f"{stats[key] * 1000:>9.1f}" for key in ("p50", "p95", "max"))
+                + "  ms"
+            )
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.probe:
+        print(json.dumps(asyncio.run(probe())))
+        return 0
+    
+    results = run_benchmark(args)
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
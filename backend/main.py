@@ -1,21 +1,48 @@
-from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
+import time
+import asyncio
 from dotenv import load_dotenv
 
+# Load .env before importing modules that read configuration at import time
+load_dotenv()
+
 from api import generations, credits, webhooks, users
 from services.supabase_client import get_supabase_client
+from services.stripe_client import get_stripe
+from services.ai_router import ai_router
+from services.events import event_bus
+from services.job_queue import get_job_queue
+from services.metrics import HTTP_REQUEST_SECONDS, QUEUE_JOBS
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
-load_dotenv()
+# Provider and storage SDKs load on first use. With APP_WARM_UP=true they load
+# during startup instead, so the first requests don't pay for it (at the cost
+# of a slower start).
+APP_WARM_UP = os.getenv("APP_WARM_UP", "false").lower() == "true"
+
+def warm_up():
+    """Import the SDKs and build every client the API uses"""
+    get_supabase_client()
+    get_stripe()
+    ai_router.warm_up()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("BlockSmith AI Backend Starting...")
+    if APP_WARM_UP:
+        started = time.monotonic()
+        await asyncio.to_thread(warm_up)
+        print(f"Warmed up in {time.monotonic() - started:.2f}s")
+    event_bus.start()
     yield
     # Shutdown
     print("BlockSmith AI Backend Shutting Down...")
+    await event_bus.stop()
+    await ai_router.close()
 
 app = FastAPI(
     title="BlockSmith AI",
@@ -34,8 +61,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "ETag"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.monotonic()
+    response = await call_next(request)
+    
+    # Label by route template (not the raw path) to keep the series count bounded
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.labels(
+        request.method,
+        route.path if route else "unmatched",
+        response.status_code
+    ).observe(time.monotonic() - started)
+    return response
+
 # Include routers
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(generations.router, prefix="/api/generations", tags=["generations"])
@@ -53,3 +95,11 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    counts = await asyncio.to_thread(get_job_queue().counts)
+    for state in ("queued", "running"):
+        QUEUE_JOBS.labels(state).set(counts.get(state, 0))
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
@@ -0,0 +1,88 @@
+-- BlockSmith AI - Durable generation job queue
+-- Run this in Supabase SQL Editor after 001_initial_schema.sql
+
+CREATE TABLE public.generation_jobs (
+    id UUID DEFAULT uuid_generate_v4() PRIMARY KEY,
+    generation_id UUID REFERENCES public.generations(id) ON DELETE CASCADE NOT NULL,
+    job_type TEXT NOT NULL, -- 'plugin', 'datapack', 'texture_pack'
+    payload JSONB DEFAULT '{}'::jsonb NOT NULL,
+    status TEXT DEFAULT 'queued' NOT NULL, -- 'queued', 'running', 'completed', 'dead'
+    attempts INTEGER DEFAULT 0 NOT NULL,
+    max_attempts INTEGER DEFAULT 3 NOT NULL,
+    locked_by TEXT, -- worker id holding the lease
+    lease_expires_at TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX idx_generation_jobs_status ON public.generation_jobs(status, created_at);
+CREATE INDEX idx_generation_jobs_lease ON public.generation_jobs(lease_expires_at) WHERE status = 'running';
+
+-- Only the service role (API and workers) touches the queue
+ALTER TABLE public.generation_jobs ENABLE ROW LEVEL SECURITY;
+
+CREATE TRIGGER update_generation_jobs_updated_at
+    BEFORE UPDATE ON public.generation_jobs
+    FOR EACH ROW EXECUTE FUNCTION public.update_updated_at();
+
+-- Claim the oldest runnable job: queued, or running with an expired lease
+CREATE OR REPLACE FUNCTION public.lease_generation_job(p_worker_id TEXT, p_lease_seconds INTEGER)
+RETURNS SETOF public.generation_jobs AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE public.generation_jobs
+    SET status = 'running',
+        attempts = attempts + 1,
+        locked_by = p_worker_id,
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE id = (
+        SELECT id FROM public.generation_jobs
+        WHERE attempts < max_attempts
+          AND (status = 'queued' OR (status = 'running' AND lease_expires_at < NOW()))
+        ORDER BY created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Record a failed attempt, re-queueing until max_attempts is reached
+CREATE OR REPLACE FUNCTION public.fail_generation_job(p_job_id UUID, p_worker_id TEXT, p_error TEXT)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE public.generation_jobs
+    SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'dead' END,
+        last_error = p_error,
+        locked_by = NULL,
+        lease_expires_at = NULL
+    WHERE id = p_job_id AND locked_by = p_worker_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Mark jobs whose lease expired on their final attempt as dead
+CREATE OR REPLACE FUNCTION public.reap_generation_jobs()
+RETURNS TABLE (generation_id UUID) AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE public.generation_jobs j
+    SET status = 'dead',
+        locked_by = NULL,
+        lease_expires_at = NULL,
+        last_error = 'Lease expired'
+    WHERE j.status = 'running'
+      AND j.lease_expires_at < NOW()
+      AND j.attempts >= j.max_attempts
+    RETURNING j.generation_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- These run as SECURITY DEFINER (bypassing RLS), so only the service role may
+-- call them; clients must not lease other users' jobs or read their payloads
+REVOKE EXECUTE ON FUNCTION public.lease_generation_job(TEXT, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.fail_generation_job(UUID, TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.reap_generation_jobs() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.lease_generation_job(TEXT, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION public.fail_generation_job(UUID, TEXT, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.reap_generation_jobs() TO service_role;
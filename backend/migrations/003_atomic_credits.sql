@@ -0,0 +1,71 @@
+-- BlockSmith AI - Atomic credit operations
+-- Run this in Supabase SQL Editor after 002_generation_jobs.sql
+--
+-- Balance checks, ledger rows and generation records are written in a single
+-- transaction so concurrent submissions can't overdraw or lose updates.
+--
+-- Both functions run as SECURITY DEFINER (bypassing RLS), so only the service
+-- role may call them; otherwise anyone with the anon key could mint credits.
+
+-- Apply a credit change and record it in the ledger. Returns the new balance.
+CREATE OR REPLACE FUNCTION public.apply_credit_transaction(
+    p_user_id UUID,
+    p_amount INTEGER,
+    p_type TEXT,
+    p_description TEXT,
+    p_generation_id UUID DEFAULT NULL,
+    p_stripe_payment_id TEXT DEFAULT NULL
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_credits INTEGER;
+BEGIN
+    UPDATE public.profiles
+    SET credits = credits + p_amount
+    WHERE id = p_user_id AND credits + p_amount >= 0
+    RETURNING credits INTO v_credits;
+
+    IF NOT FOUND THEN
+        IF EXISTS (SELECT 1 FROM public.profiles WHERE id = p_user_id) THEN
+            RAISE EXCEPTION 'Insufficient credits' USING ERRCODE = 'P0001';
+        END IF;
+        RAISE EXCEPTION 'User profile not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    INSERT INTO public.credit_transactions (user_id, amount, type, description, generation_id, stripe_payment_id)
+    VALUES (p_user_id, p_amount, p_type, p_description, p_generation_id, p_stripe_payment_id);
+
+    RETURN v_credits;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Debit credits, record the ledger row and create the pending generation. Returns the new balance.
+CREATE OR REPLACE FUNCTION public.create_generation_with_debit(
+    p_generation_id UUID,
+    p_user_id UUID,
+    p_type TEXT,
+    p_tier TEXT,
+    p_prompt TEXT,
+    p_credits INTEGER,
+    p_input_params JSONB,
+    p_description TEXT
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_credits INTEGER;
+BEGIN
+    INSERT INTO public.generations (id, user_id, type, tier, status, prompt, credits_used, input_params)
+    VALUES (p_generation_id, p_user_id, p_type, p_tier, 'pending', p_prompt, p_credits, p_input_params);
+
+    v_credits := public.apply_credit_transaction(
+        p_user_id, -p_credits, 'usage', p_description, p_generation_id, NULL
+    );
+
+    RETURN v_credits;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.apply_credit_transaction(UUID, INTEGER, TEXT, TEXT, UUID, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.create_generation_with_debit(UUID, UUID, TEXT, TEXT, TEXT, INTEGER, JSONB, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.apply_credit_transaction(UUID, INTEGER, TEXT, TEXT, UUID, TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.create_generation_with_debit(UUID, UUID, TEXT, TEXT, TEXT, INTEGER, JSONB, TEXT) TO service_role;
@@ -0,0 +1,17 @@
+-- BlockSmith AI - Generation progress events
+-- Run this in Supabase SQL Editor after 003_atomic_credits.sql
+--
+-- Workers append status/progress events here; each API process relays them
+-- to connected clients over SSE / long-poll. Old rows are pruned by workers.
+
+CREATE TABLE public.generation_events (
+    id BIGSERIAL PRIMARY KEY,
+    generation_id UUID REFERENCES public.generations(id) ON DELETE CASCADE NOT NULL,
+    event JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX idx_generation_events_created_at ON public.generation_events(created_at);
+
+-- Only the service role (API and workers) touches the event log
+ALTER TABLE public.generation_events ENABLE ROW LEVEL SECURITY;
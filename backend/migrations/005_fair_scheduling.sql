@@ -0,0 +1,120 @@
+-- BlockSmith AI - Fair scheduling of generation jobs
+-- Run this in Supabase SQL Editor after 004_generation_events.sql
+--
+-- Jobs get a lane ('fast' for short jobs) and a self-clocked fair queueing
+-- finish tag when enqueued (see services/scheduler.py). Workers lease the
+-- lowest tag in the lanes they have room for, so short jobs aren't stuck
+-- behind long ones and no single user's backlog holds up everyone else.
+
+ALTER TABLE public.generation_jobs
+    ADD COLUMN user_id UUID REFERENCES public.profiles(id) ON DELETE SET NULL,
+    ADD COLUMN lane TEXT DEFAULT 'normal' NOT NULL, -- 'fast', 'normal'
+    ADD COLUMN cost DOUBLE PRECISION DEFAULT 0 NOT NULL, -- expected seconds
+    ADD COLUMN finish_tag DOUBLE PRECISION DEFAULT 0 NOT NULL;
+
+CREATE INDEX idx_generation_jobs_schedule ON public.generation_jobs(status, lane, finish_tag);
+CREATE INDEX idx_generation_jobs_user ON public.generation_jobs(user_id, status);
+
+-- Add a job with its fair queueing tag. Returns the job id.
+CREATE OR REPLACE FUNCTION public.enqueue_generation_job(
+    p_generation_id UUID,
+    p_job_type TEXT,
+    p_payload JSONB,
+    p_max_attempts INTEGER,
+    p_user_id UUID,
+    p_lane TEXT,
+    p_cost DOUBLE PRECISION
+)
+RETURNS UUID AS $$
+DECLARE
+    v_virtual_time DOUBLE PRECISION;
+    v_user_last_tag DOUBLE PRECISION;
+    v_job_id UUID;
+BEGIN
+    -- Serialize enqueues so tags stay consistent
+    PERFORM pg_advisory_xact_lock(hashtext('generation_jobs_enqueue'));
+
+    -- Virtual time is the tag at the head of the queue (or the last tag handed out)
+    SELECT COALESCE(
+        (SELECT MIN(finish_tag) FROM public.generation_jobs WHERE status = 'queued'),
+        (SELECT MAX(finish_tag) FROM public.generation_jobs),
+        0
+    ) INTO v_virtual_time;
+
+    SELECT MAX(finish_tag) INTO v_user_last_tag
+    FROM public.generation_jobs
+    WHERE user_id = p_user_id AND status IN ('queued', 'running');
+
+    INSERT INTO public.generation_jobs (generation_id, job_type, payload, max_attempts, user_id, lane, cost, finish_tag)
+    VALUES (
+        p_generation_id, p_job_type, p_payload, p_max_attempts, p_user_id, p_lane, p_cost,
+        GREATEST(v_virtual_time, COALESCE(v_user_last_tag, 0)) + p_cost
+    )
+    RETURNING id INTO v_job_id;
+
+    RETURN v_job_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Leasing now takes the lowest finish tag, optionally only from some lanes
+DROP FUNCTION IF EXISTS public.lease_generation_job(TEXT, INTEGER);
+
+CREATE OR REPLACE FUNCTION public.lease_generation_job(
+    p_worker_id TEXT,
+    p_lease_seconds INTEGER,
+    p_lanes TEXT[] DEFAULT NULL
+)
+RETURNS SETOF public.generation_jobs AS $$
+BEGIN
+    RETURN QUERY
+    UPDATE public.generation_jobs
+    SET status = 'running',
+        attempts = attempts + 1,
+        locked_by = p_worker_id,
+        lease_expires_at = NOW() + make_interval(secs => p_lease_seconds)
+    WHERE id = (
+        SELECT id FROM public.generation_jobs
+        WHERE attempts < max_attempts
+          AND (status = 'queued' OR (status = 'running' AND lease_expires_at < NOW()))
+          AND (p_lanes IS NULL OR lane = ANY(p_lanes))
+        ORDER BY finish_tag, created_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Position (1 = next) and expected seconds of work ahead of a queued generation.
+-- Fast-lane jobs only queue behind other fast-lane jobs.
+CREATE OR REPLACE FUNCTION public.generation_queue_position(p_generation_id UUID)
+RETURNS TABLE (queue_position BIGINT, ahead_seconds DOUBLE PRECISION, lane TEXT) AS $$
+DECLARE
+    v_lane TEXT;
+    v_tag DOUBLE PRECISION;
+BEGIN
+    SELECT j.lane, j.finish_tag INTO v_lane, v_tag
+    FROM public.generation_jobs j
+    WHERE j.generation_id = p_generation_id AND j.status = 'queued';
+
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT COUNT(*) + 1, COALESCE(SUM(j.cost), 0), v_lane
+    FROM public.generation_jobs j
+    WHERE j.status = 'queued'
+      AND j.finish_tag < v_tag
+      AND (v_lane <> 'fast' OR j.lane = 'fast');
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Service role only (see 002_generation_jobs.sql); the recreated lease function
+-- starts with default privileges again, so it's revoked here too
+REVOKE EXECUTE ON FUNCTION public.enqueue_generation_job(UUID, TEXT, JSONB, INTEGER, UUID, TEXT, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.lease_generation_job(TEXT, INTEGER, TEXT[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.generation_queue_position(UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.enqueue_generation_job(UUID, TEXT, JSONB, INTEGER, UUID, TEXT, DOUBLE PRECISION) TO service_role;
+GRANT EXECUTE ON FUNCTION public.lease_generation_job(TEXT, INTEGER, TEXT[]) TO service_role;
+GRANT EXECUTE ON FUNCTION public.generation_queue_position(UUID) TO service_role;
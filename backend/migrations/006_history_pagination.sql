@@ -0,0 +1,15 @@
+-- BlockSmith AI - Keyset pagination for history endpoints
+-- Run this in Supabase SQL Editor after 005_fair_scheduling.sql
+--
+-- History pages are read newest first by (created_at, id) with a cursor
+-- instead of an offset (see api/pagination.py). These indexes match that
+-- order per user so every page is a short index range scan.
+
+CREATE INDEX idx_generations_user_history ON public.generations(user_id, created_at DESC, id DESC);
+CREATE INDEX idx_credit_transactions_user_history ON public.credit_transactions(user_id, created_at DESC, id DESC);
+CREATE INDEX idx_credit_transactions_user_purchases ON public.credit_transactions(user_id, created_at DESC, id DESC)
+    WHERE type = 'purchase';
+
+-- Short prompt for history lists, so they don't have to load the full prompt
+ALTER TABLE public.generations
+    ADD COLUMN prompt_preview TEXT GENERATED ALWAYS AS (LEFT(prompt, 200)) STORED;
@@ -0,0 +1,40 @@
+-- BlockSmith AI - Queue generation jobs in the same transaction as the debit
+-- Run this in Supabase SQL Editor after 006_history_pagination.sql
+--
+-- With JOB_QUEUE_BACKEND=postgres the job lives in the same database as the
+-- credits, so the generation row, the debit and the job are written together:
+-- a user is never charged for a generation that didn't get queued.
+
+CREATE OR REPLACE FUNCTION public.create_generation_job_with_debit(
+    p_generation_id UUID,
+    p_user_id UUID,
+    p_type TEXT,
+    p_tier TEXT,
+    p_prompt TEXT,
+    p_credits INTEGER,
+    p_input_params JSONB,
+    p_description TEXT,
+    p_job_type TEXT,
+    p_payload JSONB,
+    p_max_attempts INTEGER,
+    p_lane TEXT,
+    p_cost DOUBLE PRECISION
+)
+RETURNS INTEGER AS $$
+DECLARE
+    v_credits INTEGER;
+BEGIN
+    v_credits := public.create_generation_with_debit(
+        p_generation_id, p_user_id, p_type, p_tier, p_prompt, p_credits, p_input_params, p_description
+    );
+
+    PERFORM public.enqueue_generation_job(
+        p_generation_id, p_job_type, p_payload, p_max_attempts, p_user_id, p_lane, p_cost
+    );
+
+    RETURN v_credits;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.create_generation_job_with_debit(UUID, UUID, TEXT, TEXT, TEXT, INTEGER, JSONB, TEXT, TEXT, JSONB, INTEGER, TEXT, DOUBLE PRECISION) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_generation_job_with_debit(UUID, UUID, TEXT, TEXT, TEXT, INTEGER, JSONB, TEXT, TEXT, JSONB, INTEGER, TEXT, DOUBLE PRECISION) TO service_role;
@@ -0,0 +1,24 @@
+-- BlockSmith AI - Queue positions for several generations in one call
+-- Run this in Supabase SQL Editor after 007_atomic_enqueue.sql
+--
+-- Status polling asks for the position of every pending generation it
+-- returns; this answers for all of them in one query instead of one RPC each.
+
+CREATE OR REPLACE FUNCTION public.generation_queue_positions(p_generation_ids UUID[])
+RETURNS TABLE (generation_id UUID, queue_position BIGINT, ahead_seconds DOUBLE PRECISION, lane TEXT) AS $$
+    -- Fast-lane jobs only queue behind other fast-lane jobs
+    SELECT j.generation_id, COUNT(o.id) + 1, COALESCE(SUM(o.cost), 0), j.lane
+    FROM public.generation_jobs j
+    LEFT JOIN public.generation_jobs o
+        ON o.status = 'queued'
+       AND o.finish_tag < j.finish_tag
+       AND (j.lane <> 'fast' OR o.lane = 'fast')
+    WHERE j.generation_id = ANY(p_generation_ids) AND j.status = 'queued'
+    GROUP BY j.id, j.generation_id, j.lane;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Replaced by the batch version above
+DROP FUNCTION IF EXISTS public.generation_queue_position(UUID);
+
+REVOKE EXECUTE ON FUNCTION public.generation_queue_positions(UUID[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.generation_queue_positions(UUID[]) TO service_role;
@@ -26,20 +26,18 @@ You must respond with ONLY valid JSON in this exact format:
 
 DO NOT include any text outside the JSON. DO NOT use markdown code blocks. ONLY output the raw JSON object."""
 
-DATAPACK_SIMPLE_PROMPT = """Create a simple Minecraft datapack with the following requirements:
-
-{user_prompt}
+DATAPACK_SIMPLE_PROMPT = """Create a simple Minecraft datapack.
 
 Requirements for this tier:
 - Basic functionality (recipes, simple advancements, or loot table modifications)
 - Minimal file structure
 - Clear, functional implementation
 
-Generate the complete datapack."""
+Generate the complete datapack for the following requirements:
 
-DATAPACK_MEDIUM_PROMPT = """Create a medium-complexity Minecraft datapack with the following requirements:
+{user_prompt}"""
 
-{user_prompt}
+DATAPACK_MEDIUM_PROMPT = """Create a medium-complexity Minecraft datapack.
 
 Requirements for this tier:
 - Multiple related features
@@ -48,11 +46,11 @@ Requirements for this tier:
 - Basic functions for initialization
 - Organized namespace structure
 
-Generate the complete datapack."""
+Generate the complete datapack for the following requirements:
 
-DATAPACK_COMPLEX_PROMPT = """Create a full-featured Minecraft datapack with the following requirements:
+{user_prompt}"""
 
-{user_prompt}
+DATAPACK_COMPLEX_PROMPT = """Create a full-featured Minecraft datapack.
 
 Requirements for this tier:
 - Complete feature set
@@ -64,15 +62,22 @@ Requirements for this tier:
 - Tags for organization
 - Scoreboard objectives for tracking
 
-Generate the complete datapack."""
+Generate the complete datapack for the following requirements:
+
+{user_prompt}"""
+
+DATAPACK_TIER_PROMPTS = {
+    "simple": DATAPACK_SIMPLE_PROMPT,
+    "medium": DATAPACK_MEDIUM_PROMPT,
+    "complex": DATAPACK_COMPLEX_PROMPT
+}
 
 def get_datapack_prompt(tier: str, user_prompt: str) -> str:
     """Get the appropriate datapack generation prompt based on tier"""
-    prompts = {
-        "simple": DATAPACK_SIMPLE_PROMPT,
-        "medium": DATAPACK_MEDIUM_PROMPT,
-        "complex": DATAPACK_COMPLEX_PROMPT
-    }
-    
-    template = prompts.get(tier, DATAPACK_SIMPLE_PROMPT)
+    template = DATAPACK_TIER_PROMPTS.get(tier, DATAPACK_SIMPLE_PROMPT)
     return template.format(user_prompt=user_prompt)
+
+def get_datapack_prompt_prefix(tier: str) -> str:
+    """The static start of a tier's prompt (everything before the user's request), cacheable by providers"""
+    template = DATAPACK_TIER_PROMPTS.get(tier, DATAPACK_SIMPLE_PROMPT)
+    return template[:template.index("{user_prompt}")]
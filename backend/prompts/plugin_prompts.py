@@ -40,9 +40,7 @@ You must respond with ONLY valid JSON in this exact format:
 
 DO NOT include any text outside the JSON. DO NOT use markdown code blocks. ONLY output the raw JSON object."""
 
-PLUGIN_SIMPLE_PROMPT = """Create a simple Spigot/Paper plugin with the following requirements:
-
-{user_prompt}
+PLUGIN_SIMPLE_PROMPT = """Create a simple Spigot/Paper plugin.
 
 Requirements for this tier:
 - Single main class is preferred
@@ -51,11 +49,11 @@ Requirements for this tier:
 - 1-2 commands maximum
 - Include helpful comments
 
-Generate the complete plugin code."""
+Generate the complete plugin code for the following requirements:
 
-PLUGIN_MEDIUM_PROMPT = """Create a medium-complexity Spigot/Paper plugin with the following requirements:
+{user_prompt}"""
 
-{user_prompt}
+PLUGIN_MEDIUM_PROMPT = """Create a medium-complexity Spigot/Paper plugin.
 
 Requirements for this tier:
 - Organized class structure (separate classes for commands, listeners)
@@ -65,11 +63,11 @@ Requirements for this tier:
 - Data persistence (YAML or SQLite)
 - Include comprehensive comments
 
-Generate the complete plugin code."""
+Generate the complete plugin code for the following requirements:
 
-PLUGIN_COMPLEX_PROMPT = """Create a full-featured Spigot/Paper plugin with the following requirements:
+{user_prompt}"""
 
-{user_prompt}
+PLUGIN_COMPLEX_PROMPT = """Create a full-featured Spigot/Paper plugin.
 
 Requirements for this tier:
 - Professional package structure
@@ -84,15 +82,22 @@ Requirements for this tier:
 - Metrics (bStats) placeholder
 - Include comprehensive JavaDoc comments
 
-Generate the complete plugin code."""
+Generate the complete plugin code for the following requirements:
+
+{user_prompt}"""
+
+PLUGIN_TIER_PROMPTS = {
+    "simple": PLUGIN_SIMPLE_PROMPT,
+    "medium": PLUGIN_MEDIUM_PROMPT,
+    "complex": PLUGIN_COMPLEX_PROMPT
+}
 
 def get_plugin_prompt(tier: str, user_prompt: str) -> str:
     """Get the appropriate plugin generation prompt based on tier"""
-    prompts = {
-        "simple": PLUGIN_SIMPLE_PROMPT,
-        "medium": PLUGIN_MEDIUM_PROMPT,
-        "complex": PLUGIN_COMPLEX_PROMPT
-    }
-    
-    template = prompts.get(tier, PLUGIN_SIMPLE_PROMPT)
+    template = PLUGIN_TIER_PROMPTS.get(tier, PLUGIN_SIMPLE_PROMPT)
     return template.format(user_prompt=user_prompt)
+
+def get_plugin_prompt_prefix(tier: str) -> str:
+    """The static start of a tier's prompt (everything before the user's request), cacheable by providers"""
+    template = PLUGIN_TIER_PROMPTS.get(tier, PLUGIN_SIMPLE_PROMPT)
+    return template[:template.index("{user_prompt}")]
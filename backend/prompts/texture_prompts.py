@@ -30,12 +30,7 @@ DO NOT include any text outside the JSON. DO NOT use markdown code blocks. ONLY
 
 IMPORTANT: Only generate prompts for the specific textures the user requests. Do not add extra textures."""
 
-TEXTURE_GENERATION_PROMPT = """Create image generation prompts for custom Minecraft textures with the following requirements:
-
-Style/Theme: {style_description}
-
-Textures to generate:
-{texture_list}
+TEXTURE_GENERATION_PROMPT = """Create image generation prompts for custom Minecraft textures.
 
 For each texture:
 - Create a detailed prompt for a 16x16 pixel art texture
@@ -44,7 +39,12 @@ For each texture:
 - Describe shading and detail level
 - Include a negative prompt to avoid common issues
 
-Generate prompts for ONLY the textures listed above. Use the correct Minecraft resource pack paths (e.g., "assets/minecraft/textures/block/stone.png")."""
+Generate prompts for ONLY the textures listed below. Use the correct Minecraft resource pack paths (e.g., "assets/minecraft/textures/block/stone.png").
+
+Style/Theme: {style_description}
+
+Textures to generate:
+{texture_list}"""
 
 # Common texture categories for user reference
 TEXTURE_CATEGORIES = {
@@ -113,6 +113,10 @@ def get_texture_prompt(style_description: str, texture_list: list) -> str:
         texture_list="\n".join(f"- {t}" for t in formatted_textures)
     )
 
+def get_texture_prompt_prefix() -> str:
+    """The static start of the texture prompt (everything before the user's input), cacheable by providers"""
+    return TEXTURE_GENERATION_PROMPT[:TEXTURE_GENERATION_PROMPT.index("{style_description}")]
+
 def expand_texture_category(category: str) -> list:
     """Expand a category name into its texture list"""
     return TEXTURE_CATEGORIES.get(category.lower(), [])
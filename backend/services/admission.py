@@ -0,0 +1,166 @@
+import os
+import math
+import time
+import asyncio
+import threading
+
+from services.ttl_cache import TTLCache
+from services.job_queue import get_job_queue
+from services.metrics import ADMISSION_REJECTIONS
+
+# Per-user token buckets, one per generation type: (burst, refill per minute).
+# Plugins and datapacks cost one token per generation, texture packs one per texture.
+RATE_LIMITS = {
+    "plugin": (
+        float(os.getenv("RATE_LIMIT_PLUGIN_BURST", "5")),
+        float(os.getenv("RATE_LIMIT_PLUGIN_PER_MINUTE", "2"))
+    ),
+    "datapack": (
+        float(os.getenv("RATE_LIMIT_DATAPACK_BURST", "10")),
+        float(os.getenv("RATE_LIMIT_DATAPACK_PER_MINUTE", "6"))
+    ),
+    "texture_pack": (
+        float(os.getenv("RATE_LIMIT_TEXTURES_BURST", "150")),
+        float(os.getenv("RATE_LIMIT_TEXTURES_PER_MINUTE", "50"))
+    )
+}
+RATE_LIMIT_MAX_USERS = int(os.getenv("RATE_LIMIT_MAX_USERS", "100000"))
+
+# Largest single submission, in tokens, for each type
+MAX_TEXTURES_PER_REQUEST = 100
+MAX_COST = {"plugin": 1, "datapack": 1, "texture_pack": MAX_TEXTURES_PER_REQUEST}
+
+def _check_rate_limits():
+    """Refuse to start with a bucket that never refills or can't hold the largest request"""
+    for generation_type, (burst, per_minute) in RATE_LIMITS.items():
+        if per_minute <= 0:
+            raise ValueError(f"Rate limit for {generation_type} must refill more than 0 tokens per minute")
+        if burst < MAX_COST[generation_type]:
+            raise ValueError(
+                f"Rate limit burst for {generation_type} ({burst:g}) is below the largest "
+                f"request ({MAX_COST[generation_type]}), which could never be admitted"
+            )
+
+_check_rate_limits()
+
+# Global backpressure: refuse new work while this many jobs are queued or running
+MAX_ACTIVE_JOBS = int(os.getenv("MAX_ACTIVE_JOBS", "200"))
+QUEUE_FULL_RETRY_AFTER = int(os.getenv("QUEUE_FULL_RETRY_AFTER", "30"))
+ACTIVE_JOBS_CACHE_SECONDS = 1.0
+
+class AdmissionError(Exception):
+    """A submission was refused before any credits were taken"""
+    
+    status_code = 503
+    
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        # None when retrying can't help
+        self.retry_after = max(1, math.ceil(retry_after)) if retry_after is not None else None
+
+class RateLimitedError(AdmissionError):
+    """The user has used up their allowance for this generation type"""
+    
+    status_code = 429
+
+class RequestTooLargeError(AdmissionError):
+    """The submission costs more than the user's bucket can ever hold"""
+    
+    status_code = 400
+
+class QueueFullError(AdmissionError):
+    """Too much work is queued across all users"""
+    
+    status_code = 503
+
+class AdmissionController:
+    """
+    Decides whether a generation may be submitted, before anything is debited.
+    
+    Each user gets a token bucket per generation type (RATE_LIMITS); a request
+    that would overdraw it is refused with the time until enough tokens have
+    refilled. On top of that, nothing new is accepted while MAX_ACTIVE_JOBS are
+    queued or running, so overload is turned away instead of slowing everyone.
+    
+    Buckets live in this process, so with several API replicas each enforces
+    its own limits. Buckets are dropped once they would have refilled anyway.
+    """
+    
+    def __init__(self):
+        self.buckets = TTLCache(60, RATE_LIMIT_MAX_USERS)  # (user_id, type) -> (tokens, updated_at)
+        self.lock = threading.Lock()
+        self.active_jobs = 0
+        self.active_jobs_checked_at = 0.0
+    
+    def _take(self, user_id: str, generation_type: str, cost: float):
+        """Take cost tokens from the user's bucket or raise RateLimitedError"""
+        burst, per_minute = RATE_LIMITS[generation_type]
+        rate = per_minute / 60
+        key = (user_id, generation_type)
+        
+        if cost > burst:
+            raise RequestTooLargeError(
+                f"This request needs {cost:g} rate limit tokens but at most {burst:g} "
+                f"are allowed at once. Split it into smaller requests."
+            )
+        
+        with self.lock:
+            now = time.time()
+            tokens, updated_at = self.buckets.get(key) or (burst, now)
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            
+            if cost > tokens:
+                retry_after = (cost - tokens) / rate
+                raise RateLimitedError(
+                    f"Too many {generation_type.replace('_', ' ')} generations. "
+                    f"Try again in {math.ceil(retry_after)}s.",
+                    retry_after
+                )
+            
+            tokens -= cost
+            self.buckets.set(key, (tokens, now), (burst - tokens) / rate)
+    
+    def refund(self, user_id: str, generation_type: str, cost: float):
+        """Return tokens taken for a submission that didn't go through"""
+        burst, per_minute = RATE_LIMITS[generation_type]
+        key = (user_id, generation_type)
+        with self.lock:
+            self.active_jobs = max(0, self.active_jobs - 1)
+            bucket = self.buckets.get(key)
+            if bucket:
+                tokens = min(burst, bucket[0] + cost)
+                self.buckets.set(key, (tokens, bucket[1]), (burst - tokens) / (per_minute / 60))
+    
+    async def _active_jobs(self) -> int:
+        """Queued plus running jobs, re-counted at most every ACTIVE_JOBS_CACHE_SECONDS"""
+        if time.monotonic() - self.active_jobs_checked_at > ACTIVE_JOBS_CACHE_SECONDS:
+            counts = await asyncio.to_thread(get_job_queue().counts)
+            self.active_jobs = counts.get("queued", 0) + counts.get("running", 0)
+            self.active_jobs_checked_at = time.monotonic()
+        return self.active_jobs
+    
+    async def admit(self, user_id: str, generation_type: str, cost: float = 1):
+        """
+        Check the global cap and the user's rate limit for one submission.
+        Raises QueueFullError (503), RateLimitedError (429) or, for a request
+        bigger than the whole bucket, RequestTooLargeError (400); call refund()
+        if the submission fails after this returns.
+        """
+        if await self._active_jobs() >= MAX_ACTIVE_JOBS:
+            ADMISSION_REJECTIONS.labels(generation_type, "queue_full").inc()
+            raise QueueFullError(
+                "BlockSmith is busy right now. Please try again shortly.",
+                QUEUE_FULL_RETRY_AFTER
+            )
+        
+        try:
+            self._take(user_id, generation_type, cost)
+        except RateLimitedError:
+            ADMISSION_REJECTIONS.labels(generation_type, "rate_limited").inc()
+            raise
+        
+        # Count this job until the next re-count sees it
+        self.active_jobs += 1
+
+# Singleton instance
+admission_controller = AdmissionController()
@@ -1,19 +1,145 @@
 import os
-import anthropic
-import google.generativeai as genai
+import time
+import random
+import asyncio
+import httpx
 from enum import Enum
+from functools import lru_cache
+
+from services.fake_provider import FakeProvider, FakeProviderError
+from services.model_stats import ModelStats
+from services.circuit_breaker import CircuitBreaker
+from services.metrics import AI_TOKENS_TOTAL
+
+# Per-provider concurrency and timeout settings
+CLAUDE_MAX_CONCURRENCY = int(os.getenv("CLAUDE_MAX_CONCURRENCY", "16"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+AI_REQUEST_TIMEOUT = float(os.getenv("AI_REQUEST_TIMEOUT", "180"))
+AI_CONNECT_TIMEOUT = float(os.getenv("AI_CONNECT_TIMEOUT", "10"))
+AI_STREAMING_ENABLED = os.getenv("AI_STREAMING_ENABLED", "true").lower() == "true"
+
+# Resilience: overall deadline per request, retries for transient errors and hedging
+AI_TOTAL_DEADLINE = float(os.getenv("AI_TOTAL_DEADLINE", "300"))  # seconds, across retries and hedges
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_RETRY_BASE_DELAY = float(os.getenv("AI_RETRY_BASE_DELAY", "1.0"))
+AI_RETRY_MAX_DELAY = float(os.getenv("AI_RETRY_MAX_DELAY", "10.0"))
+AI_HEDGE_ENABLED = os.getenv("AI_HEDGE_ENABLED", "false").lower() == "true"
+AI_HEDGE_DELAY = float(os.getenv("AI_HEDGE_DELAY", "20"))  # seconds without a response (or first token) before hedging
+
+# Provider models
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-20250514")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+# Answer every call from services.fake_provider instead of the real APIs (tests, offline runs)
+AI_FAKE_PROVIDER = os.getenv("AI_FAKE_PROVIDER", "false").lower() == "true"
+
+# Adaptive routing policy: cheapest eligible model meeting both targets
+ROUTING_POLICY = os.getenv("ROUTING_POLICY", "adaptive")  # static, adaptive
+ROUTING_P95_TARGET = float(os.getenv("ROUTING_P95_TARGET", "120"))  # seconds
+ROUTING_MIN_SUCCESS_RATE = float(os.getenv("ROUTING_MIN_SUCCESS_RATE", "0.9"))
+ROUTING_MIN_SAMPLES = int(os.getenv("ROUTING_MIN_SAMPLES", "10"))  # below this a model is assumed healthy
 
 class AIModel(str, Enum):
     CLAUDE = "claude"
     GEMINI = "gemini"
 
+class ProviderUnavailableError(RuntimeError):
+    """Raised when every provider that could serve a request has its circuit open"""
+
+# Errors worth retrying or failing over on; anything else is the request's fault.
+# Each provider SDK adds its own when it's first loaded (see _anthropic and _genai).
+TRANSIENT_ERRORS = (
+    asyncio.TimeoutError,
+    httpx.TransportError,
+    FakeProviderError
+)
+TRANSIENT_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+def is_transient(error: Exception) -> bool:
+    return isinstance(error, TRANSIENT_ERRORS) or getattr(error, "status_code", None) in TRANSIENT_STATUS_CODES
+
+# The provider SDKs take most of the API's import time, so they're only
+# imported once something actually calls that provider
+@lru_cache()
+def _anthropic():
+    """The anthropic SDK, imported on first use"""
+    global TRANSIENT_ERRORS
+    import anthropic
+    TRANSIENT_ERRORS += (
+        anthropic.APIConnectionError,
+        anthropic.RateLimitError,
+        anthropic.InternalServerError
+    )
+    return anthropic
+
+@lru_cache()
+def _genai():
+    """google.generativeai, imported and configured on first use"""
+    global TRANSIENT_ERRORS
+    import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    TRANSIENT_ERRORS += (
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.TooManyRequests,
+        google_exceptions.InternalServerError,
+        google_exceptions.DeadlineExceeded
+    )
+    return genai
+
+# Relative cost per call, used to order candidates
+MODEL_COSTS = {
+    AIModel.GEMINI: 1,
+    AIModel.CLAUDE: 10
+}
+
 class AIRouter:
     def __init__(self):
-        self.anthropic_client = anthropic.Anthropic(
-            api_key=os.getenv("ANTHROPIC_API_KEY")
-        )
-        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-        self.gemini_model = genai.GenerativeModel('gemini-pro')
+        # Provider clients are built on first use (see anthropic_client and _gemini_model)
+        self.http_client = None
+        self._anthropic_client = None
+        self.gemini_models = {}  # system prompt -> GenerativeModel
+        self.fake_provider = FakeProvider() if AI_FAKE_PROVIDER else None
+        
+        # Cap in-flight calls per provider so one burst can't exhaust quotas
+        self.semaphores = {
+            AIModel.CLAUDE: asyncio.Semaphore(CLAUDE_MAX_CONCURRENCY),
+            AIModel.GEMINI: asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+        }
+        
+        # Rolling latency/error/parse stats per (model, generation type)
+        self.model_stats = {}
+        self.breakers = {model: CircuitBreaker(model.value) for model in AIModel}
+        
+        # Running token totals per model, including prompt cache reads/writes
+        self.usage = {
+            model: {"calls": 0, "input_tokens": 0, "cached_input_tokens": 0, "cache_write_tokens": 0, "output_tokens": 0}
+            for model in AIModel
+        }
+    
+    @property
+    def anthropic_client(self):
+        """Claude client, created on first use"""
+        if self._anthropic_client is None:
+            # Pooled keep-alive connections shared by every Claude call
+            self.http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=CLAUDE_MAX_CONCURRENCY,
+                    max_keepalive_connections=CLAUDE_MAX_CONCURRENCY
+                ),
+                timeout=httpx.Timeout(AI_REQUEST_TIMEOUT, connect=AI_CONNECT_TIMEOUT)
+            )
+            self._anthropic_client = _anthropic().AsyncAnthropic(
+                api_key=os.getenv("ANTHROPIC_API_KEY"),
+                http_client=self.http_client,
+                timeout=AI_REQUEST_TIMEOUT
+            )
+        return self._anthropic_client
+    
+    def warm_up(self):
+        """Load both provider SDKs and build their clients now instead of on the first call"""
+        self.anthropic_client
+        _genai()
     
     def route_request(self, generation_type: str, tier: str) -> AIModel:
         """
@@ -42,44 +168,421 @@ class AIRouter:
         # Default to Claude for unknown types
         return AIModel.CLAUDE
     
-    async def generate(self, prompt: str, system_prompt: str, model: AIModel) -> tuple[str, int]:
+    def route_candidates(self, generation_type: str, tier: str) -> tuple[list, list]:
+        """
+        Models allowed to serve a request.
+        Returns (candidates, fallbacks): candidates are good enough for the
+        task; fallbacks are only used when no candidate is healthy.
+        """
+        if generation_type == "datapack" and tier == "simple":
+            return [AIModel.GEMINI, AIModel.CLAUDE], []
+        
+        if generation_type == "texture_pack":
+            return [AIModel.GEMINI, AIModel.CLAUDE], []
+        
+        # Plugins and larger datapacks need Claude unless it's degraded
+        return [AIModel.CLAUDE], [AIModel.GEMINI]
+    
+    def stats_for(self, model: AIModel, generation_type: str) -> ModelStats:
+        key = (model, generation_type)
+        if key not in self.model_stats:
+            self.model_stats[key] = ModelStats()
+        return self.model_stats[key]
+    
+    def _health_problem(self, model: AIModel, stats: dict) -> str:
+        """Why a model misses the routing targets, or None if it meets them"""
+        if not self.breakers[model].allow():
+            return "circuit open"
+        if stats["samples"] < ROUTING_MIN_SAMPLES:
+            return None
+        if stats["success_rate"] < ROUTING_MIN_SUCCESS_RATE:
+            return f"success rate {stats['success_rate']:.0%} < {ROUTING_MIN_SUCCESS_RATE:.0%}"
+        if stats["p95"] is not None and stats["p95"] > ROUTING_P95_TARGET:
+            return f"p95 {stats['p95']:.1f}s > {ROUTING_P95_TARGET:.0f}s"
+        return None
+    
+    def choose_model(self, generation_type: str, tier: str) -> tuple[AIModel, dict]:
+        """
+        Pick the model for a request under ROUTING_POLICY.
+        Returns (model, decision) where decision records the policy, the reason
+        and the stats it was based on, for storing on the generation.
+        """
+        if ROUTING_POLICY != "adaptive":
+            model = self.route_request(generation_type, tier)
+            return model, {"model": model.value, "policy": "static", "reason": "static route"}
+        
+        candidates, fallbacks = self.route_candidates(generation_type, tier)
+        ordered = sorted(candidates, key=MODEL_COSTS.get) + fallbacks
+        
+        stats = {model: self.stats_for(model, generation_type).snapshot() for model in ordered}
+        skipped = []
+        chosen = None
+        for model in ordered:
+            problem = self._health_problem(model, stats[model])
+            if problem is None:
+                chosen = model
+                break
+            skipped.append(f"{model.value} {problem}")
+        
+        if chosen is None:
+            # Nothing meets the targets; take the most reliable, then fastest
+            chosen = max(ordered, key=lambda model: (stats[model]["success_rate"], -(stats[model]["p95"] or 0)))
+            reason = "no model meets targets; most reliable"
+        elif chosen in fallbacks:
+            reason = "fallback"
+        else:
+            reason = "cheapest healthy"
+        if skipped:
+            reason += f" ({'; '.join(skipped)})"
+        
+        return chosen, {
+            "model": chosen.value,
+            "policy": "adaptive",
+            "reason": reason,
+            "stats": {model.value: stats[model] for model in ordered}
+        }
+    
+    def record_parse(self, model: AIModel, generation_type: str, ok: bool):
+        """Report whether a model's output could be parsed and validated"""
+        self.stats_for(model, generation_type).record_parse(ok)
+    
+    async def generate(self, prompt: str, system_prompt: str, model: AIModel, prompt_prefix: str = "", generation_type: str = "default") -> tuple[str, dict]:
         """
         Generate content using the specified AI model.
-        Returns (response_text, tokens_used)
+        prompt_prefix is the static start of prompt (the tier template); it's
+        marked cacheable along with the system prompt. Latency and errors are
+        recorded against generation_type for routing.
+        Returns (response_text, usage); usage["model"] is the model that answered
+        """
+        return await self._call(model, generation_type, prompt, system_prompt, prompt_prefix)
+    
+    async def generate_stream(self, prompt: str, system_prompt: str, model: AIModel, on_text, prompt_prefix: str = "", generation_type: str = "default") -> tuple[str, dict]:
+        """
+        Like `generate`, but streams the response: `on_text(chunk)` is called
+        with each piece of text as it arrives.
+        Returns (response_text, usage)
+        """
+        return await self._call(model, generation_type, prompt, system_prompt, prompt_prefix, on_text)
+    
+    def _alternate(self, model: AIModel) -> AIModel:
+        return AIModel.GEMINI if model == AIModel.CLAUDE else AIModel.CLAUDE
+    
+    async def _call(self, model: AIModel, generation_type: str, prompt: str, system_prompt: str, prompt_prefix: str, on_text=None) -> tuple[str, dict]:
+        """
+        One logical request: fails over straight away if the model's circuit
+        is open, retries transient errors, and with AI_HEDGE_ENABLED races the
+        alternate provider once the first one has been quiet for AI_HEDGE_DELAY.
+        Everything must finish within AI_TOTAL_DEADLINE.
         """
+        deadline = time.monotonic() + AI_TOTAL_DEADLINE
+        alternate = self._alternate(model)
+        
+        if not self.breakers[model].allow():
+            if not self.breakers[alternate].allow():
+                raise ProviderUnavailableError("All AI providers are temporarily unavailable")
+            print(f"{model.value} circuit open, failing over to {alternate.value}")
+            model = alternate
+        
+        request = (generation_type, prompt, system_prompt, prompt_prefix, deadline)
+        if AI_HEDGE_ENABLED and model != alternate and self.breakers[alternate].allow():
+            return await self._hedged(model, alternate, request, on_text)
+        return await self._with_retries(model, request, on_text)
+    
+    async def _with_retries(self, model: AIModel, request: tuple, on_text=None) -> tuple[str, dict]:
+        """Retry transient failures with jittered exponential backoff"""
+        deadline = request[-1]
+        attempt = 0
+        while True:
+            emitted = False
+            
+            def forward(chunk: str):
+                nonlocal emitted
+                emitted = True
+                on_text(chunk)
+            
+            try:
+                return await self._attempt(model, request, forward if on_text else None)
+            except Exception as e:
+                attempt += 1
+                # A stream that already produced text can't be replayed
+                if not is_transient(e) or emitted or attempt > AI_MAX_RETRIES or not self.breakers[model].allow():
+                    raise
+                
+                delay = min(AI_RETRY_MAX_DELAY, AI_RETRY_BASE_DELAY * 2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                if time.monotonic() + delay >= deadline:
+                    raise
+                print(f"{model.value} call failed ({type(e).__name__}: {e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    async def _hedged(self, primary: AIModel, alternate: AIModel, request: tuple, on_text=None) -> tuple[str, dict]:
+        """
+        Start on the primary model; if it hasn't answered (or, when streaming,
+        produced its first token) within AI_HEDGE_DELAY, also ask the alternate.
+        The first to succeed (or to start streaming) wins and the other is cancelled.
+        """
+        tasks = {}
+        winner = None
+        first_token = asyncio.Event()
+        
+        def forwarder(model: AIModel):
+            def forward(chunk: str):
+                nonlocal winner
+                if winner is None:
+                    winner = model
+                    first_token.set()
+                    for other, task in tasks.items():
+                        if other != model:
+                            task.cancel()
+                if winner == model:
+                    on_text(chunk)
+            return forward if on_text else None
+        
+        tasks[primary] = asyncio.create_task(self._with_retries(primary, request, forwarder(primary)))
+        token_wait = asyncio.create_task(first_token.wait())
+        try:
+            await asyncio.wait({tasks[primary], token_wait}, timeout=AI_HEDGE_DELAY, return_when=asyncio.FIRST_COMPLETED)
+            if tasks[primary].done() or first_token.is_set():
+                return await tasks[primary]
+            
+            print(f"{primary.value} quiet for {AI_HEDGE_DELAY:g}s, hedging with {alternate.value}")
+            tasks[alternate] = asyncio.create_task(self._with_retries(alternate, request, forwarder(alternate)))
+            
+            pending = set(tasks.values())
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled():
+                        continue
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            token_wait.cancel()
+            for task in tasks.values():
+                task.cancel()
+    
+    async def _attempt(self, model: AIModel, request: tuple, on_text=None) -> tuple[str, dict]:
+        """
+        A single provider call, bounded by the request deadline and by
+        AI_REQUEST_TIMEOUT: for the whole call, or when streaming for the wait
+        for the first token and between chunks, so a long stream that keeps
+        producing text isn't cut off.
+        """
+        generation_type, prompt, system_prompt, prompt_prefix, deadline = request
+        
+        if on_text:
+            last_text_at = None
+            forward = on_text
+            
+            def on_text(chunk: str):
+                nonlocal last_text_at
+                last_text_at = time.monotonic()
+                forward(chunk)
+        
+        breaker = self.breakers[model]
+        # Time queued for a slot counts against the deadline but not as stream
+        # idle time, and the provider call only starts once it has a slot
+        async with self.semaphores[model]:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError("AI request deadline exceeded")
+            if on_text:
+                last_text_at = time.monotonic()
+            call = self._provider_call(model, prompt, system_prompt, prompt_prefix, on_text)
+            
+            try:
+                text, usage = await self._timed(
+                    model,
+                    generation_type,
+                    self._idle_timeout(call, lambda: last_text_at, deadline) if on_text
+                    else asyncio.wait_for(call, timeout=min(AI_REQUEST_TIMEOUT, remaining))
+                )
+            except Exception as e:
+                if is_transient(e):
+                    breaker.record_failure()
+                raise
+            breaker.record_success()
+        
+        usage["model"] = model
+        return text, self._record_usage(model, usage)
+    
+    def _provider_call(self, model: AIModel, prompt: str, system_prompt: str, prompt_prefix: str, on_text=None):
+        """The (not yet awaited) coroutine that asks `model` for a response"""
+        if self.fake_provider:
+            return self.fake_provider.generate(model.value, prompt, system_prompt, prompt_prefix, on_text)
         if model == AIModel.CLAUDE:
-            return await self._generate_claude(prompt, system_prompt)
+            if on_text:
+                return self._stream_claude(prompt, system_prompt, prompt_prefix, on_text)
+            return self._generate_claude(prompt, system_prompt, prompt_prefix)
+        if on_text:
+            return self._stream_gemini(prompt, system_prompt, on_text)
+        return self._generate_gemini(prompt, system_prompt)
+    
+    async def _idle_timeout(self, call, last_text_at, deadline: float):
+        """Await a streaming call, failing it once no text has arrived for AI_REQUEST_TIMEOUT or the deadline passes"""
+        task = asyncio.ensure_future(call)
+        try:
+            while True:
+                timeout = min(last_text_at() + AI_REQUEST_TIMEOUT, deadline) - time.monotonic()
+                if timeout <= 0:
+                    if time.monotonic() >= deadline:
+                        raise asyncio.TimeoutError("AI request deadline exceeded")
+                    raise asyncio.TimeoutError(f"AI stream idle for {AI_REQUEST_TIMEOUT:g}s")
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+                if done:
+                    return task.result()
+        finally:
+            task.cancel()
+    
+    async def _timed(self, model: AIModel, generation_type: str, call):
+        """Await a provider call, recording its latency and outcome"""
+        stats = self.stats_for(model, generation_type)
+        started = time.monotonic()
+        try:
+            result = await call
+        except Exception:
+            stats.record_call(time.monotonic() - started, False)
+            raise
+        stats.record_call(time.monotonic() - started, True)
+        return result
+    
+    def _record_usage(self, model: AIModel, usage: dict) -> dict:
+        """Add a call's token usage to the running totals and fill in total_tokens"""
+        usage["total_tokens"] = (
+            usage["input_tokens"] + usage["cached_input_tokens"]
+            + usage["cache_write_tokens"] + usage["output_tokens"]
+        )
+        totals = self.usage[model]
+        totals["calls"] += 1
+        for field in ("input_tokens", "cached_input_tokens", "cache_write_tokens", "output_tokens"):
+            totals[field] += usage[field]
+            AI_TOKENS_TOTAL.labels(model.value, field[:-len("_tokens")]).inc(usage[field])
+        return usage
+    
+    def usage_stats(self) -> dict:
+        """Token totals per model, including the share of input served from the prompt cache"""
+        stats = {}
+        for model, totals in self.usage.items():
+            input_total = totals["input_tokens"] + totals["cached_input_tokens"] + totals["cache_write_tokens"]
+            stats[model.value] = {
+                **totals,
+                "cached_input_ratio": totals["cached_input_tokens"] / input_total if input_total else 0.0
+            }
+        return stats
+    
+    def _claude_request(self, prompt: str, system_prompt: str, prompt_prefix: str) -> dict:
+        """
+        Request parameters with cache breakpoints after the system prompt and
+        after the tier template, so repeat calls only pay for the user's text.
+        
+        Anthropic only caches prefixes of at least 1024 tokens (Sonnet), and
+        ignores breakpoints before that. The current system prompts plus tier
+        templates come to roughly 400-500 tokens, so these are no-ops today;
+        they start paying off once a prefix grows past the minimum (longer
+        instructions, few-shot examples), with no change needed here.
+        """
+        if prompt_prefix and prompt.startswith(prompt_prefix):
+            content = [
+                {"type": "text", "text": prompt_prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": prompt[len(prompt_prefix):]}
+            ]
         else:
-            return await self._generate_gemini(prompt, system_prompt)
+            content = prompt
+        
+        return {
+            "model": CLAUDE_MODEL,
+            "max_tokens": 8192,
+            "system": [
+                {"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}
+            ],
+            "messages": [
+                {"role": "user", "content": content}
+            ]
+        }
+    
+    def _claude_usage(self, usage) -> dict:
+        return {
+            "input_tokens": usage.input_tokens or 0,
+            "cached_input_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0,
+            "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", 0) or 0,
+            "output_tokens": getattr(usage, "output_tokens", 0) or 0
+        }
+    
+    def _gemini_model(self, system_prompt: str):
+        """
+        Model instance carrying the system prompt as its system instruction.
+        One per system prompt, so every call for a generation type shares the
+        same leading content and benefits from Gemini's implicit prefix cache.
+        """
+        model = self.gemini_models.get(system_prompt)
+        if model is None:
+            model = _genai().GenerativeModel(GEMINI_MODEL, system_instruction=system_prompt)
+            self.gemini_models[system_prompt] = model
+        return model
+    
+    def _gemini_usage(self, metadata) -> dict:
+        cached = getattr(metadata, "cached_content_token_count", 0) or 0
+        return {
+            "input_tokens": (metadata.prompt_token_count or 0) - cached,
+            "cached_input_tokens": cached,
+            "cache_write_tokens": 0,
+            "output_tokens": metadata.candidates_token_count or 0
+        }
     
-    async def _generate_claude(self, prompt: str, system_prompt: str) -> tuple[str, int]:
+    async def _generate_claude(self, prompt: str, system_prompt: str, prompt_prefix: str) -> tuple[str, dict]:
         """Generate using Claude API"""
-        response = self.anthropic_client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=8192,
-            system=system_prompt,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        response = await self.anthropic_client.messages.create(
+            **self._claude_request(prompt, system_prompt, prompt_prefix)
         )
         
-        text = response.content[0].text
-        tokens = response.usage.input_tokens + response.usage.output_tokens
-        
-        return text, tokens
+        return response.content[0].text, self._claude_usage(response.usage)
     
-    async def _generate_gemini(self, prompt: str, system_prompt: str) -> tuple[str, int]:
+    async def _generate_gemini(self, prompt: str, system_prompt: str) -> tuple[str, dict]:
         """Generate using Gemini API"""
-        # Gemini doesn't have a separate system prompt, so we combine them
-        full_prompt = f"{system_prompt}\n\n---\n\n{prompt}"
+        response = await self._gemini_model(system_prompt).generate_content_async(prompt)
+        
+        return response.text, self._gemini_usage(response.usage_metadata)
+    
+    async def _stream_claude(self, prompt: str, system_prompt: str, prompt_prefix: str, on_text) -> tuple[str, dict]:
+        """Stream using Claude API"""
+        stream = await self.anthropic_client.messages.create(
+            **self._claude_request(prompt, system_prompt, prompt_prefix),
+            stream=True
+        )
         
-        response = self.gemini_model.generate_content(full_prompt)
+        parts = []
+        usage = None
+        output_tokens = 0
+        async for event in stream:
+            if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                parts.append(event.delta.text)
+                on_text(event.delta.text)
+            elif event.type == "message_start":
+                usage = self._claude_usage(event.message.usage)
+            elif event.type == "message_delta":
+                output_tokens = event.usage.output_tokens
         
-        text = response.text
-        # Gemini doesn't return exact token counts easily, estimate
-        tokens = len(full_prompt.split()) + len(text.split())
+        usage["output_tokens"] = output_tokens
+        return "".join(parts), usage
+    
+    async def _stream_gemini(self, prompt: str, system_prompt: str, on_text) -> tuple[str, dict]:
+        """Stream using Gemini API"""
+        response = await self._gemini_model(system_prompt).generate_content_async(prompt, stream=True)
         
-        return text, tokens
+        parts = []
+        async for chunk in response:
+            parts.append(chunk.text)
+            on_text(chunk.text)
+        
+        # The final chunk carries usage for the whole response
+        return "".join(parts), self._gemini_usage(response.usage_metadata)
+    
+    async def close(self):
+        """Release pooled provider connections"""
+        if self.http_client is not None:
+            await self.http_client.aclose()
 
 # Singleton instance
 ai_router = AIRouter()
@@ -0,0 +1,79 @@
+import os
+import json
+import time
+import threading
+
+from services.supabase_client import get_supabase_client
+from api.http_cache import make_etag
+
+# Catalog caching: reloaded after CATALOG_CACHE_TTL seconds even without an explicit invalidation
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+CATALOG_CACHE_CONTROL = os.getenv(
+    "CATALOG_CACHE_CONTROL",
+    "public, max-age=60, s-maxage=300, stale-while-revalidate=600"
+)
+
+# Every cached document, so one invalidation clears them all
+documents = []
+
+class CachedDocument:
+    """
+    A rarely-changing JSON document served from memory.
+    
+    `loader()` builds the content; it's serialized once and kept with a strong
+    ETag until `ttl` seconds pass (if set) or `invalidate()` is called. Each
+    process holds its own copy, so with several replicas the TTL bounds how
+    long the ones that didn't see an invalidation stay stale.
+    """
+    
+    def __init__(self, loader, ttl: float = None):
+        self.loader = loader
+        self.ttl = ttl
+        self.entry = None  # (content, body, etag, loaded_at)
+        self.lock = threading.Lock()
+        documents.append(self)
+    
+    def _fresh(self, entry) -> bool:
+        return entry is not None and (self.ttl is None or time.monotonic() - entry[3] < self.ttl)
+    
+    def get(self) -> tuple[dict, bytes, str]:
+        """Returns (content, serialized body, etag), loading it if needed"""
+        entry = self.entry
+        if not self._fresh(entry):
+            with self.lock:
+                # Only one caller reloads; the rest wait for its result
+                entry = self.entry
+                if not self._fresh(entry):
+                    content = self.loader()
+                    body = json.dumps(content, separators=(",", ":"), default=str).encode()
+                    etag = make_etag(body)
+                    entry = self.entry = (content, body, etag, time.monotonic())
+        return entry[0], entry[1], entry[2]
+    
+    def invalidate(self):
+        self.entry = None
+
+def invalidate_catalog():
+    """Drop every cached catalog document (after editing packages or prices)"""
+    for document in documents:
+        document.invalidate()
+
+def _load_packages() -> dict:
+    supabase = get_supabase_client()
+    response = supabase.table("credit_packages")\
+        .select("*")\
+        .eq("is_active", True)\
+        .order("sort_order")\
+        .execute()
+    return {"packages": response.data}
+
+# Active credit packages, as served by GET /api/credits/packages
+package_catalog = CachedDocument(_load_packages, CATALOG_CACHE_TTL)
+
+def get_package(package_id: str) -> dict:
+    """An active credit package from the cached catalog, or None"""
+    content, _, _ = package_catalog.get()
+    for package in content["packages"]:
+        if str(package["id"]) == package_id:
+            return package
+    return None
@@ -0,0 +1,48 @@
+import os
+import time
+import threading
+
+# Breaker configuration
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+    
+    After BREAKER_FAILURE_THRESHOLD consecutive transient failures the
+    breaker opens and calls fail fast (so the router can fail over) for
+    BREAKER_RESET_SECONDS. It then lets traffic through again: the next
+    success closes it, the next failure opens it for another period.
+    """
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.failures = 0
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Whether calls may go to this provider right now"""
+        with self.lock:
+            return time.monotonic() >= self.open_until
+    
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0.0
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            half_open = self.open_until > 0.0
+            if self.failures >= BREAKER_FAILURE_THRESHOLD or half_open:
+                if time.monotonic() >= self.open_until:
+                    print(f"Circuit breaker for {self.name} opened after {self.failures} failures")
+                self.open_until = time.monotonic() + BREAKER_RESET_SECONDS
+    
+    def state(self) -> str:
+        with self.lock:
+            if time.monotonic() < self.open_until:
+                return "open"
+            return "half_open" if self.open_until > 0.0 else "closed"
@@ -0,0 +1,200 @@
+import os
+import sys
+import time
+import shutil
+import asyncio
+import tempfile
+
+# Build configuration
+# mvnd (Maven daemon) keeps warm JVMs between builds; fall back to plain Maven
+MAVEN_EXECUTABLE = os.getenv("MAVEN_EXECUTABLE") or ("mvnd" if shutil.which("mvnd") else "mvn")
+# Shared local repository pre-provisioned with the Spigot/Paper API (see `provision`)
+MAVEN_REPO_LOCAL = os.getenv("MAVEN_REPO_LOCAL", "")
+MAVEN_OFFLINE = os.getenv("MAVEN_OFFLINE", "true" if MAVEN_REPO_LOCAL else "false").lower() == "true"
+COMPILE_MAX_CONCURRENCY = int(os.getenv("COMPILE_MAX_CONCURRENCY", "2"))
+COMPILE_TIMEOUT = float(os.getenv("COMPILE_TIMEOUT", "120"))
+MAX_DIAGNOSTICS = 50
+
+# Minimal project used to provision the local repository and warm build daemons
+SKELETON_POM = """<?xml version="1.0" encoding="UTF-8"?>
+<project xmlns="http://maven.apache.org/POM/4.0.0"
+         xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+         xsi:schemaLocation="http://maven.apache.org/POM/4.0.0 http://maven.apache.org/xsd/maven-4.0.0.xsd">
+    <modelVersion>4.0.0</modelVersion>
+    <groupId>com.blocksmith</groupId>
+    <artifactId>warmup</artifactId>
+    <version>1.0.0</version>
+    <packaging>jar</packaging>
+
+    <properties>
+        <maven.compiler.source>17</maven.compiler.source>
+        <maven.compiler.target>17</maven.compiler.target>
+        <project.build.sourceEncoding>UTF-8</project.build.sourceEncoding>
+    </properties>
+
+    <repositories>
+        <repository>
+            <id>spigot-repo</id>
+            <url>https://hub.spigotmc.org/nexus/content/repositories/snapshots/</url>
+        </repository>
+        <repository>
+            <id>papermc</id>
+            <url>https://repo.papermc.io/repository/maven-public/</url>
+        </repository>
+    </repositories>
+
+    <dependencies>
+        <dependency>
+            <groupId>org.spigotmc</groupId>
+            <artifactId>spigot-api</artifactId>
+            <version>1.20.4-R0.1-SNAPSHOT</version>
+            <scope>provided</scope>
+        </dependency>
+        <dependency>
+            <groupId>io.papermc.paper</groupId>
+            <artifactId>paper-api</artifactId>
+            <version>1.20.4-R0.1-SNAPSHOT</version>
+            <scope>provided</scope>
+        </dependency>
+    </dependencies>
+</project>
+"""
+
+SKELETON_MAIN = """package com.blocksmith.warmup;
+
+import org.bukkit.plugin.java.JavaPlugin;
+
+public class Warmup extends JavaPlugin {
+}
+"""
+
+class PluginCompiler:
+    """
+    Compiles generated plugin projects off the event loop.
+    
+    Builds run through MAVEN_EXECUTABLE with at most COMPILE_MAX_CONCURRENCY
+    in flight. With mvnd each slot is served by a long-lived daemon JVM, so
+    after `warm_up` builds skip JVM start-up and Maven bootstrap; with
+    MAVEN_REPO_LOCAL set they also skip remote dependency resolution.
+    """
+    
+    def __init__(self):
+        self.semaphore = asyncio.Semaphore(COMPILE_MAX_CONCURRENCY)
+    
+    def _command(self, goals: list, offline: bool = MAVEN_OFFLINE) -> list:
+        command = [MAVEN_EXECUTABLE, *goals, "-q", "-B", "-DskipTests"]
+        if offline:
+            command.append("-o")
+        if MAVEN_REPO_LOCAL:
+            command.append(f"-Dmaven.repo.local={MAVEN_REPO_LOCAL}")
+        return command
+    
+    async def _run(self, command: list, project_dir: str) -> tuple[int, str]:
+        """Run a build command, returning (returncode, output)"""
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=project_dir,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), timeout=COMPILE_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return -1, f"[ERROR] Build timed out after {COMPILE_TIMEOUT:.0f}s"
+        
+        return process.returncode, output.decode(errors="replace")
+    
+    def _diagnostics(self, output: str) -> list:
+        """Pick compiler errors and warnings out of the build log"""
+        lines = [
+            line.strip() for line in output.splitlines()
+            if line.lstrip().startswith(("[ERROR]", "[WARNING]"))
+        ]
+        return lines[:MAX_DIAGNOSTICS]
+    
+    async def compile(self, project_dir: str) -> dict:
+        """
+        Build the project in project_dir.
+        Returns {"jar_path": str or None, "duration": seconds, "diagnostics": [...]}
+        """
+        async with self.semaphore:
+            start = time.monotonic()
+            try:
+                returncode, output = await self._run(self._command(["package"]), project_dir)
+                
+                # Generated poms may pull in dependencies the shared repository
+                # doesn't have yet; retry once online rather than failing the build
+                if returncode != 0 and MAVEN_OFFLINE and "offline mode" in output:
+                    returncode, output = await self._run(
+                        self._command(["package"], offline=False),
+                        project_dir
+                    )
+            except Exception as e:
+                print(f"Compilation error: {e}")
+                returncode, output = -1, f"[ERROR] {e}"
+            
+            duration = round(time.monotonic() - start, 2)
+        
+        jar_path = None
+        if returncode == 0:
+            # Find the jar file
+            target_dir = os.path.join(project_dir, "target")
+            if os.path.exists(target_dir):
+                for file in os.listdir(target_dir):
+                    if file.endswith(".jar") and not file.endswith("-sources.jar"):
+                        jar_path = os.path.join(target_dir, file)
+                        break
+        
+        return {
+            "jar_path": jar_path,
+            "duration": duration,
+            "diagnostics": self._diagnostics(output)
+        }
+    
+    def _write_skeleton(self, project_dir: str):
+        with open(os.path.join(project_dir, "pom.xml"), 'w') as f:
+            f.write(SKELETON_POM)
+        source_dir = os.path.join(project_dir, "src/main/java/com/blocksmith/warmup")
+        os.makedirs(source_dir)
+        with open(os.path.join(source_dir, "Warmup.java"), 'w') as f:
+            f.write(SKELETON_MAIN)
+    
+    async def warm_up(self):
+        """Build the skeleton project once per slot so every build daemon is hot"""
+        async def build_once():
+            with tempfile.TemporaryDirectory() as project_dir:
+                self._write_skeleton(project_dir)
+                return await self.compile(project_dir)
+        
+        results = await asyncio.gather(
+            *[build_once() for _ in range(COMPILE_MAX_CONCURRENCY)],
+            return_exceptions=True
+        )
+        warmed = sum(1 for r in results if isinstance(r, dict) and r["jar_path"])
+        print(f"Compiler warm-up: {warmed}/{COMPILE_MAX_CONCURRENCY} build slots ready ({MAVEN_EXECUTABLE})")
+    
+    async def provision(self) -> bool:
+        """Resolve the Spigot/Paper API and build plugins into MAVEN_REPO_LOCAL"""
+        with tempfile.TemporaryDirectory() as project_dir:
+            self._write_skeleton(project_dir)
+            returncode, output = await self._run(
+                self._command(["dependency:go-offline", "package"], offline=False),
+                project_dir
+            )
+        
+        if returncode != 0:
+            print(output)
+        return returncode == 0
+
+# Singleton instance
+plugin_compiler = PluginCompiler()
+
+if __name__ == "__main__":
+    # python -m services.compiler provision
+    if len(sys.argv) > 1 and sys.argv[1] == "provision":
+        ok = asyncio.run(plugin_compiler.provision())
+        print("Repository provisioned" if ok else "Provisioning failed")
+        sys.exit(0 if ok else 1)
+    print("Usage: python -m services.compiler provision")
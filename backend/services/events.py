@@ -0,0 +1,99 @@
+import os
+import asyncio
+
+from services.job_queue import get_job_queue
+
+# Event relay configuration
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.5"))
+EVENT_RETENTION_SECONDS = int(os.getenv("EVENT_RETENTION_SECONDS", "3600"))
+
+TERMINAL_STATUSES = {"completed", "failed"}
+
+class EventBus:
+    """
+    Fans generation status/progress events out to connected clients.
+    
+    Workers `publish` events into the job queue's event log. Each API process
+    runs one relay task that reads the log and hands events to in-process
+    subscribers (one asyncio.Queue per open SSE/long-poll connection). The
+    relay only touches the log while someone is subscribed, so idle servers
+    cost nothing and every connected client shares the same read.
+    """
+    
+    def __init__(self):
+        self.subscribers = {}  # generation_id -> set of asyncio.Queue
+        self.last_id = None
+        self.relay_task = None
+        self.wakeup = asyncio.Event()
+    
+    def publish(self, generation_id: str, event: dict):
+        """Record an event for a generation (called by workers)"""
+        try:
+            get_job_queue().publish_event(generation_id, event)
+        except Exception as e:
+            # Progress events are best effort; never fail a generation over one
+            print(f"Failed to publish event for {generation_id}: {e}")
+    
+    async def subscribe(self, generation_id: str) -> asyncio.Queue:
+        """Start receiving events for a generation"""
+        if self.last_id is None:
+            # Resume from the current end of the log, not from whenever we last listened
+            latest_id = await asyncio.to_thread(get_job_queue().latest_event_id)
+            if self.last_id is None:
+                self.last_id = latest_id
+        
+        queue = asyncio.Queue()
+        self.subscribers.setdefault(generation_id, set()).add(queue)
+        self.wakeup.set()
+        return queue
+    
+    def unsubscribe(self, generation_id: str, queue: asyncio.Queue):
+        """Stop receiving events for a generation"""
+        queues = self.subscribers.get(generation_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[generation_id]
+    
+    def _dispatch(self, generation_id: str, event: dict):
+        for queue in self.subscribers.get(generation_id, ()):
+            queue.put_nowait(event)
+    
+    async def _relay(self):
+        """Read new events from the log and dispatch them to subscribers"""
+        job_queue = get_job_queue()
+        while True:
+            if not self.subscribers:
+                self.last_id = None
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            
+            try:
+                events = await asyncio.to_thread(job_queue.read_events, self.last_id or 0)
+                for event_id, generation_id, event in events:
+                    self.last_id = event_id
+                    self._dispatch(generation_id, event)
+            except Exception as e:
+                print(f"Event relay error: {e}")
+            
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+    
+    def start(self):
+        """Start the relay task (call from the app's event loop)"""
+        if self.relay_task is None:
+            self.wakeup = asyncio.Event()
+            self.relay_task = asyncio.create_task(self._relay())
+    
+    async def stop(self):
+        """Stop the relay task"""
+        if self.relay_task:
+            self.relay_task.cancel()
+            try:
+                await self.relay_task
+            except asyncio.CancelledError:
+                pass
+            self.relay_task = None
+
+# Singleton instance
+event_bus = EventBus()
@@ -0,0 +1,154 @@
+import os
+import re
+import json
+import random
+import hashlib
+import asyncio
+from collections import deque
+
+from services.ttl_cache import TTLCache
+from prompts.datapack_prompts import DATAPACK_SYSTEM_PROMPT
+from prompts.texture_prompts import TEXTURE_SYSTEM_PROMPT
+
+# Simulated provider behaviour
+FAKE_AI_LATENCY = float(os.getenv("FAKE_AI_LATENCY", "0.2"))  # seconds to first token with nothing cached
+FAKE_AI_CHUNK_CHARS = int(os.getenv("FAKE_AI_CHUNK_CHARS", "64"))
+FAKE_AI_FAILURE_RATE = float(os.getenv("FAKE_AI_FAILURE_RATE", "0"))
+FAKE_AI_PAYLOAD_BYTES = int(os.getenv("FAKE_AI_PAYLOAD_BYTES", "0"))  # pad plugin/datapack sources to about this size
+FAKE_AI_CACHE_TTL = 300  # matches Anthropic's ephemeral cache lifetime
+# Shortest prefix the providers will cache: 1024 tokens for Claude Sonnet
+# (explicit breakpoints) and for Gemini 2.5 Flash (implicit caching)
+FAKE_AI_MIN_CACHE_TOKENS = int(os.getenv("FAKE_AI_MIN_CACHE_TOKENS", "1024"))
+
+class FakeProviderError(Exception):
+    """Simulated transient provider failure (treated like a 5xx by the router)"""
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+class FakeProvider:
+    """
+    Local stand-in for the Claude/Gemini APIs, for tests and offline runs.
+    
+    Answers with a small valid envelope for whichever generation type the
+    system prompt belongs to, and models prompt caching like the real
+    providers do: the first call with a given prefix writes it to the cache,
+    later calls within FAKE_AI_CACHE_TTL read it back, are billed as cached
+    input tokens and get a proportionally shorter time to first token.
+    Prefixes shorter than FAKE_AI_MIN_CACHE_TOKENS are never cached.
+    
+    `latency`, `failure_rate` and `min_cache_tokens` can be overridden per
+    model to simulate a slow or failing provider, and `payload_bytes` pads
+    generated sources to simulate larger outputs.
+    """
+    
+    def __init__(self):
+        self.prefix_cache = TTLCache(FAKE_AI_CACHE_TTL, 1000)
+        self.calls = deque(maxlen=1000)  # (model, prompt, usage) of recent calls, for assertions
+        self.latency = {}  # model -> seconds to first token, overriding FAKE_AI_LATENCY
+        self.failure_rate = {}  # model -> probability a call raises, overriding FAKE_AI_FAILURE_RATE
+        self.min_cache_tokens = {}  # model -> shortest cacheable prefix, overriding FAKE_AI_MIN_CACHE_TOKENS
+        self.payload_bytes = FAKE_AI_PAYLOAD_BYTES
+    
+    def _filler(self, line: str) -> str:
+        """Repeat line until it makes up roughly payload_bytes"""
+        return (line + "\n") * (self.payload_bytes // (len(line) + 1))
+    
+    def _respond(self, prompt: str, system_prompt: str) -> str:
+        if system_prompt == TEXTURE_SYSTEM_PROMPT:
+            textures = re.findall(r"^- ((?:block|item)/\S+)$", prompt, re.MULTILINE)
+            return json.dumps({
+                "pack_name": "fake_textures",
+                "description": "Fake texture pack",
+                "textures": {
+                    f"assets/minecraft/textures/{texture}.png": {
+                        "prompt": f"16x16 pixel art {texture}",
+                        "negative_prompt": "blurry"
+                    }
+                    for texture in textures
+                }
+            })
+        
+        if system_prompt == DATAPACK_SYSTEM_PROMPT:
+            return json.dumps({
+                "pack_name": "fake_datapack",
+                "description": "Fake datapack",
+                "files": {
+                    "pack.mcmeta": json.dumps({"pack": {"pack_format": 15, "description": "Fake datapack"}}),
+                    "data/fake/functions/load.mcfunction": "say loaded\n" + self._filler("say filler")
+                }
+            })
+        
+        return json.dumps({
+            "plugin_name": "FakePlugin",
+            "version": "1.0.0",
+            "description": "Fake plugin",
+            "main_class": "com.blocksmith.fake.FakePlugin",
+            "api_version": "1.20",
+            "commands": {},
+            "files": {
+                "src/main/java/com/blocksmith/fake/FakePlugin.java": (
+                    "package com.blocksmith.fake;\n\n"
+                    "import org.bukkit.plugin.java.JavaPlugin;\n\n"
+                    "public class FakePlugin extends JavaPlugin {\n}\n"
+                    + self._filler("// filler")
+                )
+            }
+        })
+    
+    def _cached_tokens(self, model: str, prefixes: list) -> tuple[int, int]:
+        """
+        Look up the cache breakpoints (longest first, like the providers do)
+        and cache everything up to the last one. Breakpoints before the
+        provider's minimum cacheable length are ignored, as they are upstream.
+        Returns (cache_read_tokens, cache_write_tokens)
+        """
+        minimum = self.min_cache_tokens.get(model, FAKE_AI_MIN_CACHE_TOKENS)
+        prefixes = [prefix for prefix in prefixes if estimate_tokens(prefix) >= minimum]
+        if not prefixes:
+            return 0, 0
+        
+        keys = [hashlib.sha256(f"{model}\0{prefix}".encode()).hexdigest() for prefix in prefixes]
+        
+        cache_read = 0
+        for prefix, key in reversed(list(zip(prefixes, keys))):
+            if self.prefix_cache.get(key):
+                cache_read = estimate_tokens(prefix)
+                break
+        
+        for key in keys:
+            self.prefix_cache.set(key, True)
+        return cache_read, estimate_tokens(prefixes[-1]) - cache_read
+    
+    async def generate(self, model: str, prompt: str, system_prompt: str, prompt_prefix: str = "", on_text=None) -> tuple[str, dict]:
+        """
+        Answer a request like AIRouter.generate / generate_stream.
+        Returns (response_text, usage)
+        """
+        prefixes = [system_prompt]
+        if prompt_prefix:
+            prefixes.append(system_prompt + prompt_prefix)
+        cache_read, cache_write = self._cached_tokens(model, prefixes)
+        
+        input_tokens = estimate_tokens(system_prompt + prompt)
+        uncached = input_tokens - cache_read - cache_write
+        latency = self.latency.get(model, FAKE_AI_LATENCY)
+        await asyncio.sleep(latency * (input_tokens - cache_read) / input_tokens)
+        
+        if random.random() < self.failure_rate.get(model, FAKE_AI_FAILURE_RATE):
+            raise FakeProviderError(f"Fake {model} provider error")
+        
+        text = self._respond(prompt, system_prompt)
+        if on_text:
+            for start in range(0, len(text), FAKE_AI_CHUNK_CHARS):
+                on_text(text[start:start + FAKE_AI_CHUNK_CHARS])
+                await asyncio.sleep(0)
+        
+        usage = {
+            "input_tokens": uncached,
+            "cached_input_tokens": cache_read,
+            "cache_write_tokens": cache_write,
+            "output_tokens": estimate_tokens(text)
+        }
+        self.calls.append((model, prompt, usage))
+        return text, usage
@@ -1,47 +1,215 @@
 import os
 import json
-import zipfile
+import time
 import tempfile
-import subprocess
 import shutil
+import asyncio
+import threading
 from datetime import datetime, timedelta
-import replicate
-import boto3
-from botocore.config import Config
+import httpx
 
 from services.supabase_client import get_supabase_client
-from services.ai_router import ai_router
-from prompts.plugin_prompts import get_plugin_prompt, PLUGIN_SYSTEM_PROMPT
-from prompts.datapack_prompts import get_datapack_prompt, DATAPACK_SYSTEM_PROMPT
-from prompts.texture_prompts import get_texture_prompt, TEXTURE_SYSTEM_PROMPT
+from services.ai_router import ai_router, AI_STREAMING_ENABLED
+from services.compiler import plugin_compiler
+from services.result_cache import result_cache
+from services.image_cache import image_cache
+from services.pack_builder import PackBuilder
+from services.events import event_bus
+from services.stream_parser import FileStreamParser
+from services.json_extract import extract_json, validate_output
+from services.single_flight import SingleFlight
+from services.metrics import observe_stage, GENERATION_STAGE_SECONDS, GENERATIONS_TOTAL
+from prompts.plugin_prompts import get_plugin_prompt, get_plugin_prompt_prefix, PLUGIN_SYSTEM_PROMPT
+from prompts.datapack_prompts import get_datapack_prompt, get_datapack_prompt_prefix, DATAPACK_SYSTEM_PROMPT
+from prompts.texture_prompts import get_texture_prompt, get_texture_prompt_prefix, TEXTURE_SYSTEM_PROMPT
+
+# Maximum textures rendered at once for a single texture pack
+TEXTURE_RENDER_CONCURRENCY = int(os.getenv("TEXTURE_RENDER_CONCURRENCY", "8"))
+
+# Minimum seconds between texture progress events for one pack
+PROGRESS_EVENT_INTERVAL = float(os.getenv("PROGRESS_EVENT_INTERVAL", "1.0"))
+
+# Stable Diffusion model used for texture rendering
+TEXTURE_MODEL_VERSION = "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b"
 
 class GeneratorService:
     def __init__(self):
         self.supabase = get_supabase_client()
         
-        # Initialize R2 client
-        self.r2_client = boto3.client(
-            's3',
-            endpoint_url=f"https://{os.getenv('R2_ACCOUNT_ID')}.r2.cloudflarestorage.com",
-            aws_access_key_id=os.getenv('R2_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('R2_SECRET_ACCESS_KEY'),
-            config=Config(signature_version='s3v4')
-        )
+        # R2 and Replicate clients are created on first use (see _r2 and _replicate);
+        # boto3 and replicate are slow to import and a worker may never need both
+        self.r2_client = None
+        self.replicate_client = None
+        self.client_lock = threading.Lock()
         self.r2_bucket = os.getenv('R2_BUCKET_NAME')
+        
+        # Identical AI calls and texture renders running at the same time share one upstream request
+        self.generation_flights = SingleFlight()
+        self.render_flights = SingleFlight()
+        
+        # Pooled client reused for every texture image download
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=TEXTURE_RENDER_CONCURRENCY,
+                max_keepalive_connections=TEXTURE_RENDER_CONCURRENCY
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+    
+    async def close(self):
+        """Release pooled HTTP connections"""
+        await self.http_client.aclose()
+    
+    def _r2(self):
+        """R2 client (boto3 S3), created on first upload"""
+        # Uploads run on worker threads and boto3 client creation isn't thread-safe
+        with self.client_lock:
+            if self.r2_client is None:
+                import boto3
+                from botocore.config import Config
+                self.r2_client = boto3.client(
+                    's3',
+                    endpoint_url=f"https://{os.getenv('R2_ACCOUNT_ID')}.r2.cloudflarestorage.com",
+                    aws_access_key_id=os.getenv('R2_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('R2_SECRET_ACCESS_KEY'),
+                    config=Config(signature_version='s3v4')
+                )
+            return self.r2_client
+    
+    def _replicate(self):
+        """The replicate module, imported on first render"""
+        if self.replicate_client is None:
+            import replicate
+            self.replicate_client = replicate
+        return self.replicate_client
+    
+    def warm_up(self):
+        """Import the storage and rendering SDKs and build their clients ahead of the first job"""
+        self._r2()
+        self._replicate()
     
     def _update_generation(self, generation_id: str, updates: dict):
         """Update generation record in database"""
         self.supabase.table("generations").update(updates).eq("id", generation_id).execute()
+        
+        # Status changes are pushed to clients once they're committed
+        if "status" in updates:
+            event = {"type": "status", "status": updates["status"]}
+            for field in ("file_url", "file_name", "file_size", "error_message"):
+                if field in updates:
+                    event[field] = updates[field]
+            event_bus.publish(generation_id, event)
+    
+    def _emit_progress(self, generation_id: str, stage: str, **details):
+        """Push a progress event (no database write)"""
+        event_bus.publish(generation_id, {"type": "progress", "stage": stage, **details})
     
     def _upload_to_r2(self, file_path: str, key: str) -> str:
-        """Upload file to R2 and return public URL"""
+        """Upload file to R2 and return public URL. Blocking; callers run it with asyncio.to_thread"""
         with open(file_path, 'rb') as f:
-            self.r2_client.upload_fileobj(f, self.r2_bucket, key)
+            return self._upload_fileobj_to_r2(f, key)
+    
+    def _upload_fileobj_to_r2(self, fileobj, key: str) -> str:
+        """Upload an open file or buffer to R2 and return public URL"""
+        self._r2().upload_fileobj(fileobj, self.r2_bucket, key)
         
         # Return public URL (configure R2 bucket for public access or use presigned URLs)
         return f"https://{self.r2_bucket}.r2.dev/{key}"
     
-    async def generate_plugin(self, generation_id: str, prompt: str, tier: str, name: str = None):
+    async def _generate_json(self, generation_type: str, tier: str, full_prompt: str, system_prompt: str, use_cache: bool = True, on_file=None, prompt_prefix: str = "") -> tuple[dict, dict]:
+        """
+        Run the AI call for a generation, then parse and validate its JSON output.
+        Identical requests are served from the result cache, or share the call
+        already in flight, unless use_cache is False.
+        With on_file, the response is streamed and on_file(path, content) is
+        called for each entry of its "files" object as soon as it's complete.
+        prompt_prefix (the static start of full_prompt) is passed on for prompt caching.
+        Returns (data, run) where run holds model, routing, tokens,
+        cached_input_tokens, cache_hit, coalesced and json_repair
+        """
+        model, routing = ai_router.choose_model(generation_type, tier)
+        
+        def own_routing(answered_by: str) -> dict:
+            """A copy of this request's routing decision, noting when another model answered"""
+            if answered_by == model.value:
+                return dict(routing)
+            return {**routing, "answered_by": answered_by}
+        
+        cache_key = result_cache.make_key(generation_type, tier, full_prompt, system_prompt, model.value)
+        
+        if use_cache:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return cached, {
+                    "model": model,
+                    "routing": routing,
+                    "tokens": 0,
+                    "cached_input_tokens": 0,
+                    "cache_hit": True,
+                    "coalesced": False,
+                    "json_repair": None
+                }
+        
+        async def call() -> tuple[dict, dict]:
+            started = time.monotonic()
+            if on_file and AI_STREAMING_ENABLED:
+                parser = FileStreamParser(on_file)
+                response_text, usage = await ai_router.generate_stream(
+                    full_prompt, system_prompt, model, parser.feed, prompt_prefix, generation_type
+                )
+            else:
+                response_text, usage = await ai_router.generate(
+                    full_prompt, system_prompt, model, prompt_prefix, generation_type
+                )
+            
+            # Failover or hedging may have had another model answer
+            answered_by = usage["model"]
+            GENERATION_STAGE_SECONDS.labels("ai_call", generation_type, tier, answered_by.value)\
+                .observe(time.monotonic() - started)
+            
+            # Parse (repairing common model mistakes) and check the output's shape
+            try:
+                with observe_stage("json_parse", generation_type, tier, answered_by.value):
+                    data, repair = extract_json(response_text)
+                    dropped = validate_output(generation_type, data)
+            except ValueError:
+                ai_router.record_parse(answered_by, generation_type, False)
+                raise
+            ai_router.record_parse(answered_by, generation_type, True)
+            if repair != "none" or dropped:
+                print(f"Repaired {generation_type} output: {repair}, dropped fields {dropped}")
+            
+            # The key names the model that was chosen; output from a failover
+            # or hedge would later be reported as that model's
+            if answered_by == model:
+                result_cache.set(cache_key, data)
+            return data, {
+                "model": answered_by,
+                "routing": own_routing(answered_by.value),
+                "tokens": usage["total_tokens"],
+                "cached_input_tokens": usage["cached_input_tokens"],
+                "cache_hit": False,
+                "coalesced": False,
+                "json_repair": repair
+            }
+        
+        if not use_cache:
+            return await call()
+        
+        (data, run), shared = await self.generation_flights.do(cache_key, call)
+        if shared:
+            # The tokens were billed to the job that made the call, and the
+            # routing recorded is this job's own decision, not the leader's
+            run = {
+                **run,
+                "routing": own_routing(run["model"].value),
+                "tokens": 0,
+                "cached_input_tokens": 0,
+                "coalesced": True
+            }
+        return data, run
+    
+    async def generate_plugin(self, generation_id: str, prompt: str, tier: str, name: str = None, use_cache: bool = True):
         """Generate a Minecraft plugin"""
         try:
             self._update_generation(generation_id, {"status": "processing"})
@@ -49,32 +217,34 @@ class GeneratorService:
             # Get the appropriate prompt
             full_prompt = get_plugin_prompt(tier, prompt)
             
-            # Route to AI
-            model = ai_router.route_request("plugin", tier)
-            response_text, tokens = await ai_router.generate(full_prompt, PLUGIN_SYSTEM_PROMPT, model)
-            
-            # Parse JSON response
-            try:
-                plugin_data = json.loads(response_text)
-            except json.JSONDecodeError as e:
-                # Try to extract JSON from response
-                start = response_text.find('{')
-                end = response_text.rfind('}') + 1
-                if start != -1 and end > start:
-                    plugin_data = json.loads(response_text[start:end])
-                else:
-                    raise ValueError(f"Failed to parse AI response as JSON: {e}")
-            
-            # Create plugin files and compile
-            plugin_name = name or plugin_data.get("plugin_name", "GeneratedPlugin")
-            
             with tempfile.TemporaryDirectory() as temp_dir:
-                # Write all files
-                for file_path, content in plugin_data.get("files", {}).items():
+                written = set()
+                write_seconds = 0.0
+                
+                def write_file(file_path: str, content):
+                    nonlocal write_seconds
+                    started = time.monotonic()
                     full_path = os.path.join(temp_dir, file_path)
                     os.makedirs(os.path.dirname(full_path), exist_ok=True)
                     with open(full_path, 'w') as f:
                         f.write(content)
+                    written.add(file_path)
+                    write_seconds += time.monotonic() - started
+                
+                # Route to AI, writing source files as they stream in
+                plugin_data, run = await self._generate_json(
+                    "plugin", tier, full_prompt, PLUGIN_SYSTEM_PROMPT, use_cache,
+                    on_file=write_file, prompt_prefix=get_plugin_prompt_prefix(tier)
+                )
+                
+                # Create plugin files and compile
+                plugin_name = name or plugin_data.get("plugin_name", "GeneratedPlugin")
+                model = run["model"].value
+                
+                # Write anything not already written while streaming (e.g. cached results)
+                for file_path, content in plugin_data.get("files", {}).items():
+                    if file_path not in written:
+                        write_file(file_path, content)
                 
                 # Create plugin.yml
                 plugin_yml = self._create_plugin_yml(plugin_data)
@@ -82,14 +252,20 @@ class GeneratorService:
                 os.makedirs(os.path.dirname(yml_path), exist_ok=True)
                 with open(yml_path, 'w') as f:
                     f.write(plugin_yml)
+                GENERATION_STAGE_SECONDS.labels("file_write", "plugin", tier, model).observe(write_seconds)
                 
                 # Compile with Maven
-                jar_path = await self._compile_plugin(temp_dir, plugin_name)
+                self._emit_progress(generation_id, "compiling")
+                with observe_stage("compile", "plugin", tier, model):
+                    compile_result = await plugin_compiler.compile(temp_dir)
+                jar_path = compile_result["jar_path"]
                 
                 if jar_path and os.path.exists(jar_path):
                     # Upload to R2
+                    self._emit_progress(generation_id, "uploading")
                     key = f"plugins/{generation_id}/{plugin_name}.jar"
-                    file_url = self._upload_to_r2(jar_path, key)
+                    with observe_stage("upload", "plugin", tier, model):
+                        file_url = await asyncio.to_thread(self._upload_to_r2, jar_path, key)
                     file_size = os.path.getsize(jar_path)
                     
                     self._update_generation(generation_id, {
@@ -97,46 +273,67 @@ class GeneratorService:
                         "file_url": file_url,
                         "file_name": f"{plugin_name}.jar",
                         "file_size": file_size,
-                        "ai_model_used": model.value,
-                        "ai_tokens_used": tokens,
+                        "ai_model_used": run["model"].value,
+                        "ai_tokens_used": run["tokens"],
                         "completed_at": datetime.utcnow().isoformat(),
                         "expires_at": (datetime.utcnow() + timedelta(days=30)).isoformat(),
                         "output_metadata": {
+                            "cache_hit": run["cache_hit"],
+                            "coalesced": run["coalesced"],
+                            "routing": run["routing"],
+                            "json_repair": run["json_repair"],
+                            "cached_input_tokens": run["cached_input_tokens"],
                             "plugin_name": plugin_name,
                             "version": plugin_data.get("version", "1.0.0"),
-                            "commands": list(plugin_data.get("commands", {}).keys())
+                            "commands": list(plugin_data.get("commands", {}).keys()),
+                            "compile_duration": compile_result["duration"]
                         }
                     })
                 else:
                     # Compilation failed, provide source code as zip
-                    zip_path = os.path.join(temp_dir, f"{plugin_name}_source.zip")
-                    self._create_zip(temp_dir, zip_path, exclude=[f"{plugin_name}_source.zip"])
-                    
-                    key = f"plugins/{generation_id}/{plugin_name}_source.zip"
-                    file_url = self._upload_to_r2(zip_path, key)
+                    with PackBuilder() as pack:
+                        for file_path, content in plugin_data.get("files", {}).items():
+                            pack.add(file_path, content)
+                        pack.add("src/main/resources/plugin.yml", plugin_yml)
+                        
+                        key = f"plugins/{generation_id}/{plugin_name}_source.zip"
+                        with observe_stage("zip", "plugin", tier, model):
+                            zip_file, zip_size = pack.finish()
+                        self._emit_progress(generation_id, "uploading")
+                        with observe_stage("upload", "plugin", tier, model):
+                            file_url = await asyncio.to_thread(self._upload_fileobj_to_r2, zip_file, key)
                     
                     self._update_generation(generation_id, {
                         "status": "completed",
                         "file_url": file_url,
                         "file_name": f"{plugin_name}_source.zip",
-                        "file_size": os.path.getsize(zip_path),
-                        "ai_model_used": model.value,
-                        "ai_tokens_used": tokens,
+                        "file_size": zip_size,
+                        "ai_model_used": run["model"].value,
+                        "ai_tokens_used": run["tokens"],
                         "completed_at": datetime.utcnow().isoformat(),
                         "expires_at": (datetime.utcnow() + timedelta(days=30)).isoformat(),
                         "output_metadata": {
+                            "cache_hit": run["cache_hit"],
+                            "coalesced": run["coalesced"],
+                            "routing": run["routing"],
+                            "json_repair": run["json_repair"],
+                            "cached_input_tokens": run["cached_input_tokens"],
                             "plugin_name": plugin_name,
-                            "note": "Compilation failed. Source code provided for manual compilation."
+                            "note": "Compilation failed. Source code provided for manual compilation.",
+                            "compile_duration": compile_result["duration"],
+                            "compile_diagnostics": compile_result["diagnostics"]
                         }
                     })
+                GENERATIONS_TOTAL.labels("plugin", "completed").inc()
                     
         except Exception as e:
+            GENERATIONS_TOTAL.labels("plugin", "failed").inc()
             self._update_generation(generation_id, {
                 "status": "failed",
                 "error_message": str(e)
             })
     
-    async def generate_datapack(self, generation_id: str, prompt: str, tier: str, name: str = None):
+    async def generate_datapack(self, generation_id: str, prompt: str, tier: str, name: str = None, use_cache: bool = True):
         """Generate a Minecraft datapack"""
         try:
             self._update_generation(generation_id, {"status": "processing"})
@@ -144,76 +341,69 @@ class GeneratorService:
             # Get the appropriate prompt
             full_prompt = get_datapack_prompt(tier, prompt)
             
-            # Route to AI
-            model = ai_router.route_request("datapack", tier)
-            response_text, tokens = await ai_router.generate(full_prompt, DATAPACK_SYSTEM_PROMPT, model)
-            
-            # Parse JSON response
-            try:
-                datapack_data = json.loads(response_text)
-            except json.JSONDecodeError:
-                start = response_text.find('{')
-                end = response_text.rfind('}') + 1
-                if start != -1 and end > start:
-                    datapack_data = json.loads(response_text[start:end])
-                else:
-                    raise ValueError("Failed to parse AI response as JSON")
-            
-            pack_name = name or datapack_data.get("pack_name", "generated_datapack")
-            
-            with tempfile.TemporaryDirectory() as temp_dir:
-                pack_dir = os.path.join(temp_dir, pack_name)
-                os.makedirs(pack_dir)
+            with PackBuilder() as pack:
+                written = set()
+                write_seconds = 0.0
                 
-                # Write all files
-                for file_path, content in datapack_data.get("files", {}).items():
-                    full_path = os.path.join(pack_dir, file_path)
-                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                    
-                    # Handle JSON content
-                    if file_path.endswith('.json'):
-                        if isinstance(content, str):
-                            # Try to parse and reformat
-                            try:
-                                content = json.dumps(json.loads(content), indent=2)
-                            except:
-                                pass
-                        else:
-                            content = json.dumps(content, indent=2)
-                    
-                    with open(full_path, 'w') as f:
-                        f.write(content)
+                def add_file(file_path: str, content):
+                    nonlocal write_seconds
+                    started = time.monotonic()
+                    pack.add(file_path, self._format_datapack_file(file_path, content))
+                    written.add(file_path)
+                    write_seconds += time.monotonic() - started
+                
+                # Route to AI, adding files to the archive as they stream in
+                datapack_data, run = await self._generate_json(
+                    "datapack", tier, full_prompt, DATAPACK_SYSTEM_PROMPT, use_cache,
+                    on_file=add_file, prompt_prefix=get_datapack_prompt_prefix(tier)
+                )
+                
+                pack_name = name or datapack_data.get("pack_name", "generated_datapack")
+                model = run["model"].value
                 
-                # Create zip
-                zip_path = os.path.join(temp_dir, f"{pack_name}.zip")
-                self._create_zip(pack_dir, zip_path)
+                # Add anything not already added while streaming (e.g. cached results)
+                for file_path, content in datapack_data.get("files", {}).items():
+                    if file_path not in written:
+                        add_file(file_path, content)
+                GENERATION_STAGE_SECONDS.labels("file_write", "datapack", tier, model).observe(write_seconds)
                 
                 # Upload to R2
                 key = f"datapacks/{generation_id}/{pack_name}.zip"
-                file_url = self._upload_to_r2(zip_path, key)
+                with observe_stage("zip", "datapack", tier, model):
+                    zip_file, zip_size = pack.finish()
+                self._emit_progress(generation_id, "uploading")
+                with observe_stage("upload", "datapack", tier, model):
+                    file_url = await asyncio.to_thread(self._upload_fileobj_to_r2, zip_file, key)
                 
                 self._update_generation(generation_id, {
                     "status": "completed",
                     "file_url": file_url,
                     "file_name": f"{pack_name}.zip",
-                    "file_size": os.path.getsize(zip_path),
-                    "ai_model_used": model.value,
-                    "ai_tokens_used": tokens,
+                    "file_size": zip_size,
+                    "ai_model_used": run["model"].value,
+                    "ai_tokens_used": run["tokens"],
                     "completed_at": datetime.utcnow().isoformat(),
                     "expires_at": (datetime.utcnow() + timedelta(days=30)).isoformat(),
                     "output_metadata": {
+                        "cache_hit": run["cache_hit"],
+                        "coalesced": run["coalesced"],
+                        "routing": run["routing"],
+                        "json_repair": run["json_repair"],
+                        "cached_input_tokens": run["cached_input_tokens"],
                         "pack_name": pack_name,
                         "description": datapack_data.get("description", "")
                     }
                 })
+                GENERATIONS_TOTAL.labels("datapack", "completed").inc()
                 
         except Exception as e:
+            GENERATIONS_TOTAL.labels("datapack", "failed").inc()
             self._update_generation(generation_id, {
                 "status": "failed",
                 "error_message": str(e)
             })
     
-    async def generate_texture_pack(self, generation_id: str, style_description: str, textures: list, name: str = None):
+    async def generate_texture_pack(self, generation_id: str, style_description: str, textures: list, name: str = None, use_cache: bool = True):
         """Generate custom Minecraft textures"""
         try:
             self._update_generation(generation_id, {"status": "processing"})
@@ -221,26 +411,16 @@ class GeneratorService:
             # Generate prompts for each texture using AI
             full_prompt = get_texture_prompt(style_description, textures)
             
-            model = ai_router.route_request("texture_pack", "standard")
-            response_text, tokens = await ai_router.generate(full_prompt, TEXTURE_SYSTEM_PROMPT, model)
-            
             # Parse texture prompts
-            try:
-                texture_data = json.loads(response_text)
-            except json.JSONDecodeError:
-                start = response_text.find('{')
-                end = response_text.rfind('}') + 1
-                if start != -1 and end > start:
-                    texture_data = json.loads(response_text[start:end])
-                else:
-                    raise ValueError("Failed to parse AI response as JSON")
+            texture_data, run = await self._generate_json(
+                "texture_pack", "standard", full_prompt, TEXTURE_SYSTEM_PROMPT, use_cache,
+                prompt_prefix=get_texture_prompt_prefix()
+            )
             
             pack_name = name or texture_data.get("pack_name", "custom_textures")
+            model = run["model"].value
             
-            with tempfile.TemporaryDirectory() as temp_dir:
-                pack_dir = os.path.join(temp_dir, pack_name)
-                os.makedirs(pack_dir)
-                
+            with PackBuilder() as pack:
                 # Create pack.mcmeta
                 pack_mcmeta = {
                     "pack": {
@@ -248,110 +428,155 @@ class GeneratorService:
                         "description": texture_data.get("description", f"Custom textures: {style_description}")
                     }
                 }
-                with open(os.path.join(pack_dir, "pack.mcmeta"), 'w') as f:
-                    json.dump(pack_mcmeta, f, indent=2)
-                
-                # Generate each texture with Stable Diffusion
-                generated_count = 0
-                for texture_path, texture_info in texture_data.get("textures", {}).items():
-                    try:
-                        image_data = await self._generate_texture_image(
-                            texture_info.get("prompt", ""),
-                            texture_info.get("negative_prompt", "")
-                        )
-                        
-                        if image_data:
-                            # Save texture
-                            full_path = os.path.join(pack_dir, texture_path)
-                            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-                            
-                            with open(full_path, 'wb') as f:
-                                f.write(image_data)
-                            
-                            generated_count += 1
-                    except Exception as e:
-                        print(f"Failed to generate texture {texture_path}: {e}")
-                        continue
+                pack.add("pack.mcmeta", json.dumps(pack_mcmeta, indent=2))
                 
-                # Create zip
-                zip_path = os.path.join(temp_dir, f"{pack_name}.zip")
-                self._create_zip(pack_dir, zip_path)
+                # Generate textures with Stable Diffusion, several at a time
+                texture_results = await self._render_textures(
+                    generation_id,
+                    texture_data.get("textures", {}),
+                    pack
+                )
+                generated_count = sum(1 for result in texture_results.values() if result == "ok")
                 
                 # Upload to R2
                 key = f"textures/{generation_id}/{pack_name}.zip"
-                file_url = self._upload_to_r2(zip_path, key)
+                with observe_stage("zip", "texture_pack", "standard", model):
+                    zip_file, zip_size = pack.finish()
+                self._emit_progress(generation_id, "uploading")
+                with observe_stage("upload", "texture_pack", "standard", model):
+                    file_url = await asyncio.to_thread(self._upload_fileobj_to_r2, zip_file, key)
                 
                 self._update_generation(generation_id, {
                     "status": "completed",
                     "file_url": file_url,
                     "file_name": f"{pack_name}.zip",
-                    "file_size": os.path.getsize(zip_path),
-                    "ai_model_used": model.value,
-                    "ai_tokens_used": tokens,
+                    "file_size": zip_size,
+                    "ai_model_used": run["model"].value,
+                    "ai_tokens_used": run["tokens"],
                     "completed_at": datetime.utcnow().isoformat(),
                     "expires_at": (datetime.utcnow() + timedelta(days=30)).isoformat(),
                     "output_metadata": {
+                        "cache_hit": run["cache_hit"],
+                        "coalesced": run["coalesced"],
+                        "routing": run["routing"],
+                        "json_repair": run["json_repair"],
+                        "cached_input_tokens": run["cached_input_tokens"],
                         "pack_name": pack_name,
                         "textures_requested": len(textures),
                         "textures_generated": generated_count,
+                        "texture_results": texture_results,
                         "style": style_description
                     }
                 })
+                GENERATIONS_TOTAL.labels("texture_pack", "completed").inc()
                 
         except Exception as e:
+            GENERATIONS_TOTAL.labels("texture_pack", "failed").inc()
             self._update_generation(generation_id, {
                 "status": "failed",
                 "error_message": str(e)
             })
     
+    def _format_datapack_file(self, file_path: str, content):
+        """Pretty-print JSON datapack files; everything else is written as-is"""
+        if file_path.endswith('.json'):
+            if isinstance(content, str):
+                # Try to parse and reformat
+                try:
+                    content = json.dumps(json.loads(content), indent=2)
+                except:
+                    pass
+            else:
+                content = json.dumps(content, indent=2)
+        return content
+    
+    async def _render_textures(self, generation_id: str, textures: dict, pack: PackBuilder) -> dict:
+        """
+        Render textures concurrently (bounded by TEXTURE_RENDER_CONCURRENCY),
+        adding each image to the pack as soon as it finishes and reporting
+        progress at most every PROGRESS_EVENT_INTERVAL seconds.
+        Returns {texture_path: "ok" | error message}
+        """
+        semaphore = asyncio.Semaphore(TEXTURE_RENDER_CONCURRENCY)
+        
+        async def render(texture_path: str, texture_info: dict) -> tuple[str, str]:
+            async with semaphore:
+                try:
+                    image_data = await self._generate_texture_image(
+                        texture_info.get("prompt", ""),
+                        texture_info.get("negative_prompt", "")
+                    )
+                except Exception as e:
+                    print(f"Failed to generate texture {texture_path}: {e}")
+                    return texture_path, str(e)
+            
+            if not image_data:
+                return texture_path, "No image returned"
+            
+            # Save texture
+            try:
+                pack.add(texture_path, image_data)
+            except ValueError as e:
+                return texture_path, str(e)
+            
+            return texture_path, "ok"
+        
+        tasks = [
+            render(texture_path, texture_info)
+            for texture_path, texture_info in textures.items()
+        ]
+        
+        results = {}
+        last_progress = 0.0
+        self._emit_progress(generation_id, "rendering", done=0, total=len(tasks))
+        for finished in asyncio.as_completed(tasks):
+            texture_path, result = await finished
+            results[texture_path] = result
+            
+            now = time.monotonic()
+            if len(results) == len(tasks) or now - last_progress >= PROGRESS_EVENT_INTERVAL:
+                last_progress = now
+                self._emit_progress(generation_id, "rendering", done=len(results), total=len(tasks))
+        
+        return results
+    
     async def _generate_texture_image(self, prompt: str, negative_prompt: str) -> bytes:
         """Generate a single texture using Stable Diffusion via Replicate"""
         # Use a pixel art focused model
-        output = replicate.run(
-            "stability-ai/sdxl:39ed52f2a78e934b3ba6e2a89f5b1c712de7dfea535525255b1aa35c5565e08b",
-            input={
-                "prompt": f"minecraft texture, pixel art, 16x16, game asset, {prompt}",
-                "negative_prompt": f"blurry, realistic, photograph, 3d render, {negative_prompt}",
-                "width": 64,  # Generate larger, then downscale for quality
-                "height": 64,
-                "num_outputs": 1,
-                "guidance_scale": 7.5,
-                "num_inference_steps": 25
-            }
-        )
+        render_input = {
+            "prompt": f"minecraft texture, pixel art, 16x16, game asset, {prompt}",
+            "negative_prompt": f"blurry, realistic, photograph, 3d render, {negative_prompt}",
+            "width": 64,  # Generate larger, then downscale for quality
+            "height": 64,
+            "num_outputs": 1,
+            "guidance_scale": 7.5,
+            "num_inference_steps": 25
+        }
         
-        if output and len(output) > 0:
-            import httpx
-            async with httpx.AsyncClient() as client:
-                response = await client.get(output[0])
-                return response.content
+        # Identical prompts rendered for an earlier pack are reused
+        cache_key = image_cache.make_key(TEXTURE_MODEL_VERSION, render_input)
+        cached = image_cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        return None
-    
-    async def _compile_plugin(self, project_dir: str, plugin_name: str) -> str:
-        """Compile plugin with Maven"""
-        try:
-            # Run Maven build
-            result = subprocess.run(
-                ["mvn", "package", "-q"],
-                cwd=project_dir,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            
-            if result.returncode == 0:
-                # Find the jar file
-                target_dir = os.path.join(project_dir, "target")
-                if os.path.exists(target_dir):
-                    for file in os.listdir(target_dir):
-                        if file.endswith(".jar") and not file.endswith("-sources.jar"):
-                            return os.path.join(target_dir, file)
-            
-            return None
-        except Exception as e:
-            print(f"Compilation error: {e}")
-            return None
+        async def render() -> bytes:
+            with observe_stage("texture_render", "texture_pack", "standard", "sdxl"):
+                # replicate.run (and the first import) blocks, so keep it off the event loop
+                output = await asyncio.to_thread(
+                    lambda: self._replicate().run(TEXTURE_MODEL_VERSION, input=render_input)
+                )
+                
+                if output and len(output) > 0:
+                    response = await self.http_client.get(output[0])
+                    response.raise_for_status()
+                    image_cache.set(cache_key, response.content)
+                    return response.content
+                
+                return None
+        
+        # Packs rendering the same texture at the same time share one render
+        image_data, _ = await self.render_flights.do(cache_key, render)
+        return image_data
     
     def _create_plugin_yml(self, plugin_data: dict) -> str:
         """Create plugin.yml content from plugin data"""
@@ -385,14 +610,3 @@ author: BlockSmith AI
                 yml_content += f"    default: {perm_data.get('default', 'op')}\n"
         
         return yml_content
-    
-    def _create_zip(self, source_dir: str, zip_path: str, exclude: list = None):
-        """Create a zip file from a directory"""
-        exclude = exclude or []
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for root, dirs, files in os.walk(source_dir):
-                for file in files:
-                    if file not in exclude:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, source_dir)
-                        zipf.write(file_path, arcname)
@@ -0,0 +1,115 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+
+# Cache configuration
+IMAGE_CACHE_DIR = os.getenv(
+    "IMAGE_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "blocksmith_image_cache")
+)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+class ImageCache:
+    """
+    On-disk, content-addressed cache of rendered texture images.
+    
+    Keys cover the model version and the complete render input (expanded
+    prompt, negative prompt and generation parameters), so a hit is always
+    the image Replicate would have produced for the same request. The cache
+    is capped at IMAGE_CACHE_MAX_BYTES, evicting least recently used files.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        self.total_bytes = 0
+        if IMAGE_CACHE_DIR:
+            os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+            self.total_bytes = sum(
+                entry.stat().st_size for entry in os.scandir(IMAGE_CACHE_DIR)
+                if entry.name.endswith(".png")
+            )
+    
+    def make_key(self, model_version: str, render_input: dict) -> str:
+        """Build the cache key for a render request"""
+        material = json.dumps([model_version, render_input], sort_keys=True)
+        return hashlib.sha256(material.encode()).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(IMAGE_CACHE_DIR, f"{key}.png")
+    
+    def get(self, key: str) -> bytes:
+        """Return cached image bytes for key, or None"""
+        if not IMAGE_CACHE_DIR:
+            return None
+        
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            # Refresh mtime so eviction is least-recently-used
+            os.utime(self._path(key))
+        except OSError:
+            with self.lock:
+                self.misses += 1
+            return None
+        
+        with self.lock:
+            self.hits += 1
+        return data
+    
+    def set(self, key: str, data: bytes):
+        """Store rendered image bytes"""
+        if not IMAGE_CACHE_DIR:
+            return
+        
+        try:
+            # Write then rename so readers never see a partial file
+            temp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+            with self.lock:
+                self.total_bytes += len(data)
+            if self.total_bytes > IMAGE_CACHE_MAX_BYTES:
+                self._evict()
+        except OSError as e:
+            print(f"Image cache write failed: {e}")
+    
+    def _evict(self):
+        """Delete least recently used images until the cache is under 90% of its cap"""
+        entries = sorted(
+            (entry for entry in os.scandir(IMAGE_CACHE_DIR) if entry.name.endswith(".png")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        total = sum(entry.stat().st_size for entry in entries)
+        target = IMAGE_CACHE_MAX_BYTES * 0.9
+        for entry in entries:
+            if total <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        
+        with self.lock:
+            self.total_bytes = total
+    
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "bytes": self.total_bytes
+            }
+
+# Singleton instance
+image_cache = ImageCache()
@@ -0,0 +1,477 @@
+import os
+import json
+import uuid
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from services.supabase_client import get_supabase_client
+from services.scheduler import classify, finish_tag
+
+# Queue configuration
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "sqlite")  # sqlite, postgres
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "generation_jobs.db")
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+class SQLiteJobQueue:
+    """
+    Job queue (and generation event log) stored in a local SQLite file.
+    
+    Suitable for development and single-host deployments where the API and
+    the workers share a filesystem. Leasing runs inside an IMMEDIATE
+    transaction so concurrent workers never claim the same job.
+    
+    Jobs are leased in fair-queueing order (see services.scheduler): each
+    gets a lane and a finish tag when it's enqueued, and workers take the
+    lowest tag in the lanes they have room for.
+    
+    The file is separate from the Supabase database, so a job can't be queued
+    in the same transaction as the debit for it.
+    """
+    
+    shares_database = False
+    
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS generation_jobs (
+                    id TEXT PRIMARY KEY,
+                    generation_id TEXT NOT NULL,
+                    job_type TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    locked_by TEXT,
+                    lease_expires_at TEXT,
+                    last_error TEXT,
+                    user_id TEXT,
+                    lane TEXT NOT NULL DEFAULT 'normal',
+                    cost REAL NOT NULL DEFAULT 0,
+                    finish_tag REAL NOT NULL DEFAULT 0,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            
+            # Queue files created before fair scheduling lack its columns
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(generation_jobs)")}
+            for column, definition in (
+                ("user_id", "TEXT"),
+                ("lane", "TEXT NOT NULL DEFAULT 'normal'"),
+                ("cost", "REAL NOT NULL DEFAULT 0"),
+                ("finish_tag", "REAL NOT NULL DEFAULT 0")
+            ):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE generation_jobs ADD COLUMN {column} {definition}")
+            
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generation_jobs_status "
+                "ON generation_jobs(status, created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generation_jobs_schedule "
+                "ON generation_jobs(status, lane, finish_tag)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_generation_jobs_user "
+                "ON generation_jobs(user_id, status)"
+            )
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS generation_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    generation_id TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            """)
+    
+    @contextmanager
+    def _connect(self):
+        """Open an autocommit connection that is closed on exit"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+        finally:
+            conn.close()
+    
+    def enqueue(self, generation_id: str, job_type: str, payload: dict, user_id: str = None) -> str:
+        """Add a job to the queue and return its id"""
+        job_id = str(uuid.uuid4())
+        now = datetime.utcnow().isoformat()
+        lane, cost = classify(job_type, payload)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Virtual time is the tag at the head of the queue (or the last tag handed out)
+                virtual_time = conn.execute(
+                    "SELECT COALESCE("
+                    "  (SELECT MIN(finish_tag) FROM generation_jobs WHERE status = 'queued'),"
+                    "  (SELECT MAX(finish_tag) FROM generation_jobs),"
+                    "  0)"
+                ).fetchone()[0]
+                user_last_tag = conn.execute(
+                    "SELECT MAX(finish_tag) FROM generation_jobs "
+                    "WHERE user_id = ? AND status IN ('queued', 'running')",
+                    (user_id,)
+                ).fetchone()[0] if user_id else None
+                
+                conn.execute(
+                    "INSERT INTO generation_jobs "
+                    "(id, generation_id, job_type, payload, max_attempts, user_id, lane, cost, finish_tag, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        job_id, generation_id, job_type, json.dumps(payload), JOB_MAX_ATTEMPTS,
+                        user_id, lane, cost, finish_tag(virtual_time, user_last_tag, cost), now, now
+                    )
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return job_id
+    
+    def lease(self, worker_id: str, lanes: list = None) -> dict:
+        """
+        Claim the next runnable job for this worker, in fair-queueing order,
+        optionally only from the given lanes.
+        Runnable means queued, or running with an expired lease (worker died).
+        Returns None when the queue is empty.
+        """
+        now = datetime.utcnow()
+        expires = (now + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+        lane_filter = ""
+        params = [now.isoformat()]
+        if lanes:
+            lane_filter = f" AND lane IN ({', '.join('?' for _ in lanes)})"
+            params.extend(lanes)
+        
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT * FROM generation_jobs "
+                    "WHERE attempts < max_attempts AND ("
+                    "  status = 'queued' OR (status = 'running' AND lease_expires_at < ?)"
+                    f"){lane_filter} ORDER BY finish_tag, created_at LIMIT 1",
+                    params
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE generation_jobs SET status = 'running', attempts = attempts + 1, "
+                        "locked_by = ?, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                        (worker_id, expires, now.isoformat(), row["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        
+        if not row:
+            return None
+        
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job.update({
+            "status": "running",
+            "attempts": job["attempts"] + 1,
+            "locked_by": worker_id,
+            "lease_expires_at": expires
+        })
+        return job
+    
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease. Returns False if the job was taken over by another worker."""
+        now = datetime.utcnow()
+        expires = (now + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE generation_jobs SET lease_expires_at = ?, updated_at = ? "
+                "WHERE id = ? AND locked_by = ? AND status = 'running'",
+                (expires, now.isoformat(), job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+    
+    def complete(self, job_id: str, worker_id: str):
+        """Mark a job as finished"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE generation_jobs SET status = 'completed', lease_expires_at = NULL, "
+                "updated_at = ? WHERE id = ? AND locked_by = ?",
+                (datetime.utcnow().isoformat(), job_id, worker_id)
+            )
+    
+    def fail(self, job_id: str, worker_id: str, error: str):
+        """Record a failed attempt; the job is retried until max_attempts is reached"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE generation_jobs SET "
+                "status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'dead' END, "
+                "last_error = ?, locked_by = NULL, lease_expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND locked_by = ?",
+                (error, datetime.utcnow().isoformat(), job_id, worker_id)
+            )
+    
+    def reap_dead(self) -> list:
+        """
+        Mark jobs whose lease expired on their final attempt as dead.
+        Returns the affected generation ids so they can be marked failed.
+        """
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT id, generation_id FROM generation_jobs "
+                    "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts",
+                    (now,)
+                ).fetchall()
+                for row in rows:
+                    conn.execute(
+                        "UPDATE generation_jobs SET status = 'dead', locked_by = NULL, "
+                        "lease_expires_at = NULL, last_error = 'Lease expired', updated_at = ? "
+                        "WHERE id = ?",
+                        (now, row["id"])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        
+        return [row["generation_id"] for row in rows]
+    
+    def depth(self) -> int:
+        """Number of jobs waiting to be leased"""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM generation_jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+    
+    def counts(self) -> dict:
+        """Number of jobs in each state (queued, running, completed, dead)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) FROM generation_jobs GROUP BY status"
+            ).fetchall()
+        return {status: count for status, count in rows}
+    
+    def queue_positions(self, generation_ids: list) -> dict:
+        """
+        Where each generation's queued job stands, in one query:
+        {generation_id: {"queue_position" (1 = next), "ahead_seconds", "lane"}}.
+        Fast-lane jobs only queue behind other fast-lane jobs. Generations that
+        aren't queued are left out.
+        """
+        if not generation_ids:
+            return {}
+        placeholders = ", ".join("?" * len(generation_ids))
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT j.generation_id, j.lane, COUNT(o.id) + 1 AS queue_position, "
+                "COALESCE(SUM(o.cost), 0) AS ahead_seconds "
+                "FROM generation_jobs j "
+                "LEFT JOIN generation_jobs o ON o.status = 'queued' AND o.finish_tag < j.finish_tag "
+                "AND (j.lane <> 'fast' OR o.lane = 'fast') "
+                f"WHERE j.status = 'queued' AND j.generation_id IN ({placeholders}) "
+                "GROUP BY j.id",
+                list(generation_ids)
+            ).fetchall()
+        return {
+            row["generation_id"]: {
+                "queue_position": row["queue_position"],
+                "ahead_seconds": row["ahead_seconds"],
+                "lane": row["lane"]
+            }
+            for row in rows
+        }
+    
+    def publish_event(self, generation_id: str, event: dict):
+        """Append a progress/status event for a generation"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO generation_events (generation_id, event, created_at) VALUES (?, ?, ?)",
+                (generation_id, json.dumps(event), datetime.utcnow().isoformat())
+            )
+    
+    def read_events(self, after_id: int, limit: int = 500) -> list:
+        """Events newer than after_id, oldest first, as (id, generation_id, event)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, generation_id, event FROM generation_events "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            ).fetchall()
+        return [(row["id"], row["generation_id"], json.loads(row["event"])) for row in rows]
+    
+    def latest_event_id(self) -> int:
+        """Id of the newest event (0 if there are none)"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(id), 0) FROM generation_events").fetchone()[0]
+    
+    def prune_events(self, max_age_seconds: int):
+        """Delete events older than max_age_seconds"""
+        cutoff = (datetime.utcnow() - timedelta(seconds=max_age_seconds)).isoformat()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM generation_events WHERE created_at < ?", (cutoff,))
+
+class PostgresJobQueue:
+    """
+    Job queue stored in the Supabase `generation_jobs` table, with generation
+    events in `generation_events`.
+    
+    Enqueueing, leasing and reaping go through the Postgres functions defined
+    in migrations/002_generation_jobs.sql and 005_fair_scheduling.sql, which
+    use FOR UPDATE SKIP LOCKED so any number of worker replicas can poll the
+    same table.
+    
+    Jobs live in the same database as credits, so the API queues them in the
+    transaction that debits the user (see create_generation_with_debit).
+    """
+    
+    shares_database = True
+    
+    def __init__(self):
+        self.supabase = get_supabase_client()
+    
+    def job_params(self, generation_id: str, job_type: str, payload: dict, user_id: str = None) -> dict:
+        """Parameters for enqueue_generation_job (and create_generation_job_with_debit)"""
+        lane, cost = classify(job_type, payload)
+        return {
+            "p_generation_id": generation_id,
+            "p_job_type": job_type,
+            "p_payload": payload,
+            "p_max_attempts": JOB_MAX_ATTEMPTS,
+            "p_user_id": user_id,
+            "p_lane": lane,
+            "p_cost": cost
+        }
+    
+    def enqueue(self, generation_id: str, job_type: str, payload: dict, user_id: str = None) -> str:
+        """Add a job to the queue and return its id"""
+        response = self.supabase.rpc(
+            "enqueue_generation_job",
+            self.job_params(generation_id, job_type, payload, user_id)
+        ).execute()
+        return response.data
+    
+    def lease(self, worker_id: str, lanes: list = None) -> dict:
+        """Claim the next runnable job (optionally only from the given lanes), or None"""
+        response = self.supabase.rpc("lease_generation_job", {
+            "p_worker_id": worker_id,
+            "p_lease_seconds": JOB_LEASE_SECONDS,
+            "p_lanes": lanes
+        }).execute()
+        return response.data[0] if response.data else None
+    
+    def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """Extend the lease. Returns False if the job was taken over by another worker."""
+        expires = (datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)).isoformat()
+        response = self.supabase.table("generation_jobs")\
+            .update({"lease_expires_at": expires})\
+            .eq("id", job_id)\
+            .eq("locked_by", worker_id)\
+            .eq("status", "running")\
+            .execute()
+        return bool(response.data)
+    
+    def complete(self, job_id: str, worker_id: str):
+        """Mark a job as finished"""
+        self.supabase.table("generation_jobs")\
+            .update({"status": "completed", "lease_expires_at": None})\
+            .eq("id", job_id)\
+            .eq("locked_by", worker_id)\
+            .execute()
+    
+    def fail(self, job_id: str, worker_id: str, error: str):
+        """Record a failed attempt; the job is retried until max_attempts is reached"""
+        self.supabase.rpc("fail_generation_job", {
+            "p_job_id": job_id,
+            "p_worker_id": worker_id,
+            "p_error": error
+        }).execute()
+    
+    def reap_dead(self) -> list:
+        """Mark exhausted expired jobs as dead and return their generation ids"""
+        response = self.supabase.rpc("reap_generation_jobs", {}).execute()
+        return [row["generation_id"] for row in (response.data or [])]
+    
+    def depth(self) -> int:
+        """Number of jobs waiting to be leased"""
+        response = self.supabase.table("generation_jobs")\
+            .select("id", count="exact")\
+            .eq("status", "queued")\
+            .limit(1)\
+            .execute()
+        return response.count or 0
+    
+    def counts(self) -> dict:
+        """Number of jobs in each live state (finished jobs aren't counted)"""
+        counts = {}
+        for status in ("queued", "running"):
+            response = self.supabase.table("generation_jobs")\
+                .select("id", count="exact")\
+                .eq("status", status)\
+                .limit(1)\
+                .execute()
+            counts[status] = response.count or 0
+        return counts
+    
+    def queue_positions(self, generation_ids: list) -> dict:
+        """{generation_id: {"queue_position", "ahead_seconds", "lane"}} for the queued ones, in one call"""
+        if not generation_ids:
+            return {}
+        response = self.supabase.rpc("generation_queue_positions", {
+            "p_generation_ids": list(generation_ids)
+        }).execute()
+        return {
+            row["generation_id"]: {key: row[key] for key in ("queue_position", "ahead_seconds", "lane")}
+            for row in response.data or []
+        }
+    
+    def publish_event(self, generation_id: str, event: dict):
+        """Append a progress/status event for a generation"""
+        self.supabase.table("generation_events").insert({
+            "generation_id": generation_id,
+            "event": event
+        }).execute()
+    
+    def read_events(self, after_id: int, limit: int = 500) -> list:
+        """Events newer than after_id, oldest first, as (id, generation_id, event)"""
+        response = self.supabase.table("generation_events")\
+            .select("id, generation_id, event")\
+            .gt("id", after_id)\
+            .order("id")\
+            .limit(limit)\
+            .execute()
+        return [(row["id"], row["generation_id"], row["event"]) for row in response.data]
+    
+    def latest_event_id(self) -> int:
+        """Id of the newest event (0 if there are none)"""
+        response = self.supabase.table("generation_events")\
+            .select("id")\
+            .order("id", desc=True)\
+            .limit(1)\
+            .execute()
+        return response.data[0]["id"] if response.data else 0
+    
+    def prune_events(self, max_age_seconds: int):
+        """Delete events older than max_age_seconds"""
+        cutoff = (datetime.utcnow() - timedelta(seconds=max_age_seconds)).isoformat()
+        self.supabase.table("generation_events")\
+            .delete()\
+            .lt("created_at", cutoff)\
+            .execute()
+
+@lru_cache()
+def get_job_queue():
+    """Get the configured job queue (cached)"""
+    if JOB_QUEUE_BACKEND == "postgres":
+        return PostgresJobQueue()
+    if JOB_QUEUE_BACKEND == "sqlite":
+        return SQLiteJobQueue()
+    raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {JOB_QUEUE_BACKEND}")
@@ -0,0 +1,190 @@
+import re
+import json
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib decoder
+    orjson = None
+
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*\n?(.*?)```", re.DOTALL)
+VALID_ESCAPES = set('"\\/bfnrtu')
+
+# Per-type shape of the model output: required/optional top-level keys and
+# the types allowed for them, plus the types allowed for each generated file
+NUMBERISH = (str, int, float)
+SCHEMAS = {
+    "plugin": {
+        "required": {"files": dict},
+        "optional": {
+            "plugin_name": str,
+            "version": NUMBERISH,
+            "description": str,
+            "main_class": str,
+            "api_version": NUMBERISH,
+            "commands": dict,
+            "permissions": dict
+        },
+        "collection": "files",
+        "entry_types": str
+    },
+    "datapack": {
+        "required": {"files": dict},
+        "optional": {"pack_name": str, "description": str},
+        "collection": "files",
+        "entry_types": (str, dict, list)
+    },
+    "texture_pack": {
+        "required": {"textures": dict},
+        "optional": {"pack_name": str, "description": str, "style_guide": str},
+        "collection": "textures",
+        "entry_types": dict
+    }
+}
+
+_strict_decoder = json.JSONDecoder()
+_lenient_decoder = json.JSONDecoder(strict=False)
+
+def _loads(text: str):
+    if orjson:
+        return orjson.loads(text)
+    return json.loads(text)
+
+def _decode_object(text: str, start: int, decoder: json.JSONDecoder):
+    """Decode the JSON object starting at text[start], ignoring anything after it"""
+    data, _ = decoder.raw_decode(text, start)
+    return data
+
+def _repair_syntax(text: str) -> str:
+    """
+    Fix the mistakes models make inside otherwise well-formed output:
+    invalid backslash escapes (e.g. Java regexes), raw control characters
+    in strings and trailing commas.
+    """
+    out = []
+    in_string = False
+    i = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if in_string:
+            if char == "\\":
+                following = text[i + 1] if i + 1 < length else ""
+                if following in VALID_ESCAPES:
+                    out.append(text[i:i + 2])
+                    i += 2
+                    continue
+                out.append("\\\\")
+            elif char == '"':
+                in_string = False
+                out.append(char)
+            elif char == "\n":
+                out.append("\\n")
+            elif char == "\r":
+                out.append("\\r")
+            elif char == "\t":
+                out.append("\\t")
+            else:
+                out.append(char)
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif char in "}]":
+            # Drop a trailing comma before the closing bracket
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+            out.append(char)
+        else:
+            out.append(char)
+        i += 1
+    return "".join(out)
+
+def extract_json(text: str) -> tuple:
+    """
+    Pull the JSON object out of a model response, repairing it if needed.
+    Tries the cheapest interpretation first and stops at the first success.
+    Returns (data, repair) where repair is "none", "code_fence", "trimmed",
+    "control_chars" or "syntax"; raises ValueError if nothing works.
+    """
+    try:
+        data = _loads(text)
+        if isinstance(data, dict):
+            return data, "none"
+    except ValueError:
+        pass
+    
+    fenced = FENCE_PATTERN.search(text)
+    if fenced:
+        try:
+            data = _loads(fenced.group(1))
+            if isinstance(data, dict):
+                return data, "code_fence"
+        except ValueError:
+            pass
+    
+    # Prose before the object can contain braces of its own ("use {player}
+    # as a placeholder"), so every candidate start gets all three repairs
+    # before moving on to the next "{"
+    error = ValueError("No JSON object found")
+    start = text.find("{")
+    while start != -1:
+        attempts = (
+            ("trimmed", lambda: _decode_object(text, start, _strict_decoder)),
+            ("control_chars", lambda: _decode_object(text, start, _lenient_decoder)),
+            ("syntax", lambda: _decode_object(_repair_syntax(text[start:]), 0, _lenient_decoder))
+        )
+        resume = start + 1
+        for repair, attempt in attempts:
+            try:
+                return attempt(), repair
+            except ValueError as e:
+                error = e
+                # Braces before where decoding failed were nested in this
+                # candidate, not the start of another object
+                if repair == "control_chars" and isinstance(e, json.JSONDecodeError):
+                    resume = max(resume, e.pos)
+        start = text.find("{", resume)
+    
+    raise ValueError(f"Failed to parse AI response as JSON: {error}")
+
+def _type_name(expected) -> str:
+    if isinstance(expected, tuple):
+        return " or ".join(t.__name__ for t in expected)
+    return expected.__name__
+
+def validate_output(generation_type: str, data: dict) -> list:
+    """
+    Check model output against the schema for its generation type.
+    Missing or malformed required fields raise ValueError; malformed optional
+    fields are dropped so the defaults apply. Returns the dropped field names.
+    """
+    schema = SCHEMAS.get(generation_type)
+    if not schema:
+        return []
+    
+    for field, expected in schema["required"].items():
+        if not isinstance(data.get(field), expected):
+            raise ValueError(f"AI response is missing a valid '{field}' ({_type_name(expected)})")
+    
+    dropped = []
+    for field, expected in schema["optional"].items():
+        if field in data and not isinstance(data[field], expected):
+            del data[field]
+            dropped.append(field)
+    
+    collection = data[schema["collection"]]
+    if not collection:
+        raise ValueError(f"AI response has no {schema['collection']}")
+    
+    for path, entry in collection.items():
+        if not isinstance(entry, schema["entry_types"]):
+            raise ValueError(
+                f"AI response entry '{path}' must be {_type_name(schema['entry_types'])}, "
+                f"got {type(entry).__name__}"
+            )
+        if generation_type == "texture_pack" and not isinstance(entry.get("prompt"), str):
+            raise ValueError(f"AI response texture '{path}' has no prompt")
+    
+    return dropped
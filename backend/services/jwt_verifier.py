@@ -0,0 +1,140 @@
+import os
+import time
+import hashlib
+import asyncio
+import httpx
+import jwt
+
+from services.ttl_cache import TTLCache
+
+# Verification configuration
+SUPABASE_URL = os.getenv("SUPABASE_URL", "")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")  # legacy HS256 projects
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_REFRESH_SECONDS = int(os.getenv("JWKS_REFRESH_SECONDS", "600"))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "60"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256", "EdDSA"}
+
+class TokenUser:
+    """The subset of the Supabase user object the API relies on, built from JWT claims"""
+    
+    def __init__(self, claims: dict):
+        self.id = claims["sub"]
+        self.email = claims.get("email")
+        self.role = claims.get("role")
+        self.aud = claims.get("aud")
+        self.user_metadata = claims.get("user_metadata", {})
+        self.app_metadata = claims.get("app_metadata", {})
+
+class JWTVerifier:
+    """
+    Verifies Supabase access tokens without a network round trip.
+    
+    Asymmetric tokens are checked against the project's JWKS, which is cached
+    and refreshed every JWKS_REFRESH_SECONDS (or sooner when an unknown key id
+    shows up). HS256 tokens are checked with SUPABASE_JWT_SECRET. Verified
+    users are kept for TOKEN_CACHE_TTL seconds, never past the token's expiry.
+    
+    `verify` returns None when it can't reach a verdict (no key material for
+    the token), so the caller can fall back to asking Supabase.
+    """
+    
+    def __init__(self):
+        self.jwks = {}
+        self.jwks_fetched_at = 0.0
+        self.jwks_lock = asyncio.Lock()
+        self.cache = TTLCache(TOKEN_CACHE_TTL, TOKEN_CACHE_MAX_ENTRIES)
+    
+    def _cache_key(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    def get_cached(self, token: str):
+        """Return the cached user for token, or None"""
+        return self.cache.get(self._cache_key(token))
+    
+    def remember(self, token: str, user, token_exp: float = None):
+        """Cache a verified user for TOKEN_CACHE_TTL (capped at the token's expiry)"""
+        ttl = TOKEN_CACHE_TTL
+        if token_exp:
+            ttl = min(ttl, token_exp - time.time())
+        self.cache.set(self._cache_key(token), user, ttl)
+    
+    async def _refresh_jwks(self, force: bool = False):
+        """Fetch the project's signing keys if the cached set is stale"""
+        async with self.jwks_lock:
+            age = time.time() - self.jwks_fetched_at
+            # Even forced refreshes are rate limited so bogus kids can't hammer the auth server
+            if age < JWKS_REFRESH_SECONDS and not (force and age > 30):
+                return
+            
+            try:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.get(f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json")
+                    response.raise_for_status()
+                keys = {}
+                for jwk in response.json().get("keys", []):
+                    try:
+                        keys[jwk.get("kid")] = jwt.PyJWK(jwk).key
+                    except jwt.PyJWTError:
+                        continue
+                self.jwks = keys
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"JWKS refresh failed: {e}")
+            finally:
+                self.jwks_fetched_at = time.time()
+    
+    async def _signing_key(self, header: dict):
+        """Key material for this token, or None if we don't have it"""
+        algorithm = header.get("alg")
+        
+        if algorithm == "HS256":
+            return SUPABASE_JWT_SECRET or None
+        
+        if algorithm in ASYMMETRIC_ALGORITHMS and SUPABASE_URL:
+            kid = header.get("kid")
+            await self._refresh_jwks()
+            if kid not in self.jwks:
+                await self._refresh_jwks(force=True)
+            return self.jwks.get(kid)
+        
+        return None
+    
+    async def verify(self, token: str):
+        """
+        Verify signature, expiry and audience locally.
+        Returns the user, raises ValueError for a bad token, or returns None if inconclusive.
+        """
+        user = self.get_cached(token)
+        if user:
+            return user
+        
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError:
+            raise ValueError("Invalid token")
+        
+        key = await self._signing_key(header)
+        if key is None:
+            return None
+        
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[header["alg"]],
+                audience=SUPABASE_JWT_AUDIENCE,
+                options={"require": ["exp", "sub"]}
+            )
+        except jwt.ExpiredSignatureError:
+            raise ValueError("Token expired")
+        except jwt.PyJWTError:
+            raise ValueError("Invalid token")
+        
+        user = TokenUser(claims)
+        self.remember(token, user, claims["exp"])
+        return user
+
+# Singleton instance
+jwt_verifier = JWTVerifier()
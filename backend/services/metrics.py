@@ -0,0 +1,92 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+
+from services.result_cache import result_cache
+from services.image_cache import image_cache
+
+# Buckets sized for generation work: sub-second parsing up to multi-minute AI calls and compiles
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180, 300, 600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "blocksmith_http_request_duration_seconds",
+    "API request latency by route",
+    ["method", "route", "status"]
+)
+
+GENERATION_STAGE_SECONDS = Histogram(
+    "blocksmith_generation_stage_seconds",
+    "Time spent in each generation stage",
+    ["stage", "type", "tier", "model"],
+    buckets=STAGE_BUCKETS
+)
+
+GENERATIONS_TOTAL = Counter(
+    "blocksmith_generations_total",
+    "Finished generations by outcome",
+    ["type", "status"]
+)
+
+GENERATIONS_IN_FLIGHT = Gauge(
+    "blocksmith_generations_in_flight",
+    "Generations currently running in this worker"
+)
+
+AI_TOKENS_TOTAL = Counter(
+    "blocksmith_ai_tokens_total",
+    "AI tokens used, split by how they were billed",
+    ["model", "kind"]  # kind: input, cached_input, cache_write, output
+)
+
+ADMISSION_REJECTIONS = Counter(
+    "blocksmith_admission_rejections_total",
+    "Generation submissions refused before debiting credits",
+    ["type", "reason"]  # reason: rate_limited, queue_full
+)
+
+QUEUE_JOBS = Gauge(
+    "blocksmith_queue_jobs",
+    "Generation jobs in the queue by state",
+    ["state"]
+)
+
+@contextmanager
+def observe_stage(stage: str, generation_type: str, tier: str, model: str = ""):
+    """Time a block of generation work into GENERATION_STAGE_SECONDS"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        GENERATION_STAGE_SECONDS.labels(stage, generation_type, tier, model).observe(time.monotonic() - started)
+
+class CacheCollector:
+    """Exports the result and image cache counters at scrape time"""
+    
+    def collect(self):
+        lookups = CounterMetricFamily(
+            "blocksmith_cache_lookups",
+            "Cache lookups by cache and outcome",
+            labels=["cache", "outcome"]
+        )
+        ratio = GaugeMetricFamily(
+            "blocksmith_cache_hit_ratio",
+            "Share of cache lookups that hit",
+            labels=["cache"]
+        )
+        
+        results = result_cache.stats()
+        lookups.add_metric(["result", "hit"], results["hits"])
+        lookups.add_metric(["result", "disk_hit"], results["disk_hits"])
+        lookups.add_metric(["result", "miss"], results["misses"])
+        ratio.add_metric(["result"], results["hit_ratio"])
+        
+        images = image_cache.stats()
+        lookups.add_metric(["image", "hit"], images["hits"])
+        lookups.add_metric(["image", "miss"], images["misses"])
+        ratio.add_metric(["image"], images["hit_ratio"])
+        
+        yield lookups
+        yield ratio
+
+REGISTRY.register(CacheCollector())
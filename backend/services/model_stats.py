@@ -0,0 +1,58 @@
+import os
+import time
+import threading
+from collections import deque
+
+# Rolling window used for routing decisions
+ROUTING_WINDOW_SIZE = int(os.getenv("ROUTING_WINDOW_SIZE", "100"))
+ROUTING_WINDOW_SECONDS = int(os.getenv("ROUTING_WINDOW_SECONDS", "900"))
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of values (which must be non-empty)"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+class ModelStats:
+    """
+    Rolling outcome statistics for one model on one kind of generation.
+    
+    Keeps the last ROUTING_WINDOW_SIZE calls, ignoring anything older than
+    ROUTING_WINDOW_SECONDS so a provider that was sidelined gets another
+    chance once its bad samples age out.
+    """
+    
+    def __init__(self):
+        self.calls = deque(maxlen=ROUTING_WINDOW_SIZE)  # (timestamp, latency, ok)
+        self.parses = deque(maxlen=ROUTING_WINDOW_SIZE)  # (timestamp, ok)
+        self.lock = threading.Lock()
+    
+    def record_call(self, latency: float, ok: bool):
+        with self.lock:
+            self.calls.append((time.time(), latency, ok))
+    
+    def record_parse(self, ok: bool):
+        with self.lock:
+            self.parses.append((time.time(), ok))
+    
+    def snapshot(self) -> dict:
+        """Current window: sample count, latency percentiles and failure rates"""
+        cutoff = time.time() - ROUTING_WINDOW_SECONDS
+        with self.lock:
+            calls = [call for call in self.calls if call[0] >= cutoff]
+            parses = [parse for parse in self.parses if parse[0] >= cutoff]
+        
+        latencies = [latency for _, latency, ok in calls if ok]
+        errors = sum(1 for _, _, ok in calls if not ok)
+        parse_failures = sum(1 for _, ok in parses if not ok)
+        
+        error_rate = errors / len(calls) if calls else 0.0
+        parse_failure_rate = parse_failures / len(parses) if parses else 0.0
+        return {
+            "samples": len(calls),
+            "p50": percentile(latencies, 0.5) if latencies else None,
+            "p95": percentile(latencies, 0.95) if latencies else None,
+            "error_rate": error_rate,
+            "parse_failure_rate": parse_failure_rate,
+            "success_rate": (1 - error_rate) * (1 - parse_failure_rate)
+        }
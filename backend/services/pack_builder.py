@@ -0,0 +1,69 @@
+import os
+import zipfile
+import posixpath
+import tempfile
+
+# Packs are assembled in memory and only spill to disk past this size
+PACK_SPOOL_MAX_BYTES = int(os.getenv("PACK_SPOOL_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Formats that are already compressed; deflating them again only costs CPU
+STORED_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".ogg", ".mp3",
+    ".jar", ".zip", ".gz",
+    ".nbt", ".mca"  # gzip/zlib compressed Minecraft data
+}
+
+class PackBuilder:
+    """
+    Streams generated files straight into a zip archive.
+    
+    The archive is written to a spooled buffer that stays in memory until it
+    grows past PACK_SPOOL_MAX_BYTES. Already-compressed formats are stored
+    as-is and everything else is deflated. `finish()` returns the buffer
+    rewound and ready to hand to an upload.
+    """
+    
+    def __init__(self):
+        self.buffer = tempfile.SpooledTemporaryFile(max_size=PACK_SPOOL_MAX_BYTES)
+        self.zip = zipfile.ZipFile(self.buffer, 'w', zipfile.ZIP_DEFLATED)
+        self.file_count = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _arcname(self, path: str) -> str:
+        """Normalize an archive path and refuse anything escaping the pack root"""
+        arcname = posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+        if arcname in (".", "..") or arcname.startswith("../"):
+            raise ValueError(f"Invalid file path in generated output: {path}")
+        return arcname
+    
+    def add(self, path: str, content):
+        """Add a file (str or bytes) to the archive"""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        
+        extension = os.path.splitext(path)[1].lower()
+        compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        
+        self.zip.writestr(self._arcname(path), content, compress_type=compress_type)
+        self.file_count += 1
+    
+    def finish(self) -> tuple:
+        """
+        Finalize the archive.
+        Returns (fileobj positioned at the start, size in bytes)
+        """
+        self.zip.close()
+        size = self.buffer.tell()
+        self.buffer.seek(0)
+        return self.buffer, size
+    
+    def close(self):
+        """Release the buffer (and its spill file, if any)"""
+        self.zip.close()
+        self.buffer.close()
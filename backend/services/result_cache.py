@@ -0,0 +1,170 @@
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Cache configuration
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", str(7 * 24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "500"))
+RESULT_CACHE_DIR = os.getenv(
+    "RESULT_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "blocksmith_result_cache")
+)
+RESULT_CACHE_DISK_MAX_BYTES = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Bumped whenever the key material changes, so entries written under the old
+# keys on disk are never served (2: prompts are no longer casefolded)
+RESULT_CACHE_KEY_VERSION = 2
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Collapse runs of whitespace so prompts that only differ in spacing share
+    an entry. Case is kept: it ends up in generated names and strings.
+    """
+    return re.sub(r"\s+", " ", prompt).strip()
+
+class ResultCache:
+    """
+    Exact-match cache of parsed AI generation output.
+    
+    Entries live in a size-bounded in-memory LRU backed by an on-disk tier
+    (one JSON file per key) that survives restarts and is shared by every
+    worker on the host. Both tiers expire entries after RESULT_CACHE_TTL.
+    """
+    
+    def __init__(self):
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        self.disk_bytes = 0
+        if RESULT_CACHE_DIR:
+            os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+            self.disk_bytes = sum(
+                entry.stat().st_size for entry in os.scandir(RESULT_CACHE_DIR)
+                if entry.name.endswith(".json")
+            )
+    
+    def make_key(self, generation_type: str, tier: str, prompt: str, system_prompt: str, model: str) -> str:
+        """Build the cache key for a generation request"""
+        system_hash = hashlib.sha256(system_prompt.encode()).hexdigest()
+        material = json.dumps([RESULT_CACHE_KEY_VERSION, generation_type, tier, model, system_hash, normalize_prompt(prompt)])
+        return hashlib.sha256(material.encode()).hexdigest()
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(RESULT_CACHE_DIR, f"{key}.json")
+    
+    def get(self, key: str):
+        """Return the cached output for key, or None"""
+        if not RESULT_CACHE_ENABLED:
+            return None
+        
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry:
+                expires_at, data = entry
+                if expires_at > now:
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    return data
+                del self.memory[key]
+        
+        if RESULT_CACHE_DIR:
+            try:
+                with open(self._disk_path(key)) as f:
+                    entry = json.load(f)
+                if entry["expires_at"] > now:
+                    # Refresh mtime so disk eviction is least-recently-used
+                    os.utime(self._disk_path(key))
+                    self._remember(key, entry["expires_at"], entry["data"])
+                    with self.lock:
+                        self.disk_hits += 1
+                    return entry["data"]
+                self._remove_disk(key)
+            except (OSError, ValueError, KeyError):
+                pass
+        
+        with self.lock:
+            self.misses += 1
+        return None
+    
+    def set(self, key: str, data: dict):
+        """Store output in both tiers"""
+        if not RESULT_CACHE_ENABLED:
+            return
+        
+        expires_at = time.time() + RESULT_CACHE_TTL
+        self._remember(key, expires_at, data)
+        
+        if RESULT_CACHE_DIR:
+            try:
+                payload = json.dumps({"expires_at": expires_at, "data": data})
+                # Write then rename so readers never see a partial file
+                temp_path = f"{self._disk_path(key)}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'w') as f:
+                    f.write(payload)
+                os.replace(temp_path, self._disk_path(key))
+                with self.lock:
+                    self.disk_bytes += len(payload)
+                if self.disk_bytes > RESULT_CACHE_DISK_MAX_BYTES:
+                    self._evict_disk()
+            except OSError as e:
+                print(f"Result cache write failed: {e}")
+    
+    def _remember(self, key: str, expires_at: float, data: dict):
+        with self.lock:
+            self.memory[key] = (expires_at, data)
+            self.memory.move_to_end(key)
+            while len(self.memory) > RESULT_CACHE_MAX_ENTRIES:
+                self.memory.popitem(last=False)
+    
+    def _remove_disk(self, key: str):
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+    
+    def _evict_disk(self):
+        """Delete least recently written files until the disk tier is under 90% of its cap"""
+        entries = sorted(
+            (entry for entry in os.scandir(RESULT_CACHE_DIR) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime
+        )
+        total = sum(entry.stat().st_size for entry in entries)
+        target = RESULT_CACHE_DISK_MAX_BYTES * 0.9
+        for entry in entries:
+            if total <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        
+        with self.lock:
+            self.disk_bytes = total
+    
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring"""
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "disk_bytes": self.disk_bytes
+            }
+
+# Singleton instance
+result_cache = ResultCache()
@@ -0,0 +1,44 @@
+import os
+from datetime import datetime, timedelta
+
+# Expected run time (seconds) by type and tier, used to order the queue and estimate start times
+EXPECTED_SECONDS = {
+    "plugin": {"simple": 60, "medium": 90, "complex": 150},  # includes the Maven build
+    "datapack": {"simple": 15, "medium": 25, "complex": 40}
+}
+TEXTURE_PACK_BASE_SECONDS = 15
+TEXTURE_SECONDS = float(os.getenv("SCHEDULER_TEXTURE_SECONDS", "1.5"))  # per texture, renders running in parallel
+
+# Jobs expected to finish within this many seconds go in the fast lane
+FAST_LANE_MAX_SECONDS = float(os.getenv("FAST_LANE_MAX_SECONDS", "30"))
+
+# Worker slots (per worker) that only take fast-lane jobs, so short jobs never wait behind long ones
+FAST_LANE_SLOTS = int(os.getenv("FAST_LANE_SLOTS", "1"))
+
+# Job slots across all workers, for start time estimates
+SCHEDULER_CAPACITY = int(os.getenv("SCHEDULER_CAPACITY", os.getenv("WORKER_CONCURRENCY", "4")))
+
+def expected_seconds(job_type: str, payload: dict) -> float:
+    """How long a job should take to run, from its type, tier and texture count"""
+    if job_type == "texture_pack":
+        return TEXTURE_PACK_BASE_SECONDS + TEXTURE_SECONDS * len(payload.get("textures", []))
+    tiers = EXPECTED_SECONDS.get(job_type, {})
+    return tiers.get(payload.get("tier"), max(tiers.values(), default=60))
+
+def classify(job_type: str, payload: dict) -> tuple[str, float]:
+    """Returns (lane, expected seconds) for a job"""
+    cost = expected_seconds(job_type, payload)
+    return ("fast" if cost <= FAST_LANE_MAX_SECONDS else "normal"), cost
+
+def finish_tag(virtual_time: float, user_last_tag: float, cost: float) -> float:
+    """
+    Self-clocked fair queueing tag: a job finishes (in virtual time) one cost
+    after the later of now and the user's previous queued job. Leasing in tag
+    order shares workers evenly between users in proportion to the work they
+    ask for, so one account's backlog can't hold everyone else's jobs up.
+    """
+    return max(virtual_time, user_last_tag or 0.0) + cost
+
+def estimated_start(ahead_seconds: float) -> str:
+    """When a queued job should start, given the expected work queued ahead of it"""
+    return (datetime.utcnow() + timedelta(seconds=ahead_seconds / max(1, SCHEDULER_CAPACITY))).isoformat()
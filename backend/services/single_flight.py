@@ -0,0 +1,52 @@
+import asyncio
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+    
+    The first caller for a key runs the work; anyone asking for the same key
+    while it's in flight waits for that result instead of starting their own.
+    Failures are shared the same way. Nothing is kept once the call finishes,
+    so this only deduplicates overlapping work (caching is done elsewhere).
+    """
+    
+    def __init__(self):
+        self.calls = {}  # key -> asyncio.Future
+    
+    async def do(self, key: str, fn) -> tuple:
+        """
+        Run `await fn()` unless an identical call is already in flight.
+        Returns (result, shared) where shared is True if another caller did the work
+        """
+        while True:
+            future = self.calls.get(key)
+            if future is None:
+                break
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                # The leader was cancelled; take over unless we were cancelled ourselves
+                if not future.cancelled():
+                    raise
+        
+        future = asyncio.get_running_loop().create_future()
+        self.calls[key] = future
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unshared failure isn't logged as never awaited
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self.calls[key]
+    
+    def in_flight(self) -> int:
+        """Number of distinct calls currently running"""
+        return len(self.calls)
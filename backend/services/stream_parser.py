@@ -0,0 +1,153 @@
+import json
+from collections import deque
+
+class FileStreamParser:
+    """
+    Incremental parser for AI output shaped like {"files": {"path": content, ...}, ...}.
+    
+    Feed it response text as it streams in; `on_file(path, content)` is called
+    as soon as each entry of the top-level "files" object is complete, long
+    before the whole response has arrived. Anything outside that object is
+    ignored here and picked up by the normal parse of the full response.
+    
+    Each chunk is scanned once, and only the text of a string or file value
+    still being read is kept, so the cost stays linear in the response size
+    however small the deltas are.
+    """
+    
+    def __init__(self, on_file):
+        self.on_file = on_file
+        self.parts = deque()  # (offset, chunk) for text that may still be sliced
+        self.length = 0  # characters fed so far
+        self.pos = 0
+        self.started = False
+        
+        # Lexer state
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.string_start = 0
+        self.last_string = None  # (depth, value) of the most recently closed string
+        self.keys = {}  # depth -> key whose value is being read
+        
+        # "files" object state
+        self.files_depth = None
+        self.files_done = False
+        self.entry_key = None
+        self.value_start = None
+        
+        self.emitted = set()
+    
+    def feed(self, chunk: str):
+        """Consume the next piece of response text"""
+        if self.files_done:
+            return
+        
+        start = self.length
+        self._trim(start)
+        self.parts.append((start, chunk))
+        self.length += len(chunk)
+        
+        for index, char in enumerate(chunk):
+            self.pos = start + index
+            
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    self._close_string()
+                continue
+            
+            if not self.started:
+                # Skip any prose or code fence before the JSON object
+                if char == "{":
+                    self.started = True
+                    self.depth = 1
+                continue
+            
+            if char == '"':
+                self.in_string = True
+                self.string_start = self.pos
+                if self._at_files_value_start():
+                    self.value_start = self.pos
+            elif char in "{[":
+                if self._at_files_value_start():
+                    self.value_start = self.pos
+                self.depth += 1
+                if char == "{" and self.depth == 2 and self.keys.get(1) == "files":
+                    self.files_depth = 2
+            elif char in "}]":
+                self.depth -= 1
+                if self.files_depth is not None:
+                    if self.depth == self.files_depth and self.value_start is not None:
+                        self._emit(self.pos + 1)
+                    elif self.depth < self.files_depth:
+                        self.files_done = True
+                        return
+            elif char == ":":
+                if self.last_string and self.last_string[0] == self.depth:
+                    self.keys[self.depth] = self.last_string[1]
+                    if self.depth == self.files_depth:
+                        self.entry_key = self.last_string[1]
+            elif char == ",":
+                self.keys.pop(self.depth, None)
+    
+    def _trim(self, keep: int):
+        """Forget text before `keep` unless an open string or file value starts there"""
+        if self.in_string:
+            keep = min(keep, self.string_start)
+        if self.value_start is not None:
+            keep = min(keep, self.value_start)
+        while self.parts and self.parts[0][0] + len(self.parts[0][1]) <= keep:
+            self.parts.popleft()
+    
+    def _slice(self, start: int, end: int) -> str:
+        """Text fed between offsets start and end"""
+        pieces = []
+        for offset, part in reversed(self.parts):
+            if offset >= end:
+                continue
+            pieces.append(part[max(0, start - offset):end - offset])
+            if offset <= start:
+                break
+        return "".join(reversed(pieces))
+    
+    def _at_files_value_start(self) -> bool:
+        return (
+            self.files_depth is not None
+            and self.depth == self.files_depth
+            and self.entry_key is not None
+            and self.value_start is None
+        )
+    
+    def _close_string(self):
+        raw = self._slice(self.string_start, self.pos + 1)
+        
+        if self.files_depth is not None and self.depth == self.files_depth and self.value_start == self.string_start:
+            self._emit(self.pos + 1)
+            return
+        
+        try:
+            self.last_string = (self.depth, json.loads(raw))
+        except ValueError:
+            self.last_string = None
+    
+    def _emit(self, end: int):
+        """Decode the finished value of the current "files" entry and hand it off"""
+        path = self.entry_key
+        raw = self._slice(self.value_start, end)
+        self.entry_key = None
+        self.value_start = None
+        self.last_string = None
+        
+        try:
+            content = json.loads(raw)
+        except ValueError:
+            # Leave it for the full parse to deal with
+            return
+        
+        self.emitted.add(path)
+        self.on_file(path, content)
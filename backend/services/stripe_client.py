@@ -0,0 +1,9 @@
+import os
+from functools import lru_cache
+
+@lru_cache()
+def get_stripe():
+    """The stripe module with the API key set (imported on first use, it's slow to load)"""
+    import stripe
+    stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
+    return stripe
@@ -1,9 +1,25 @@
 import os
-from supabase import create_client, Client
+import asyncio
+from postgrest.exceptions import APIError
 from functools import lru_cache
 
+from services.jwt_verifier import jwt_verifier
+from services.ttl_cache import TTLCache
+
+# Short-lived per-process profile cache; writes below keep it up to date
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "10"))
+profile_cache = TTLCache(PROFILE_CACHE_TTL, int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000")))
+
+class InsufficientCreditsError(ValueError):
+    """Raised when a debit would take a user's balance below zero"""
+
+def create_client(url: str, key: str):
+    """supabase.create_client, imported on first use (the SDK loads every Supabase service client)"""
+    from supabase import create_client as create_supabase_client
+    return create_supabase_client(url, key)
+
 @lru_cache()
-def get_supabase_client() -> Client:
+def get_supabase_client():
     """Get Supabase client instance (cached)"""
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_SERVICE_KEY")
@@ -19,18 +35,29 @@ async def get_user_from_token(authorization: str) -> dict:
         raise ValueError("Invalid authorization header")
     
     token = authorization.replace("Bearer ", "")
-    supabase = get_supabase_client()
     
-    # Verify the token with Supabase
-    user_response = supabase.auth.get_user(token)
+    # Verify locally against the cached signing keys when we can
+    user = await jwt_verifier.verify(token)
+    if user:
+        return user
+    
+    # Otherwise verify the token with Supabase
+    supabase = get_supabase_client()
+    user_response = await asyncio.to_thread(supabase.auth.get_user, token)
     
     if not user_response or not user_response.user:
         raise ValueError("Invalid token")
     
+    jwt_verifier.remember(token, user_response.user)
     return user_response.user
 
-async def get_user_profile(user_id: str) -> dict:
-    """Get user profile with credits"""
+async def get_user_profile(user_id: str, use_cache: bool = True) -> dict:
+    """Get user profile with credits (served from the profile cache when fresh)"""
+    if use_cache:
+        profile = profile_cache.get(user_id)
+        if profile:
+            return dict(profile)
+    
     supabase = get_supabase_client()
     
     response = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
@@ -38,37 +65,78 @@ async def get_user_profile(user_id: str) -> dict:
     if not response.data:
         raise ValueError("User profile not found")
     
-    return response.data
+    profile_cache.set(user_id, response.data)
+    return dict(response.data)
+
+def invalidate_user_profile(user_id: str):
+    """Drop a cached profile after writing to it outside update_user_credits"""
+    profile_cache.pop(user_id)
+
+def _set_cached_credits(user_id: str, credits: int):
+    """Keep a cached profile's balance in step with a write"""
+    profile = profile_cache.get(user_id)
+    if profile:
+        profile_cache.set(user_id, {**profile, "credits": credits})
+
+def _raise_credit_error(e: APIError):
+    """Translate errors raised by the credit functions into ValueErrors"""
+    message = e.message or str(e)
+    if "Insufficient credits" in message:
+        raise InsufficientCreditsError("Insufficient credits")
+    if "User profile not found" in message:
+        raise ValueError("User profile not found")
+    raise e
 
 async def update_user_credits(user_id: str, amount: int, transaction_type: str, description: str, generation_id: str = None, stripe_payment_id: str = None):
-    """Update user credits and create transaction record"""
+    """
+    Update user credits and create transaction record.
+    Runs as one atomic database call (see migrations/003_atomic_credits.sql).
+    """
     supabase = get_supabase_client()
     
-    # Get current credits
-    profile = await get_user_profile(user_id)
-    new_credits = profile["credits"] + amount
-    
-    if new_credits < 0:
-        raise ValueError("Insufficient credits")
-    
-    # Update credits
-    supabase.table("profiles").update({
-        "credits": new_credits
-    }).eq("id", user_id).execute()
-    
-    # Create transaction record
-    transaction_data = {
-        "user_id": user_id,
-        "amount": amount,
-        "type": transaction_type,
-        "description": description,
-    }
+    try:
+        response = supabase.rpc("apply_credit_transaction", {
+            "p_user_id": user_id,
+            "p_amount": amount,
+            "p_type": transaction_type,
+            "p_description": description,
+            "p_generation_id": generation_id,
+            "p_stripe_payment_id": stripe_payment_id
+        }).execute()
+    except APIError as e:
+        _raise_credit_error(e)
+    
+    new_credits = response.data
+    _set_cached_credits(user_id, new_credits)
     
-    if generation_id:
-        transaction_data["generation_id"] = generation_id
-    if stripe_payment_id:
-        transaction_data["stripe_payment_id"] = stripe_payment_id
-    
-    supabase.table("credit_transactions").insert(transaction_data).execute()
+    return new_credits
+
+async def create_generation_with_debit(user_id: str, generation_id: str, generation_type: str, tier: str, prompt: str, credits: int, input_params: dict, description: str, job_params: dict = None) -> int:
+    """
+    Create a pending generation record and debit its credits in one atomic call.
+    With job_params (see PostgresJobQueue.job_params) its job is queued in the
+    same transaction. Raises InsufficientCreditsError if the balance is too low.
+    Returns the new balance.
+    """
+    supabase = get_supabase_client()
+    function = "create_generation_job_with_debit" if job_params else "create_generation_with_debit"
+    
+    try:
+        response = supabase.rpc(function, {
+            **(job_params or {}),
+            "p_generation_id": generation_id,
+            "p_user_id": user_id,
+            "p_type": generation_type,
+            "p_tier": tier,
+            "p_prompt": prompt,
+            "p_credits": credits,
+            "p_input_params": input_params,
+            "p_description": description
+        }).execute()
+    except APIError as e:
+        _raise_credit_error(e)
+    
+    new_credits = response.data
+    _set_cached_credits(user_id, new_credits)
     
     return new_credits
@@ -0,0 +1,47 @@
+import time
+import threading
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with per-entry expiry and LRU eviction.
+    Used for short-lived lookups (verified tokens, profiles) that are cheap to
+    recompute but expensive to fetch on every request.
+    """
+    
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, ttl: float = None):
+        """Cache value for ttl seconds (defaults to the cache's ttl)"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def pop(self, key):
+        """Drop key from the cache"""
+        with self.lock:
+            self.entries.pop(key, None)
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,37 @@
+import pytest
+
+from services import admission
+from services.admission import AdmissionController, RateLimitedError, RequestTooLargeError
+
+def test_over_the_limit_gets_retry_after(monkeypatch):
+    monkeypatch.setitem(admission.RATE_LIMITS, "plugin", (2, 6))
+    controller = AdmissionController()
+    controller._take("alice", "plugin", 1)
+    controller._take("alice", "plugin", 1)
+    
+    with pytest.raises(RateLimitedError) as raised:
+        controller._take("alice", "plugin", 1)
+    assert raised.value.status_code == 429
+    assert raised.value.retry_after == 10
+
+def test_request_bigger_than_the_bucket_is_not_retryable(monkeypatch):
+    monkeypatch.setitem(admission.RATE_LIMITS, "texture_pack", (50, 50))
+    controller = AdmissionController()
+    
+    with pytest.raises(RequestTooLargeError) as raised:
+        controller._take("alice", "texture_pack", 80)
+    assert raised.value.status_code == 400
+    assert raised.value.retry_after is None
+
+@pytest.mark.parametrize("limits", [(5, 0), (5, -1), (0.5, 2)])
+def test_unusable_rate_limits_are_refused(monkeypatch, limits):
+    monkeypatch.setitem(admission.RATE_LIMITS, "plugin", limits)
+    
+    with pytest.raises(ValueError):
+        admission._check_rate_limits()
+
+def test_texture_burst_must_cover_the_largest_request(monkeypatch):
+    monkeypatch.setitem(admission.RATE_LIMITS, "texture_pack", (admission.MAX_TEXTURES_PER_REQUEST - 1, 50))
+    
+    with pytest.raises(ValueError, match="texture_pack"):
+        admission._check_rate_limits()
@@ -0,0 +1,211 @@
+"""
+AIRouter resilience: retries, circuit breakers, hedging and deadlines,
+exercised against services.fake_provider so nothing leaves the box.
+
+    cd backend
+    python -m pytest tests
+"""
+import time
+import asyncio
+
+import pytest
+
+from services import ai_router as router_module
+from services import circuit_breaker
+from services.ai_router import AIRouter, AIModel
+from services.fake_provider import FakeProvider, FakeProviderError
+from prompts.datapack_prompts import DATAPACK_SYSTEM_PROMPT
+
+PROMPT = "Make a datapack that says hello"
+
+class FlakyProvider(FakeProvider):
+    """FakeProvider whose first `failures` calls fail, optionally after streaming some text"""
+    
+    def __init__(self, failures: int, emit_before_failing: bool = False):
+        super().__init__()
+        self.failures = failures
+        self.emit_before_failing = emit_before_failing
+        self.attempts = 0
+    
+    async def generate(self, model, prompt, system_prompt, prompt_prefix="", on_text=None):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            if self.emit_before_failing and on_text:
+                on_text('{"pack_name": ')
+                await asyncio.sleep(0)
+            raise FakeProviderError(f"Fake {model} provider error")
+        return await super().generate(model, prompt, system_prompt, prompt_prefix, on_text)
+
+class SlowStreamProvider(FakeProvider):
+    """FakeProvider that streams its answer in `chunks` pieces, `gap` seconds apart"""
+    
+    def __init__(self, chunks: int, gap: float):
+        super().__init__()
+        self.chunks = chunks
+        self.gap = gap
+    
+    async def generate(self, model, prompt, system_prompt, prompt_prefix="", on_text=None):
+        text, usage = await super().generate(model, prompt, system_prompt, prompt_prefix)
+        size = -(-len(text) // self.chunks)
+        for start in range(0, len(text), size):
+            await asyncio.sleep(self.gap)
+            on_text(text[start:start + size])
+        return text, usage
+
+@pytest.fixture(autouse=True)
+def fast_resilience(monkeypatch):
+    """Short delays so the tests don't wait on production backoff and timeouts"""
+    monkeypatch.setattr(router_module, "AI_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(router_module, "AI_RETRY_MAX_DELAY", 0.05)
+    monkeypatch.setattr(router_module, "AI_MAX_RETRIES", 2)
+    monkeypatch.setattr(router_module, "AI_HEDGE_ENABLED", False)
+    monkeypatch.setattr(router_module, "AI_TOTAL_DEADLINE", 5.0)
+    monkeypatch.setattr(router_module, "AI_REQUEST_TIMEOUT", 5.0)
+
+def make_router(provider: FakeProvider = None) -> AIRouter:
+    router = AIRouter()
+    router.fake_provider = provider or FakeProvider()
+    router.fake_provider.latency = {model.value: 0 for model in AIModel}
+    return router
+
+def generate(router: AIRouter, model: AIModel = AIModel.CLAUDE, on_text=None) -> tuple[str, dict]:
+    if on_text:
+        return asyncio.run(router.generate_stream(PROMPT, DATAPACK_SYSTEM_PROMPT, model, on_text))
+    return asyncio.run(router.generate(PROMPT, DATAPACK_SYSTEM_PROMPT, model))
+
+def test_retries_transient_error_then_succeeds():
+    provider = FlakyProvider(failures=1)
+    router = make_router(provider)
+    
+    text, usage = generate(router)
+    
+    assert provider.attempts == 2
+    assert usage["model"] == AIModel.CLAUDE
+    assert '"pack_name"' in text
+
+def test_gives_up_after_max_retries():
+    provider = FlakyProvider(failures=10)
+    router = make_router(provider)
+    
+    with pytest.raises(FakeProviderError):
+        generate(router)
+    assert provider.attempts == router_module.AI_MAX_RETRIES + 1
+
+def test_breaker_opens_after_threshold_and_fails_over(monkeypatch):
+    monkeypatch.setattr(router_module, "AI_MAX_RETRIES", 0)
+    router = make_router()
+    router.fake_provider.failure_rate = {AIModel.CLAUDE.value: 1.0}
+    
+    for _ in range(circuit_breaker.BREAKER_FAILURE_THRESHOLD):
+        with pytest.raises(FakeProviderError):
+            generate(router)
+    assert router.breakers[AIModel.CLAUDE].state() == "open"
+    
+    calls_before = len(router.fake_provider.calls)
+    text, usage = generate(router)
+    
+    assert usage["model"] == AIModel.GEMINI
+    assert [call[0] for call in list(router.fake_provider.calls)[calls_before:]] == [AIModel.GEMINI.value]
+
+def test_hedge_wins_when_primary_is_slow(monkeypatch):
+    monkeypatch.setattr(router_module, "AI_HEDGE_ENABLED", True)
+    monkeypatch.setattr(router_module, "AI_HEDGE_DELAY", 0.05)
+    router = make_router()
+    router.fake_provider.latency[AIModel.CLAUDE.value] = 2.0
+    
+    started = time.monotonic()
+    text, usage = generate(router)
+    
+    assert usage["model"] == AIModel.GEMINI
+    assert time.monotonic() - started < 1.0
+
+def test_hedge_not_started_when_primary_is_fast(monkeypatch):
+    monkeypatch.setattr(router_module, "AI_HEDGE_ENABLED", True)
+    monkeypatch.setattr(router_module, "AI_HEDGE_DELAY", 0.5)
+    router = make_router()
+    
+    text, usage = generate(router)
+    
+    assert usage["model"] == AIModel.CLAUDE
+    assert [call[0] for call in router.fake_provider.calls] == [AIModel.CLAUDE.value]
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_deadline_expires(monkeypatch, streaming):
+    monkeypatch.setattr(router_module, "AI_TOTAL_DEADLINE", 0.1)
+    router = make_router()
+    router.fake_provider.latency[AIModel.CLAUDE.value] = 2.0
+    
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        generate(router, on_text=(lambda chunk: None) if streaming else None)
+    assert time.monotonic() - started < 1.0
+
+def test_no_retry_after_stream_emitted_text():
+    provider = FlakyProvider(failures=1, emit_before_failing=True)
+    router = make_router(provider)
+    chunks = []
+    
+    with pytest.raises(FakeProviderError):
+        generate(router, on_text=chunks.append)
+    
+    assert provider.attempts == 1
+    assert chunks == ['{"pack_name": ']
+
+def test_stream_longer_than_request_timeout_is_not_cut_off(monkeypatch):
+    # AI_REQUEST_TIMEOUT bounds the gaps between chunks, not the whole stream
+    monkeypatch.setattr(router_module, "AI_REQUEST_TIMEOUT", 0.2)
+    router = make_router(SlowStreamProvider(chunks=5, gap=0.1))
+    chunks = []
+    
+    text, usage = generate(router, on_text=chunks.append)
+    
+    assert usage["model"] == AIModel.CLAUDE
+    assert "".join(chunks) == text
+
+def test_stalled_stream_times_out(monkeypatch):
+    monkeypatch.setattr(router_module, "AI_REQUEST_TIMEOUT", 0.05)
+    monkeypatch.setattr(router_module, "AI_MAX_RETRIES", 0)
+    router = make_router(SlowStreamProvider(chunks=2, gap=0.5))
+    
+    with pytest.raises(asyncio.TimeoutError, match="idle"):
+        generate(router, on_text=lambda chunk: None)
+
+def test_wait_for_a_slot_is_not_stream_idle_time(monkeypatch):
+    monkeypatch.setattr(router_module, "AI_REQUEST_TIMEOUT", 0.15)
+    monkeypatch.setattr(router_module, "AI_MAX_RETRIES", 0)
+    router = make_router(SlowStreamProvider(chunks=2, gap=0.1))
+    router.semaphores[AIModel.CLAUDE] = asyncio.Semaphore(1)
+    
+    async def both():
+        return await asyncio.gather(*(
+            router.generate_stream(PROMPT, DATAPACK_SYSTEM_PROMPT, AIModel.CLAUDE, lambda chunk: None)
+            for _ in range(2)
+        ))
+    
+    # The second stream queues for ~0.2s, longer than AI_REQUEST_TIMEOUT
+    results = asyncio.run(both())
+    
+    assert [usage["model"] for _, usage in results] == [AIModel.CLAUDE, AIModel.CLAUDE]
+    assert router.breakers[AIModel.CLAUDE].failures == 0
+
+def test_wait_for_a_slot_counts_against_the_deadline(monkeypatch):
+    monkeypatch.setattr(router_module, "AI_TOTAL_DEADLINE", 0.3)
+    monkeypatch.setattr(router_module, "AI_MAX_RETRIES", 0)
+    router = make_router()
+    router.fake_provider.latency[AIModel.CLAUDE.value] = 0.25
+    router.semaphores[AIModel.CLAUDE] = asyncio.Semaphore(1)
+    
+    async def both():
+        started = time.monotonic()
+        results = await asyncio.gather(
+            router.generate(PROMPT, DATAPACK_SYSTEM_PROMPT, AIModel.CLAUDE),
+            router.generate(PROMPT, DATAPACK_SYSTEM_PROMPT, AIModel.CLAUDE),
+            return_exceptions=True
+        )
+        return results, time.monotonic() - started
+    
+    (first, second), elapsed = asyncio.run(both())
+    
+    assert first[1]["model"] == AIModel.CLAUDE
+    assert isinstance(second, asyncio.TimeoutError)
+    assert elapsed < 0.4
@@ -0,0 +1,32 @@
+import asyncio
+
+from services.fake_provider import FakeProvider
+from prompts.datapack_prompts import DATAPACK_SYSTEM_PROMPT, get_datapack_prompt, get_datapack_prompt_prefix
+
+def call_twice(provider: FakeProvider, system_prompt: str) -> list[dict]:
+    provider.latency = {"claude": 0}
+    prefix = get_datapack_prompt_prefix("simple")
+    prompt = get_datapack_prompt("simple", "A datapack that says hello")
+    return [
+        asyncio.run(provider.generate("claude", prompt, system_prompt, prefix))[1]
+        for _ in range(2)
+    ]
+
+def test_prefix_below_minimum_is_not_cached():
+    first, second = call_twice(FakeProvider(), DATAPACK_SYSTEM_PROMPT)
+    
+    assert first["cache_write_tokens"] == 0
+    assert second["cached_input_tokens"] == 0
+
+def test_prefix_above_minimum_is_cached():
+    first, second = call_twice(FakeProvider(), DATAPACK_SYSTEM_PROMPT * 4)
+    
+    assert first["cache_write_tokens"] > 0
+    assert second["cached_input_tokens"] == first["cache_write_tokens"]
+
+def test_minimum_can_be_overridden_per_model():
+    provider = FakeProvider()
+    provider.min_cache_tokens = {"claude": 0}
+    first, second = call_twice(provider, DATAPACK_SYSTEM_PROMPT)
+    
+    assert second["cached_input_tokens"] > 0
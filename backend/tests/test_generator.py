@@ -0,0 +1,65 @@
+import asyncio
+import itertools
+
+import pytest
+
+from benchmarks.fakes import FakeSupabase
+from services import supabase_client, result_cache
+from services import generator as generator_module
+from services.ai_router import ai_router, AIModel
+from services.fake_provider import FakeProvider
+from prompts.datapack_prompts import DATAPACK_SYSTEM_PROMPT, get_datapack_prompt
+
+@pytest.fixture
+def generator(monkeypatch):
+    monkeypatch.setenv("SUPABASE_URL", "http://supabase.invalid")
+    monkeypatch.setenv("SUPABASE_SERVICE_KEY", "test")
+    monkeypatch.setattr(supabase_client, "create_client", lambda url, key: FakeSupabase())
+    supabase_client.get_supabase_client.cache_clear()
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_ENABLED", False)
+    
+    provider = FakeProvider()
+    provider.latency = {model.value: 0.05 for model in AIModel}
+    monkeypatch.setattr(ai_router, "fake_provider", provider)
+    
+    # Every request gets its own routing decision
+    decisions = itertools.count()
+    monkeypatch.setattr(
+        ai_router,
+        "choose_model",
+        lambda generation_type, tier: (AIModel.CLAUDE, {"model": "claude", "decision": next(decisions)})
+    )
+    
+    yield generator_module.GeneratorService()
+    supabase_client.get_supabase_client.cache_clear()
+
+def test_coalesced_call_keeps_its_own_routing(generator):
+    prompt = get_datapack_prompt("simple", "A datapack that says hello")
+    
+    async def both():
+        return await asyncio.gather(*(
+            generator._generate_json("datapack", "simple", prompt, DATAPACK_SYSTEM_PROMPT)
+            for _ in range(2)
+        ))
+    
+    (leader_data, leader), (follower_data, follower) = asyncio.run(both())
+    
+    assert follower_data == leader_data
+    assert (leader["coalesced"], follower["coalesced"]) == (False, True)
+    assert leader["routing"]["decision"] == 0
+    assert follower["routing"]["decision"] == 1
+    assert follower["routing"] is not leader["routing"]
+    assert follower["tokens"] == 0
+
+@pytest.mark.parametrize("claude_open, cached", [(False, True), (True, False)])
+def test_result_cached_only_when_the_chosen_model_answered(generator, monkeypatch, claude_open, cached):
+    # An open Claude circuit fails the request over to Gemini
+    monkeypatch.setattr(ai_router.breakers[AIModel.CLAUDE], "allow", lambda: not claude_open)
+    written = []
+    monkeypatch.setattr(generator_module.result_cache, "set", lambda key, data: written.append(key))
+    prompt = get_datapack_prompt("simple", "A datapack that says goodbye")
+    
+    data, run = asyncio.run(generator._generate_json("datapack", "simple", prompt, DATAPACK_SYSTEM_PROMPT))
+    
+    assert run["model"] == (AIModel.GEMINI if claude_open else AIModel.CLAUDE)
+    assert bool(written) == cached
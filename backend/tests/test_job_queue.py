@@ -0,0 +1,30 @@
+import uuid
+
+from services.job_queue import SQLiteJobQueue
+
+def enqueue(queue: SQLiteJobQueue, job_type: str, tier: str, user_id: str) -> str:
+    generation_id = str(uuid.uuid4())
+    queue.enqueue(generation_id, job_type, {"tier": tier}, user_id)
+    return generation_id
+
+def test_queue_positions(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.db"))
+    plugin = enqueue(queue, "plugin", "complex", "alice")  # normal lane, 150s
+    datapack = enqueue(queue, "datapack", "simple", "bob")  # fast lane, 15s
+    second_plugin = enqueue(queue, "plugin", "simple", "carol")  # normal lane, 60s
+    
+    positions = queue.queue_positions([plugin, datapack, second_plugin, str(uuid.uuid4())])
+    
+    assert set(positions) == {plugin, datapack, second_plugin}
+    assert positions[plugin] == {"queue_position": 1, "ahead_seconds": 0, "lane": "normal"}
+    # Fast-lane jobs only wait for other fast-lane jobs
+    assert positions[datapack] == {"queue_position": 1, "ahead_seconds": 0, "lane": "fast"}
+    assert positions[second_plugin] == {"queue_position": 3, "ahead_seconds": 165, "lane": "normal"}
+
+def test_queue_positions_skips_jobs_that_are_not_queued(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.db"))
+    generation_id = enqueue(queue, "datapack", "simple", "alice")
+    queue.lease("worker-1")
+    
+    assert queue.queue_positions([generation_id]) == {}
+    assert queue.queue_positions([]) == {}
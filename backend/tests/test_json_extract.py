@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from services.json_extract import extract_json
+
+OUTPUT = {"files": {"Main.java": "class Main {}"}, "commands": {"spawn": {"usage": "/spawn"}}}
+
+def test_skips_braces_in_leading_prose():
+    text = "Use {player} as a placeholder in messages. Here it is:\n" + json.dumps(OUTPUT)
+    
+    assert extract_json(text) == (OUTPUT, "trimmed")
+
+def test_repairs_object_after_leading_prose_braces():
+    text = "Replace {name} and {count}:\n" + json.dumps(OUTPUT)[:-1] + ",}"
+    
+    assert extract_json(text) == (OUTPUT, "syntax")
+
+def test_does_not_return_a_nested_object():
+    # Raw tabs fail the strict decoder; the outer object must still win
+    text = "Sure! " + json.dumps(OUTPUT).replace("class Main", "class\tMain")
+    data, repair = extract_json(text)
+    
+    assert repair == "control_chars"
+    assert set(data) == {"files", "commands"}
+
+def test_raises_when_no_object_parses():
+    with pytest.raises(ValueError, match="Failed to parse"):
+        extract_json("Use {player} here, {oops")
@@ -0,0 +1,11 @@
+from services.result_cache import result_cache
+
+def key(prompt: str) -> str:
+    return result_cache.make_key("plugin", "simple", prompt, "system", "claude")
+
+def test_whitespace_differences_share_a_key():
+    assert key('broadcast "HELLO"') == key('  broadcast\n "HELLO" ')
+
+def test_case_differences_do_not_share_a_key():
+    assert key('broadcast "HELLO"') != key('broadcast "hello"')
+    assert key("a plugin named MyPlugin") != key("a plugin named myplugin")
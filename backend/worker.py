@@ -0,0 +1,181 @@
+import os
+import uuid
+import socket
+import signal
+import time
+import asyncio
+import threading
+from dotenv import load_dotenv
+from prometheus_client import start_http_server
+
+load_dotenv()
+
+from services.job_queue import get_job_queue, JOB_LEASE_SECONDS
+from services.generator import GeneratorService
+from services.ai_router import ai_router
+from services.compiler import plugin_compiler
+from services.events import EVENT_RETENTION_SECONDS
+from services.scheduler import FAST_LANE_SLOTS
+from services.metrics import GENERATIONS_IN_FLIGHT
+
+# Worker configuration
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "2"))
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9101"))  # 0 disables the /metrics listener
+HEARTBEAT_INTERVAL = JOB_LEASE_SECONDS / 3
+EVENT_PRUNE_INTERVAL = 300
+MAX_NORMAL_LANE_JOBS = max(1, WORKER_CONCURRENCY - FAST_LANE_SLOTS)
+
+class Worker:
+    """
+    Leases generation jobs from the queue and runs them.
+    
+    Run with `python worker.py`. Any number of workers can run alongside any
+    number of API replicas; jobs left behind by a crashed worker are picked
+    up again once their lease expires.
+    
+    FAST_LANE_SLOTS of the WORKER_CONCURRENCY slots only take fast-lane jobs,
+    so a quick datapack never waits for a plugin build or a big texture pack.
+    """
+    
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.queue = get_job_queue()
+        self.generator_service = GeneratorService()
+        self.handlers = {
+            "plugin": self.generator_service.generate_plugin,
+            "datapack": self.generator_service.generate_datapack,
+            "texture_pack": self.generator_service.generate_texture_pack
+        }
+        self.stopping = asyncio.Event()
+        self.slots = asyncio.Semaphore(WORKER_CONCURRENCY)
+        self.running = set()
+        self.normal_lane_jobs = 0
+        self.last_prune = 0.0
+    
+    def _heartbeat(self, job_id: str, done: threading.Event):
+        """
+        Keep the lease alive while the job runs.
+        Runs on its own thread so a busy event loop can't let the lease lapse.
+        """
+        while not done.wait(HEARTBEAT_INTERVAL):
+            try:
+                if not self.queue.heartbeat(job_id, self.worker_id):
+                    print(f"Lost lease on job {job_id}")
+                    return
+            except Exception as e:
+                print(f"Heartbeat failed for job {job_id}: {e}")
+    
+    async def _run_job(self, job: dict):
+        """Run a single leased job and record the outcome"""
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat,
+            args=(job["id"], done),
+            daemon=True
+        )
+        heartbeat.start()
+        GENERATIONS_IN_FLIGHT.inc()
+        
+        try:
+            handler = self.handlers.get(job["job_type"])
+            if not handler:
+                raise ValueError(f"Unknown job type: {job['job_type']}")
+            
+            print(f"Running job {job['id']} ({job['job_type']}, attempt {job['attempts']})")
+            await handler(job["generation_id"], **job["payload"])
+            await asyncio.to_thread(self.queue.complete, job["id"], self.worker_id)
+        except Exception as e:
+            print(f"Job {job['id']} failed: {e}")
+            await asyncio.to_thread(self.queue.fail, job["id"], self.worker_id, str(e))
+            if job["attempts"] >= job["max_attempts"]:
+                self.generator_service._update_generation(job["generation_id"], {
+                    "status": "failed",
+                    "error_message": str(e)
+                })
+        finally:
+            done.set()
+            GENERATIONS_IN_FLIGHT.dec()
+            if job["lane"] != "fast":
+                self.normal_lane_jobs -= 1
+            self.slots.release()
+    
+    async def _reap(self):
+        """Fail generations whose jobs ran out of attempts and prune old events"""
+        for generation_id in await asyncio.to_thread(self.queue.reap_dead):
+            print(f"Generation {generation_id} exceeded max attempts")
+            self.generator_service._update_generation(generation_id, {
+                "status": "failed",
+                "error_message": "Generation was interrupted too many times. Please contact support."
+            })
+        
+        # Trim the progress event log every few minutes
+        if time.monotonic() - self.last_prune > EVENT_PRUNE_INTERVAL:
+            self.last_prune = time.monotonic()
+            await asyncio.to_thread(self.queue.prune_events, EVENT_RETENTION_SECONDS)
+    
+    async def run(self):
+        """Poll the queue until asked to stop, then wait for in-flight jobs"""
+        print(f"Worker {self.worker_id} started (concurrency {WORKER_CONCURRENCY})")
+        
+        while not self.stopping.is_set():
+            await self.slots.acquire()
+            if self.stopping.is_set():
+                self.slots.release()
+                break
+            
+            # Keep the reserved slots free for fast-lane jobs
+            lanes = None if self.normal_lane_jobs < MAX_NORMAL_LANE_JOBS else ["fast"]
+            
+            try:
+                await self._reap()
+                job = await asyncio.to_thread(self.queue.lease, self.worker_id, lanes)
+            except Exception as e:
+                print(f"Failed to lease job: {e}")
+                job = None
+            
+            if not job:
+                self.slots.release()
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            if job["lane"] != "fast":
+                self.normal_lane_jobs += 1
+            task = asyncio.create_task(self._run_job(job))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+        
+        if self.running:
+            print(f"Waiting for {len(self.running)} in-flight jobs...")
+            await asyncio.gather(*self.running, return_exceptions=True)
+        
+        print(f"Worker {self.worker_id} stopped")
+    
+    def stop(self):
+        self.stopping.set()
+
+async def main():
+    worker = Worker()
+    
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    
+    # Generation stages are timed here, so the worker serves its own /metrics
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT)
+    
+    # The first job shouldn't pay for loading the provider and storage SDKs
+    await asyncio.to_thread(ai_router.warm_up)
+    await asyncio.to_thread(worker.generator_service.warm_up)
+    await plugin_compiler.warm_up()
+    await worker.run()
+    print(f"AI token usage: {ai_router.usage_stats()}")
+    await worker.generator_service.close()
+    await ai_router.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
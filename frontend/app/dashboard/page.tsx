@@ -1,9 +1,9 @@
 'use client'
 
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useRouter } from 'next/navigation'
 import { createClient } from '@/lib/supabase'
-import { api, Generation } from '@/lib/api'
+import { api, streamGeneration, Generation } from '@/lib/api'
 import { 
   Hammer, 
   Package, 
@@ -21,6 +21,13 @@ import {
 type GenerationType = 'plugin' | 'datapack' | 'texture_pack'
 type Tier = 'simple' | 'medium' | 'complex'
 
+// Backend timestamps are UTC without an offset
+const formatStartEstimate = (startsAt: string) => {
+  const seconds = (new Date(startsAt.endsWith('Z') ? startsAt : `${startsAt}Z`).getTime() - Date.now()) / 1000
+  if (seconds < 60) return 'soon'
+  return `in ~${Math.round(seconds / 60)} min`
+}
+
 export default function Dashboard() {
   const router = useRouter()
   const [user, setUser] = useState<any>(null)
@@ -29,6 +36,8 @@ export default function Dashboard() {
   const [loading, setLoading] = useState(true)
   const [generating, setGenerating] = useState(false)
   const [error, setError] = useState('')
+  // Generations followed over their own status stream
+  const followed = useRef<Set<string>>(new Set())
 
   // Form state
   const [generationType, setGenerationType] = useState<GenerationType>('plugin')
@@ -69,6 +78,28 @@ export default function Dashboard() {
     }
   }
 
+  // Everything else still in flight is refreshed with one batch request per interval
+  useEffect(() => {
+    const inFlight = generations
+      .filter(g => (g.status === 'pending' || g.status === 'processing') && !followed.current.has(g.id))
+      .map(g => g.id)
+    if (inFlight.length === 0) return
+
+    const timer = setTimeout(async () => {
+      const token = await getToken()
+      if (!token) return
+      try {
+        const { generations: statuses } = await api.getGenerationStatuses(token, inFlight.slice(0, 50))
+        setGenerations(prev =>
+          prev.map(g => statuses[g.id] ? { ...g, ...statuses[g.id] } : g)
+        )
+      } catch (err) {
+        console.error('Batch poll error:', err)
+      }
+    }, 3000)
+    return () => clearTimeout(timer)
+  }, [generations])
+
   const handleLogout = async () => {
     const supabase = createClient()
     await supabase.auth.signOut()
@@ -123,17 +154,42 @@ export default function Dashboard() {
   }
 
   const pollGeneration = async (token: string, generationId: string) => {
+    followed.current.add(generationId)
+    const update = (changes: Partial<Generation>) =>
+      setGenerations(prev =>
+        prev.map(g => g.id === generationId ? { ...g, ...changes } : g)
+      )
+
+    let status = 'pending'
+    try {
+      await streamGeneration(token, generationId, (event) => {
+        if (event.type === 'progress') {
+          update({ progress: { stage: event.stage!, done: event.done, total: event.total } })
+        } else {
+          const { type, ...fields } = event
+          status = fields.status || status
+          update({ ...fields, progress: undefined })
+        }
+      })
+      if (status === 'completed' || status === 'failed') {
+        // Pick up the full record (completed_at, metadata) once it's done
+        const gen = await api.getGeneration(token, generationId)
+        update(gen)
+        return
+      }
+    } catch (err) {
+      console.error('Stream error, falling back to long-poll:', err)
+    }
+
+    // Long-poll fallback: each request parks on the server until the status moves
     const poll = async () => {
       try {
-        const gen = await api.getGeneration(token, generationId)
-        
-        // Update in list
-        setGenerations(prev => 
-          prev.map(g => g.id === generationId ? gen : g)
-        )
+        const { generation } = await api.waitForGeneration(token, generationId, status)
+        status = generation.status
+        update(generation)
 
-        if (gen.status === 'pending' || gen.status === 'processing') {
-          setTimeout(poll, 3000)
+        if (status === 'pending' || status === 'processing') {
+          poll()
         }
       } catch (err) {
         console.error('Poll error:', err)
@@ -440,7 +496,7 @@ export default function Dashboard() {
                       
                       <div>
                         <p className="font-medium">{gen.file_name || `${gen.type} - ${gen.tier}`}</p>
-                        <p className="text-sm text-gray-400 truncate max-w-md">{gen.prompt}</p>
+                        <p className="text-sm text-gray-400 truncate max-w-md">{gen.prompt ?? gen.prompt_preview}</p>
                       </div>
                     </div>
                     
@@ -448,13 +504,20 @@ export default function Dashboard() {
                       {gen.status === 'pending' && (
                         <span className="flex items-center text-gray-400">
                           <Clock className="w-4 h-4 mr-1" />
-                          Queued
+                          {gen.queue_position ? `Queued #${gen.queue_position}` : 'Queued'}
+                          {gen.estimated_start_at && ` · starts ${formatStartEstimate(gen.estimated_start_at)}`}
                         </span>
                       )}
                       {gen.status === 'processing' && (
                         <span className="flex items-center text-mc-gold">
                           <Loader2 className="w-4 h-4 mr-1 animate-spin" />
-                          Processing
+                          {gen.progress?.stage === 'rendering' && gen.progress.total
+                            ? `Rendering ${gen.progress.done}/${gen.progress.total}`
+                            : gen.progress?.stage === 'compiling'
+                            ? 'Compiling'
+                            : gen.progress?.stage === 'uploading'
+                            ? 'Uploading'
+                            : 'Processing'}
                         </span>
                       )}
                       {gen.status === 'completed' && gen.file_url && (
@@ -31,6 +31,57 @@ export async function apiClient(endpoint: string, options: ApiOptions = {}) {
   return response.json()
 }
 
+export interface GenerationEvent {
+  type: 'snapshot' | 'status' | 'progress'
+  status?: string
+  stage?: string
+  done?: number
+  total?: number
+  [key: string]: any
+}
+
+// Follows a generation over Server-Sent Events until it completes or fails.
+// Uses fetch rather than EventSource so the token stays in the Authorization header.
+export async function streamGeneration(
+  token: string,
+  id: string,
+  onEvent: (event: GenerationEvent) => void,
+  signal?: AbortSignal
+) {
+  const response = await fetch(`${API_URL}/api/generations/${id}/events`, {
+    headers: { Authorization: `Bearer ${token}`, Accept: 'text/event-stream' },
+    signal,
+  })
+
+  if (!response.ok || !response.body) {
+    throw new Error(`Stream error: ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+
+  while (true) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const message = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+
+      let type = 'message'
+      let data = ''
+      for (const line of message.split('\n')) {
+        if (line.startsWith('event: ')) type = line.slice(7)
+        else if (line.startsWith('data: ')) data += line.slice(6)
+      }
+      if (data) onEvent({ ...JSON.parse(data), type } as GenerationEvent)
+    }
+  }
+}
+
 // Generation types
 export interface PluginRequest {
   prompt: string
@@ -55,13 +106,17 @@ export interface Generation {
   type: string
   tier: string
   status: string
-  prompt: string
+  prompt?: string
+  prompt_preview?: string
   credits_used: number
   file_url?: string
   file_name?: string
   error_message?: string
   created_at: string
   completed_at?: string
+  progress?: { stage: string, done?: number, total?: number }
+  queue_position?: number
+  estimated_start_at?: string
 }
 
 // API functions
@@ -70,11 +125,12 @@ export const api = {
   getProfile: (token: string) => 
     apiClient('/api/users/me', { token }),
   
-  getGenerations: (token: string, limit = 20) => 
-    apiClient(`/api/users/me/generations?limit=${limit}`, { token }),
+  // History is newest first; pass the previous page's next_cursor for older entries
+  getGenerations: (token: string, limit = 20, cursor?: string) => 
+    apiClient(`/api/users/me/generations?limit=${limit}${cursor ? `&cursor=${cursor}` : ''}`, { token }),
   
-  getTransactions: (token: string, limit = 50) => 
-    apiClient(`/api/users/me/transactions?limit=${limit}`, { token }),
+  getTransactions: (token: string, limit = 50, cursor?: string) => 
+    apiClient(`/api/users/me/transactions?limit=${limit}${cursor ? `&cursor=${cursor}` : ''}`, { token }),
 
   // Generations
   generatePlugin: (token: string, data: PluginRequest) =>
@@ -89,6 +145,12 @@ export const api = {
   getGeneration: (token: string, id: string) =>
     apiClient(`/api/generations/${id}`, { token }),
   
+  getGenerationStatuses: (token: string, ids: string[]) =>
+    apiClient('/api/generations/status', { method: 'POST', body: { ids }, token }),
+  
+  waitForGeneration: (token: string, id: string, sinceStatus: string) =>
+    apiClient(`/api/generations/${id}/wait?since_status=${sinceStatus}`, { token }),
+  
   getPricing: () =>
     apiClient('/api/generations/pricing'),
   